@@ -0,0 +1,103 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.html_fragment import (
+    FragmentParser,
+    UnsupportedFragment,
+    parse_fragment,
+    parse_html_as_data,
+    parse_html_as_data_soup,
+    parse_html_as_str,
+    parse_html_as_str_soup,
+)
+from utils.json_path import JsonPathSet
+from utils.script_tags import extract_script_text
+
+CUR_DIR = Path(__file__).parent
+
+# Repeats of the whole fragment set, as if the same fragments came back across many SKUs
+ROUNDS = 20
+
+FRAGMENT_PATHS = JsonPathSet(
+    {
+        "short_description": ["descriptors", "shortDescription"],
+        "long_description": ["descriptors", "longDescription"],
+        "specification": ["manufacturingInfo", "specification"],
+        "warranty": ["manufacturingInfo", "warranty"],
+        "messages": ["messages"],
+    }
+)
+
+
+def collect_fragments() -> list[str]:
+    products = []
+    for html_path in sorted(CUR_DIR.glob("samsclub_detail_*.html")):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            json_data_str = extract_script_text(html_file.read(), "tb-djs-wml-redux-state")
+        if json_data_str is not None:
+            products.extend(json.loads(json_data_str).get("cache", {}).get("products", {}).values())
+    for json_path in [CUR_DIR / "samsclub-product-vivaldi-browse.json", CUR_DIR / "api-data-variants.json"]:
+        with json_path.open("r", encoding="utf-8") as json_file:
+            products.extend(json.load(json_file)["payload"]["products"])
+
+    fragments = []
+    for product in products:
+        fields = FRAGMENT_PATHS.extract(product)
+        messages = fields.pop("messages") or []
+        fragments.extend(value for value in fields.values() if value)
+        fragments.extend(message["message"] for message in messages if message.get("message"))
+    return fragments
+
+
+def run(fragments: list[str], parse_str, parse_data) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for fragment in fragments:
+            parse_str(fragment)
+            parse_data(fragment)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    fragments = collect_fragments()
+    fallbacks = 0
+    for fragment in fragments:
+        try:
+            FragmentParser().parse(fragment)
+        except UnsupportedFragment:
+            fallbacks += 1
+        if parse_fragment.__wrapped__(fragment) != (parse_html_as_str_soup(fragment), parse_html_as_data_soup(fragment)):
+            raise AssertionError(f"fragment output differs: {fragment[:80]!r}")
+        if parse_html_as_str(fragment) != parse_html_as_str_soup(fragment):
+            raise AssertionError(f"cached text differs: {fragment[:80]!r}")
+        if parse_html_as_data(fragment) != parse_html_as_data_soup(fragment):
+            raise AssertionError(f"cached data differs: {fragment[:80]!r}")
+
+    calls = len(fragments) * ROUNDS * 2
+    logger.info(
+        f"{len(fragments)} fragments ({len(set(fragments))} distinct, {fallbacks} through bs4), {ROUNDS} rounds"
+    )
+
+    soup_time = run(fragments, parse_html_as_str_soup, parse_html_as_data_soup)
+    logger.info(f"bs4 per call:         {soup_time * 1e6 / calls:8.1f} us")
+
+    single_pass_time = run(fragments, parse_fragment.__wrapped__, parse_fragment.__wrapped__)
+    logger.info(f"single pass per call: {single_pass_time * 1e6 / calls:8.1f} us")
+
+    parse_fragment.cache_clear()
+    cached_time = run(fragments, parse_html_as_str, parse_html_as_data)
+    logger.info(f"cached per call:      {cached_time * 1e6 / calls:8.1f} us  {parse_fragment.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from parse_samsclub import parse_variants
+
+CUR_DIR = Path(__file__).parent
+
+template_path = CUR_DIR / "api-data-variants.json"
+
+SIZES = [(4, 4), (8, 8), (16, 16), (32, 32), (64, 64)]
+REPEAT = 5
+
+
+def parse_variants_nested(variant_options: list | None, variant_info: list | None) -> list:
+    """The previous criteria x values x infos x info values join, kept as the reference."""
+
+    variants = []
+    for option in variant_options or []:
+        option_type = option.get("name")
+        for value in option.get("values", []):
+            variant_value = value.get("value")
+            variant_image = value.get("imageUrl")
+            for info in variant_info or []:
+                for variant_value_info in info.get("values", []):
+                    if (
+                        variant_value_info.get("name") == option_type
+                        and variant_value_info.get("value") == variant_value
+                    ):
+                        variants.append(
+                            {
+                                "type": option_type,
+                                "name": variant_value,
+                                "sku_id": info.get("variantSkuId"),
+                                "family_sku_id": info.get("variantItemGroupId"),
+                                "image_url": variant_image,
+                            }
+                        )
+    return variants
+
+
+def make_variant_summary(template: dict[str, Any], colors: int, sizes: int) -> dict[str, Any]:
+    """Builds a `colors x sizes` variantSummary shaped like the checked-in api fixture."""
+
+    image_url = template["variantCriteria"][0]["values"][0]["imageUrl"]
+    item_group_id = template["variantInfoMap"][0]["variantItemGroupId"]
+
+    color_values = [{"value": f"Color {i}", "imageUrl": f"{image_url}_{i}"} for i in range(colors)]
+    size_values = [{"value": f"Size {j}", "imageUrl": None} for j in range(sizes)]
+    variant_info_map = [
+        {
+            "variantItemGroupId": item_group_id,
+            "values": [{"name": "Color", "value": f"Color {i}"}, {"name": "Size", "value": f"Size {j}"}],
+            "variantSkuId": f"{item_group_id}-{i}-{j}",
+        }
+        for i in range(colors)
+        for j in range(sizes)
+    ]
+    return {
+        "variantCriteria": [{"name": "Color", "values": color_values}, {"name": "Size", "values": size_values}],
+        "variantInfoMap": variant_info_map,
+    }
+
+
+def measure(func, variant_summary: dict[str, Any]) -> tuple[float, list]:
+    best = float("inf")
+    result = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(variant_summary["variantCriteria"], variant_summary["variantInfoMap"])
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    with template_path.open("r", encoding="utf-8") as template_file:
+        template = json.load(template_file)["payload"]["products"][0]["variantSummary"]
+
+    logger.info(f"{'variants':>9} {'nested ms':>10} {'indexed ms':>11} {'indexed us/variant':>19}")
+    for colors, sizes in SIZES:
+        variant_summary = make_variant_summary(template, colors, sizes)
+        nested_time, nested_result = measure(parse_variants_nested, variant_summary)
+        indexed_time, indexed_result = measure(parse_variants, variant_summary)
+        if nested_result != indexed_result:
+            raise AssertionError(f"variant output differs for {colors}x{sizes}")
+
+        count = len(variant_summary["variantInfoMap"])
+        logger.info(
+            f"{count:>9} {nested_time * 1000:>10.2f} {indexed_time * 1000:>11.2f} {indexed_time * 1e6 / count:>19.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,34 @@
 import base64
 import json
 import re
+import sys
+import threading
+import time
 import urllib.parse
+from concurrent.futures import Future
+from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import requests
 from bs4 import BeautifulSoup
 from loguru import logger
+from requests.adapters import HTTPAdapter
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.field_spec import OMIT, Field, FieldSpec
+from utils.field_timing import mark, profiled
+from utils.html_fragment import parse_html_as_data, parse_html_as_str
+from utils.json_extract import extract_json_value
+from utils.json_path import JsonPathSet, get_from_json
+from utils.projection import wants
+from utils.script_tags import extract_script_text, parse_head_tags
+from utils.ttl_cache import TTLCache
 
 TEST_LOCAL = True
 
@@ -27,158 +48,62 @@ html_path = CUR_DIR / "samsclub_detail_2025-03-24_18-56-17.html"
 
 output_path = CUR_DIR.parent / "result" / "samsclub-result.json"
 
+SAMSCLUB_URL = "https://www.samsclub.com"
+VIVALDI_PRODUCTS_PATH = "/api/node/vivaldi/browse/v2/products"
+# Product ids per vivaldi request; the endpoint takes a list but does not publish its limit
+VIVALDI_BATCH_SIZE = 20
+# Seconds a partial batch waits for more ids before it is posted anyway
+VIVALDI_FLUSH_AFTER = 0.05
+VIVALDI_CONNECTIONS = 4
+# Seconds a rendered product stays cached server-side: its embedded `expiresAt` is this long after the page was rendered
+EMBEDDED_TTL = 900
+# `parse_detail_hybrid` takes the offer from the api once the embedded one is older than this many seconds
+HYBRID_MAX_AGE = 900
+# Api products reused per product id by `parse_detail_hybrid`, for five minutes
+VIVALDI_CACHE = TTLCache(ttl=300)
+# When set, `parse_detail_api` queues its product on this batcher instead of posting it alone
+VIVALDI_CLIENT: "VivaldiBatcher | None" = None
+
+
+SAVINGS_PATHS = JsonPathSet(
+    {
+        "amount_saved": ["savingsAmount"],
+        "type": ["memberPromotions", 0, "type"],
+        "max_quantity": ["householdLimit"],
+        "start_date": ["startDate"],
+        "end_date": ["endDate"],
+    }
+)
+
+PRODUCT_ID_PATTERN = re.compile(r'"productId":"([^"]+)"')
+# Parts of the product's offer that change between captures and that a detail field reads: the price with its savings
+LIVE_PATHS = (["skus", 0, "onlineOffer", "price"],)
+# Detail fields read from `LIVE_PATHS`
+LIVE_FIELDS = ("price", "list_price", "price_per_unit", "currency", "buying_offers")
+
+# The product's first sku offer: price, savings and inventory, which change between snapshots
+OFFER_PATHS = JsonPathSet(
+    {
+        "price": ["price", "finalPrice", "amount"],
+        "list_price": ["price", "startPrice", "amount"],
+        "price_per_unit": ["price", "unitPrice", "amount"],
+        "savings": ["price", "savings"],
+        "stock_status": ["inventory", "status"],
+        "available_quantity": ["inventory", "availableToSellQuantity"],
+    }
+)
 
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        if isinstance(key, int):
-            if key >= len(obj):
-                break
-            obj = obj[key]
-        elif isinstance(key, str):
-            obj = obj.get(key)
-    return obj
-
-
-def parse_html_as_str(html_text: str | None) -> str:
-    if not html_text:
-        return ""
-
-    soup = BeautifulSoup(html_text, "html.parser")
-    return soup.get_text()
-
-
-def parse_html_as_data(html_text: str | None) -> list:
-    ret = []
-
-    if not html_text:
-        return ret
-
-    soup = BeautifulSoup(html_text, "html.parser")
-
-    # Handle unordered lists
-    ul_elems = soup.select("ul")
-    for ul_elem in ul_elems:
-        list_data = []
-        li_elems = ul_elem.select("li")
-        for li_elem in li_elems:
-            list_data.append(li_elem.get_text().strip())
-        if list_data:
-            ret.append(list_data)
-
-    # Handle standalone list items (no parent ul)
-    if not ul_elems:
-        list_data = []
-        li_items = soup.select("li")
-        for li_item in li_items:
-            list_data.append(li_item.get_text().strip())
-        if list_data:
-            ret.append(list_data)
-
-    # Handle tables (including those with sections/headers)
-    table_elems = soup.select("table")
-    for table_elem in table_elems:
-        # Check if this is a complex table with sections
-        thead_elems = table_elem.select("thead")
-
-        if thead_elems:
-            # This is a complex table with sections
-            table_data = {}
-            current_section = None
-            section_items = {}  # Track items for each section
-
-            # Process all rows
-            for row in table_elem.select("tr"):
-                # Check if this is a header row
-                th_elems = row.select("th")
-                if th_elems and len(th_elems) > 0:
-                    # This is a section header
-                    section_text = th_elems[0].get_text().strip()
-                    if section_text:
-                        current_section = section_text
-                        if current_section not in section_items:
-                            section_items[current_section] = []
-                else:
-                    # This is a data row
-                    td_elems = row.select("td")
-                    if len(td_elems) >= 2:
-                        key = td_elems[0].get_text().strip()
-                        value = td_elems[1].get_text().strip()
-
-                        # Handle rows with keys and values
-                        if key and value:
-                            table_data[key] = value
-                        # Handle rows with empty first column but content in second column
-                        elif not key and value and current_section:
-                            # Add to the current section's list
-                            if current_section not in table_data:
-                                table_data[current_section] = []
-                            if isinstance(table_data[current_section], list):
-                                table_data[current_section].append(value)
-                            else:
-                                # If it was previously not a list, convert it
-                                old_value = table_data[current_section]
-                                table_data[current_section] = [old_value, value]
-
-            if table_data:
-                ret.append(table_data)
-        else:
-            # Standard table processing
-            table_data = {}
-            tr_elems = table_elem.select("tr")
-            for tr_elem in tr_elems:
-                td_elems = tr_elem.select("td")
-                if len(td_elems) >= 2:
-                    key = td_elems[0].get_text().strip()
-                    value = td_elems[1].get_text().strip()
-                    if key and value:
-                        table_data[key] = value
-                    # Handle rows with empty first column but content in second column
-                    elif not key and value:
-                        if "Items" not in table_data:
-                            table_data["Items"] = []
-                        table_data["Items"].append(value)
-
-            if table_data:
-                ret.append(table_data)
-
-    # Handle paragraphs with strong tags (property:value format)
-    # Example: <p><strong>Net Volume: </strong>15.99 Liters</p>
-    p_data = {}
-    p_elems = soup.select("p")
-    for p_elem in p_elems:
-        strong_elem = p_elem.select_one("strong")
-        if strong_elem:
-            # Get the property name from the strong tag
-            prop_name = strong_elem.get_text().strip()
-            # Remove any trailing colons
-            prop_name = prop_name.rstrip(":")
-
-            # Get the full paragraph text
-            p_text = p_elem.get_text().strip()
-            # Extract the value by removing the property name
-            prop_value = p_text.replace(strong_elem.get_text(), "", 1).strip()
-
-            if prop_name and prop_value:
-                p_data[prop_name] = prop_value
-
-    if p_data:
-        ret.append(p_data)
-
-    return ret
-
+BREADCRUMB_PATHS = JsonPathSet(
+    {
+        "name": ["displayName"],
+        "url": ["seoUrl"],
+        "nav_id": ["navId"],
+    }
+)
 
-def get_products_from_api(product_id: str) -> dict[str, Any]:
-    url = "https://www.samsclub.com/api/node/vivaldi/browse/v2/products"
 
-    payload = {
-        "productIds": [product_id],
-        "type": "LARGE",
-        "clubId": "",
-    }
-    headers = {
+def vivaldi_headers(product_id: str) -> dict[str, str]:
+    return {
         "host": "www.samsclub.com",
         "connection": "keep-alive",
         "sec-ch-ua-platform": '"macOS"',
@@ -198,557 +123,535 @@ def get_products_from_api(product_id: str) -> dict[str, Any]:
         "cookie": f"SSLB=1; vtc=aD41JWyFA4SLLSagy1fqVk; SSRT1=rQjcZwADAA; s_ecid=MCMID%7C04132543087547887273693291396054216962; _gcl_au=1.1.1678157949.1742473390; _pxvid=161c7d9a-0586-11f0-9090-f8b63fea5150; QuantumMetricUserID=8f11bc5d66d17c3f5dfd98178071ee4f; SSID1=CQBCYh0cAAAAAACrCNxnWEdBFKsI3GcBAAAAAABXPb1pqwjcZwBjBk5YAQMMHSoAqwjcZwEA-lUBA7HjKQCrCNxnAQA; SSOD1=ADW3AAAAEgAYtGwAAQAAAK4I3GeuCNxnAQAAAA; samsathrvi=RVI~prod24380340; salsify_session_id=d43057a6-34a5-4b23-86bb-9f59dbe18af4; BVBRANDID=418ea085-f6ba-4825-92c4-a35d58d33ee8; __pxvid=166645fe-0586-11f0-8c6f-0242ac120002; acstkn=87:14#624975973#7=931678458_1742473391063; astract=ca-c796af40-e875-46a9-84e9-a6a0e67416a7; _mibhv=anon-1742473392979-6598855352_4591; rmStore=dmid:8096; _fbp=fb.1.1742473393332.164989035486725929; _tt_enable_cookie=1; _ttp=01JPSR3X7313V402K3QPH6WJ31_.tt.1; _pin_unauth=dWlkPU56azNaV05rWmpndFl6RTFNeTAwTXpBNExUZzRZekF0T0RKallUUTFNVGszWW1JMA; cto_bundle=NogYOl9tMjltaFhaV3dyOGJYaGkxQmdHdk5EaHFSVUhzOUh0OWZhdUFBdXZQSlN0RlR6dDhUWXJVRUFZdlN5N0pnUDZ1bmZNZURvVE5UdTJtQjlTeXdheDJ6ak81YXBiR01KVVQ0UFZwUzVUJTJGOEU4ZyUyQjlZNENHdUJTNGRHd3hjJTJGd2pmcjFzTVl5dkxXQUNHMDhTJTJGQ3dKUklpOFBYcG9Pc2c3JTJCdURqRGFxenc5S21rJTNE; _uetvid=17cfff60058611f0aeb7f5594c149de4; __gads=ID=3d38cf714f3aa417:T=1742473394:RT=1742473394:S=ALNI_Mb1pbZR33UjUXVGMqHCi8q4IjCBFg; __gpi=UID=0000106a8a4ce673:T=1742473394:RT=1742473394:S=ALNI_Ma-ZtGZ2vTdHrhgirm2luAu6NtFMw; __eoi=ID=7992908a68822ab3:T=1742473394:RT=1742473394:S=AA-AfjY9d9SC2tuBOVpG3RqEJ8ut; sxp-rl-SAT_CME-rn=69; sxp-rl-SAT_DISABLE_SYN_PREQUALIFY-rn=29; sxp-rl-SAT_GEO_LOC-rn=46; sxp-rl-SAT_NEW_ORDERS_UI-rn=38; sxp-rl-SAT_ORDER_REPLACEMENT-rn=72; sxp-rl-SAT_REORDER_V4-rn=62; sxp-rl-SCR_CANCEL_ORDER_V3-rn=83; sxp-rl-SCR_CANRV4-rn=47; sxp-rl-SCR_NEXT3-rn=46; sxp-rl-SCR_OHLIMIT-rn=58; sxp-rl-SCR_SHAPEJS-rn=99; sxp-rl-SCR_VERIFICATION_V4-rn=4; sxp-rl-SAT_ADD_ITEM-rn=12; sxp-rl-SCR_SCRE-rn=6; sxp-rl-SCR_TII-rn=35; SAT_WPWCNP=1; bstc=RJSIW93r1sJp0gOWgaTVQA; xpa=t5Tz_; exp-ck=t5Tz_1; SAT_NEO_EXPO=1; sxp-rl-SAT_CME-c=r|1|100; SAT_CME=1; sxp-rl-SAT_DISABLE_SYN_PREQUALIFY-c=r|1|0; SAT_DISABLE_SYN_PREQUALIFY=0; sxp-rl-SAT_GEO_LOC-c=r|1|50; SAT_GEO_LOC=1; sxp-rl-SAT_NEW_ORDERS_UI-c=r|1|0; SAT_NEW_ORDERS_UI=0; sxp-rl-SAT_ORDER_REPLACEMENT-c=r|1|0; SAT_ORDER_REPLACEMENT=0; sxp-rl-SAT_REORDER_V4-c=r|1|0; SAT_REORDER_V4=0; sxp-rl-SCR_CANCEL_ORDER_V3-c=r|1|0; SCR_CANCEL_ORDER_V3=0; sxp-rl-SCR_CANRV4-c=r|1|100; SCR_CANRV4=1; sxp-rl-SCR_NEXT3-c=r|1|100; SCR_NEXT3=1; sxp-rl-SCR_OHLIMIT-c=r|1|0; SCR_OHLIMIT=0; sxp-rl-SCR_SHAPEJS-c=r|1|0; SCR_SHAPEJS=0; sxp-rl-SCR_VERIFICATION_V4-c=r|1|0; SCR_VERIFICATION_V4=0; sxp-rl-SAT_ADD_ITEM-c=r|1|100; SAT_ADD_ITEM=1; sxp-rl-SCR_SCRE-c=r|1|100; SCR_SCRE=1; sxp-rl-SCR_TII-c=r|1|100; SCR_TII=1; xpm=1%2B1742881871%2BaD41JWyFA4SLLSagy1fqVk~%2B1; sams-pt=eyJ4NXQiOiJzOXN6ZUptWldjMWhRYktIOUVqSmNoOUZkTkEiLCJraWQiOiJCM0RCMzM3ODk5OTk1OUNENjE0MUIyODdGNDQ4Qzk3MjFGNDU3NEQwIiwidHlwIjoiSldUIiwiYWxnIjoiUlMyNTYifQ.eyJleHQiOiI4SkZtWW1KbE1HRTBNREV4T0dFNVkyUm1ZbUptTURGaU0yTXpOakk0TnpFME56Qm1OalUxWVRZMVlXWTJOekprTlRBMlpqa3daamsyTnpBeU9XVTRPV0ZpT1RnME5XWmhPVFpqWVRFNFlqTmpNRFUzWmpkak5UTTVZVEZrTkRrd1kyWmpZVE14Wm1NNFlUSmlOREJsWldWa1l6UmxZVGM1WVRNNE4yWTVNalkyTW1NM01tWXlNV0V5TmpReFlXWm1PVEkyTURNelpqazFZams1WldKaU5UZ3oiLCJ2ZXIiOiIxLjAiLCJjaGkiOiJkZXNrdG9wIiwiZmJ0IjpmYWxzZSwiYWhiIjp7InYiOnRydWUsInAiOltdfSwib3ZyZCI6ZmFsc2UsInNoYSI6eyJ2Ijp0cnVlLCJwIjpbXX0sImV4cCI6MTc0Mjg4NTQ3NCwiaWF0IjoxNzQyODgxODc0LCJuYmYiOjE3NDI4ODE4NzQsImlzcyI6Imh0dHBzOi8vdGl0YW4uc2Ftc2NsdWIuY29tL2M4Y2MwNzBlLWRmZWQtNDVjOS1iZGE1LTI5ZDAwMTIxYWNiYi92Mi4wLyIsImp0aSI6IjM2OGM2MTdjLTQ4NTEtNDhmYy1hYmI1LTg0NjEwZmNhNDJkMiJ9.VzfSJ7tjdLYaRUTerjWtoIt1CS0JMJF07Q6eOsOSAirToeWdq-c4OzhdJUE-pDiFlEalva2wN96chflTMw7FWCdQC_mdVyqRyyDatFL8C0KPF8W4nifW_mMTdPOHp3DX5THJfdDXQl43CDFx9yJ5Ql7qKvX-WCz5aN7sL7DU-evCCSozOIge9JkyHjYJ8qWeSOgerSvNSDOu9-_sv2Pknw7vqO8D4HpULKkaiBsDOt1wcP_yXw4c02iHfqxhhi_nOWA9O7z3yixU4_SYVPvbDFNOWor4JZmI9XZZKPiwWjY61qcHGfzA1HI04cWw6693TVpuue_rIA-x9TtOn3lhw96B_ghmfNfG1XckHL37bXRpBg4JUFMw_R7vJ2NrXP9fynrXeD57dsR0qPC7-fLbEnrFWwNtTbJIOppIMpKgZh91xVKVxCoS40wT7CAhliSiuift2z5dG93MK74l0zVEdK6ubEgpHbgD9a1Y6qWYoddpgOapC5Lv8BDshCPPmYcbNhgS6LLSgEw72DhjT-WKgJEpjmpA6Yt9UbA5s6rKFPJbvY_Y1nuUMSflhZ_RIZ4A3MC18-IGFAsoorO6X_d6tZ-KqbozGxEyg8d_ESRk5eHM2seca2kd7iYVRvRqAw8dtD1byInGH7PYMD3hqhJfGbteVzKmg1MbH-YRcGl9b28; ak_bmsc=AC9176AAD2678EF6C1FB47331C2FB53A~000000000000000000000000000000~YAAQ0WncF/yPU6iVAQAAIObayxs+0nEBCbsE2socx2OmAyqUfG4uVrANvmimznpQSLpsBmPfe3EDrmKiXa4kLGQ7lzGbGpiIZZHBGrgM2749gM0o8y/+wS03SM3/IOyY9wG/W36mBJQlFV+qxkl0DKmbC2f5f3/MvqwcXd8qgbG9TPqiEFgiSXcujldXffMAWPndTDAQ0/jH33WLNiMq/ff2NK/f6UnLShjh8nHnm7S+RympqroxBPRNBSFEXyYgz+CuIrzLElr+el+wCeBxeb56UwNjeiU/1CF51o+Pizmg0MW6cCuJDvxQYKzb9MxAQiOl2lKaKgrsYQMrg+RK3xQTornQugA6aHIR8MKjiW/eTiZLd8T+eq8uDuXZGiGu+qe+tKplmPtqp0Mw9i8FUDs=; xptwj=js:12d22df6f93b87a2737d:CvjLSnK9UWS8sTWH529x7tFB5nHpYUNozfUw/gmDgsiDUYv48E+zyJSkC+jyPxhIk++15esXWYOUdUlXv7HWaIgRoz6Dl13zN0FRnmwbJy37Vaynu54=; rcs=eF5jYSlN9rA0T0m2TDQx0jUys0jRNUkzM9M1MDE0AbFMzY3SzCyN04y5cstKMlMEDM2NzXQNdQ0BiSINwQ; AMCVS_B98A1CFE53309C340A490D45%40AdobeOrg=1; AMCV_B98A1CFE53309C340A490D45%40AdobeOrg=1585540135%7CMCIDTS%7C20173%7CMCMID%7C04132543087547887273693291396054216962%7CMCAAMLH-1743486677%7C7%7CMCAAMB-1743486677%7CRKhpRz8krg2tLO6pguXWp5olkAcUniQYPHaMWWgdJ3xzPWQmdj0y%7CMCOPTOUT-1742889077s%7CNONE%7CMCAID%7CNONE%7CvVersion%7C4.4.0; s_cc=true; pxcts=2bce2a7c-093d-11f0-a1d6-d163d12456bd; bm_sv=0D1DBF4EE05CA147B4144066D053FD5F~YAAQ0WncFxyTU6iVAQAABvLayxvPzNs/thnc5wxDjCpUancDaQelL8azXNjb3/zPnyOa7mFjR/nOCvxjUJKAP876uCsWCvBaXUahoQlbvT+Go8e0xG/InEe+JnG5TRiI2fAWpR0DfiroEXYbmNrR5ePPnaJUbP2dL1QkxsxBiYTyqvq6GlZqrUVBvFs1LjCDBHtjGuKIIX8YnjiLIEVelYw4TeBDgn+/WCFMiOrYaqZPI3sreenABTrRGE285lk3byk=~1; _px3=07829f49e7f8450fa334b3eee011cac34d4ebd42eb021dfcd1ddca43fa23993c:xCo5X9gxRRYEIwFdhKPUY6XmFQGOnP7VgFsdQBLNc/uWQcyMtVi7GZzRS9zO/YSQi2S5ItNFQub9oE+Tu5dbqA==:1000:CYoTt/Lef32YfD61c6bMDk5MHcYdR8R6vT1Pu2xTMrTmq59ZH9VZLSwO1J//v0XOO42fXLesBFPNUvEkgKF/Y/hpb7CyDX0saLsWNv8sPP8lkf2/UVX4CbcYtXxZamLnfURrr47P1FiYBrGxT6G/bJ/2a8H2f8QrhJL4KEH3sYyDS4qzOAAubd/9A9KnZrTMajnIN/worIrN7Mw7SPMZFJxr9Qwc8SUzK/RiUew8J5k=; s_sq=samclub3prod%3D%2526c.%2526a.%2526activitymap.%2526page%253Dhomepage%2526link%253DInstant%252520Savings%252520Tramontina%2525203-Piece%252520Nonstick%252520Fry%252520Pan%252520Set%25252C%252520Choose%252520Color%252520%2525281882%252529%252520%2525246%252520off%252520%25252429.84%252520Previous%252520price%25253A%252520%25252429.84%252520From%252520CURRENT%252520P%2526region%253Dmain%2526pageIDType%253D1%2526.activitymap%2526.a%2526.c%2526pid%253Dhomepage%2526pidt%253D1%2526oid%253Dhttps%25253A%25252F%25252Fwww.samsclub.com%25252Fp%25252Ftramontina-aluminum-fry-pans-set-of-3-assorted-colors%25252F{product_id}%25253Fxid%25253Dhpg_c%2526ot%253DA; QuantumMetricSessionID=bbf98e34ac6e6b4b58da2dced3efde4f; _pxde=6f301d72749dcb3da7c2308acef4df5942fbfb1945e1e351145abe37dc391636:eyJ0aW1lc3RhbXAiOjE3NDI4ODE4ODIxNzJ9; seqnum=4; TS017c4a41=0181c636c19af7dcaf60fc876389b9cf95056dccb5f168a8d18a6d893f5a9e91db83c32cc1b621b65f77e067bb31780e20b09873dc; TS01b1959a=0181c636c19af7dcaf60fc876389b9cf95056dccb5f168a8d18a6d893f5a9e91db83c32cc1b621b65f77e067bb31780e20b09873dc; TS017260c8=0181c636c19af7dcaf60fc876389b9cf95056dccb5f168a8d18a6d893f5a9e91db83c32cc1b621b65f77e067bb31780e20b09873dc; TSbdf847b3027=08eb9900a5ab2000ae56f776b27f011377fbb5ff488ed5473a2c52f8aaf0b97cab8e4c3f863a10a8080bbd6d1f11300090fd22d7981d51300ed644cb7b25bb9607b3e45edf3855b330814690a7137722c89a1117d7a2bab460062a382c2d3e4d; akavpau_P1_Sitewide=1742882483~id=46e3490966efc42edbccf8b9e0514be6",
     }
 
-    response = requests.post(url, json=payload, headers=headers)
-
-    return response.json()
 
+def get_products_from_api(product_id: str) -> dict[str, Any]:
+    url = f"{SAMSCLUB_URL}{VIVALDI_PRODUCTS_PATH}"
 
-def parse_detail(html_content: str) -> dict[str, Any]:
-    page_elem = BeautifulSoup(html_content, "html.parser")
-    dict_details: dict[str, Any] = {}
+    payload = {
+        "productIds": [product_id],
+        "type": "LARGE",
+        "clubId": "",
+    }
 
-    json_data = {}
-    product_data = {}
-    image_data = []
-    messages_data = []
-    script_elem = page_elem.select_one("script#tb-djs-wml-redux-state")
-    if script_elem is not None:
-        json_data_str = script_elem.text
-        json_data: dict = json.loads(json_data_str)
-        products_data: dict = json_data.get("cache", {}).get("products", {})
-        product_data = list(products_data.values())[0]
-        product_images: dict = json_data.get("productImages", {})
-        image_data = (list(product_images.values())[0]).get("images", [])
-        messages_data: list = product_data.get("messages", [])
+    response = requests.post(url, json=payload, headers=vivaldi_headers(product_id))
 
-    # Success
-    dict_details["success"] = True
+    return response.json()
 
-    # Url
-    canonical_elem = page_elem.select_one("link[rel=canonical]")
-    dict_details["url"] = canonical_elem.attrs.get("href") if canonical_elem else None
 
-    # Result Count
-    dict_details["result_count"] = 1
+class VivaldiBatcher:
+    """Fetches the products of concurrent `parse_detail_api` calls together, over one keep-alive session.
+
+    A batch is posted once it holds `batch_size` product ids, or `flush_after` seconds after its first id came in.
+    Every caller gets back a response shaped like `get_products_from_api`'s, carrying its own product only.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = VIVALDI_BATCH_SIZE,
+        flush_after: float = VIVALDI_FLUSH_AFTER,
+        base_url: str | None = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_after = flush_after
+        self.url = f"{base_url or SAMSCLUB_URL}{VIVALDI_PRODUCTS_PATH}"
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=VIVALDI_CONNECTIONS))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=VIVALDI_CONNECTIONS))
+        self._pending: list[tuple[str, Future]] = []
+        self._timer: threading.Timer | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, product_id: str) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((product_id, future))
+            batch = self._take() if len(self._pending) >= self.batch_size else None
+            if batch is None and self._timer is None:
+                self._timer = threading.Timer(self.flush_after, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._post(batch)
+        return future
+
+    def get(self, product_id: str) -> dict[str, Any]:
+        return self.submit(product_id).result()
+
+    def flush(self) -> None:
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._post(batch)
+
+    def _take(self) -> list[tuple[str, Future]]:
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _post(self, batch: list[tuple[str, Future]]) -> None:
+        product_ids = list(dict.fromkeys(product_id for product_id, _ in batch))
+        payload = {
+            "productIds": product_ids,
+            "type": "LARGE",
+            "clubId": "",
+        }
+        try:
+            response = self.session.post(self.url, json=payload, headers=vivaldi_headers(product_ids[0]))
+            resp_data = response.json()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        products = {
+            get_from_json(product, ["productId"]): product
+            for product in get_from_json(resp_data, ["payload", "products"]) or []
+        }
+        messages = get_from_json(resp_data, ["payload", "messages"])
+        for product_id, future in batch:
+            product = products.get(product_id)
+            future.set_result(
+                {
+                    "status": resp_data.get("status") if product is not None else "NOT_FOUND",
+                    "payload": {"products": [product] if product is not None else [], "messages": messages},
+                }
+            )
 
-    detail: dict[str, Any] = {}
+    def close(self) -> None:
+        self.flush()
+        self.session.close()
 
-    # Name
-    detail["name"] = get_from_json(product_data, ["descriptors", "name"])
+    def __enter__(self) -> "VivaldiBatcher":
+        return self
 
-    # Brand
-    detail["brand"] = get_from_json(product_data, ["manufacturingInfo", "brand"])
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
 
-    # Url
-    detail["url"] = dict_details.get("url")
 
-    # Highlight
-    detail["highlights"] = None
-    highlight_text = get_from_json(product_data, ["descriptors", "shortDescription"])
+def parse_highlights(highlight_text: str | None) -> list | None:
     parsed_data = parse_html_as_data(highlight_text)
-    if parsed_data:
-        detail["highlights"] = parsed_data[0]
+    return parsed_data[0] if parsed_data else None
+
+
+def parse_weight(weight: dict | None) -> str | None:
+    if weight and weight.get("value") and weight.get("unitOfMeasure"):
+        return f"{weight.get('value')} {weight.get('unitOfMeasure')}"
+    return None
+
+
+def parse_weight_data(weight: dict | None) -> dict | None:
+    if not weight:
+        return None
+    return {"value": weight.get("value"), "unit": weight.get("unitOfMeasure")}
+
+
+def parse_dimensions(logistics_data: dict | None) -> str | None:
+    if not logistics_data:
+        return None
+
+    length = logistics_data.get("length", {})
+    width = logistics_data.get("width", {})
+    height = logistics_data.get("height", {})
+    if (
+        length.get("value")
+        and length.get("unitOfMeasure")
+        and width.get("value")
+        and width.get("unitOfMeasure")
+        and height.get("value")
+        and height.get("unitOfMeasure")
+    ):
+        return f"{length.get('value')}L x {width.get('value')}W x {height.get('value')}H {length.get('unitOfMeasure')}"
+    return None
+
+
+def parse_dimensions_data(logistics_data: dict | None) -> dict | None:
+    if not logistics_data:
+        return None
+
+    length = logistics_data.get("length", {})
+    width = logistics_data.get("width", {})
+    height = logistics_data.get("height", {})
+    return {
+        "box_count": logistics_data.get("numberOfBoxes"),
+        "length": {"value": length.get("value"), "unit": length.get("unitOfMeasure")},
+        "width": {"value": width.get("value"), "unit": width.get("unitOfMeasure")},
+        "height": {"value": height.get("value"), "unit": height.get("unitOfMeasure")},
+        "is_hazardous": logistics_data.get("hazardMaterial"),
+    }
 
-    # Description
-    detail["description"] = parse_html_as_str(get_from_json(product_data, ["descriptors", "longDescription"]))
 
-    # Product ID
-    detail["product_id"] = get_from_json(product_data, ["productId"])
+def parse_specifications(specifications_text: str | None) -> tuple[list | None, list | object]:
+    """Returns `(specifications, additional_details)`.
 
-    # SKU
-    detail["sku_id"] = get_from_json(product_data, ["skus", 0, "skuId"])
+    `additional_details` is OMIT when the specification html has data but none of it is a list.
+    """
 
-    # UPC
-    detail["upc"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "generatedUPC"])
+    parsed_data = parse_html_as_data(specifications_text)
+    if not parsed_data:
+        return None, []
+
+    specs_list = []
+    additional_details = []
+    for item in parsed_data:
+        # Handle dict-type specifications (from table)
+        if isinstance(item, dict):
+            for key, value in item.items():
+                # Handle cases where values are lists/arrays
+                if isinstance(value, list):
+                    additional_details.append({"name": key, "value": value})
+                else:
+                    # Regular key-value pair
+                    specs_list.append({"name": key, "value": value})
+        # Handle list-type specifications (from ul/li)
+        elif isinstance(item, list):
+            for entry in item:
+                # Try to split entries that might have a colon separator
+                if ":" in entry:
+                    name, value = entry.split(":", 1)
+                    specs_list.append({"name": name.strip(), "value": value.strip()})
+                else:
+                    specs_list.append({"name": "Feature", "value": entry.strip()})
 
-    # GTIN
-    detail["gtin"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "gtin"])
+    return specs_list or None, additional_details or OMIT
 
-    # Item Number
-    detail["item_no"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "itemNumber"])
 
-    # Model Number
-    detail["model_no"] = get_from_json(product_data, ["manufacturingInfo", "model"])
+def find_message(messages_data: list | None, key: str) -> dict | None:
+    for message in messages_data or []:
+        if message.get("key") == key:
+            return message
+    return None
 
-    # Image
-    detail["main_image"] = get_from_json(image_data, [0, "ImageUrl"])
 
-    # Images
-    detail["images"] = [data.get("ImageUrl") for data in image_data]
+def parse_shipping_info(shipping_info: str | None, messages_data: list | None) -> list:
+    ret = [shipping_info]
+    message = find_message(messages_data, "sidesheet.shipping.upsell.message")
+    if message:
+        ret.append(parse_html_as_str(message.get("message")))
+    return ret
 
-    # Price
-    detail["price"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "finalPrice", "amount"])
-    detail["list_price"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "startPrice", "amount"])
-    detail["price_per_unit"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "unitPrice", "amount"])
 
-    # Currency
-    detail["currency"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "startPrice", "currency"])
+def parse_curbside_pickup(messages_data: list | None) -> str | None:
+    message = find_message(messages_data, "channelbanner.pickup.message")
+    if message:
+        return parse_html_as_str(message.get("message", ""))
+    return None
 
-    # Demensions & Weight
-    weight = get_from_json(product_data, ["skus", 0, "skuLogistics", "weight"])
-    if weight:
-        detail["weight"] = (
-            f"{weight.get('value')} {weight.get('unitOfMeasure')}"
-            if weight.get("value") and weight.get("unitOfMeasure")
-            else None
-        )
-        detail["weight_data"] = {"value": weight.get("value"), "unit": weight.get("unitOfMeasure")}
-    else:
-        detail["weight"] = None
-        detail["weight_data"] = None
-
-    # Additional Dimensions
-    logistics_data = get_from_json(product_data, ["skus", 0, "skuLogistics"])
-    if logistics_data:
-        length = logistics_data.get("length", {})
-        width = logistics_data.get("width", {})
-        height = logistics_data.get("height", {})
-
-        if (
-            length.get("value")
-            and length.get("unitOfMeasure")
-            and width.get("value")
-            and width.get("unitOfMeasure")
-            and height.get("value")
-            and height.get("unitOfMeasure")
-        ):
-            detail["dimensions"] = (
-                f"{length.get('value')}L x {width.get('value')}W x {height.get('value')}H "
-                f"{length.get('unitOfMeasure')}"
-            )
-        else:
-            detail["dimensions"] = None
-
-        detail["dimensions_data"] = {
-            "box_count": logistics_data.get("numberOfBoxes"),
-            "length": {"value": length.get("value"), "unit": length.get("unitOfMeasure")},
-            "width": {"value": width.get("value"), "unit": width.get("unitOfMeasure")},
-            "height": {"value": height.get("value"), "unit": height.get("unitOfMeasure")},
-            "is_hazardous": logistics_data.get("hazardMaterial"),
-        }
-    else:
-        detail["dimensions"] = None
-        detail["dimensions_data"] = None
-
-    # Retailer Badge
-    savings = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "savings"])
-    if savings:
-        detail["buying_offers"] = {
-            "amount_saved": get_from_json(savings, ["savingsAmount"]),
-            "type": get_from_json(savings, ["memberPromotions", 0, "type"]),
-            "max_quantity": get_from_json(savings, ["householdLimit"]),
-            "start_date": get_from_json(savings, ["startDate"]),
-            "end_date": get_from_json(savings, ["endDate"]),
-        }
-    else:
-        detail["buying_offers"] = None
 
-    # Specifications
-    detail["specifications"] = None
-    detail["additional_details"] = []
-    specifications_text = get_from_json(product_data, ["manufacturingInfo", "specification"])
-    parsed_data = parse_html_as_data(specifications_text)
+def parse_returns(return_info: dict | None) -> dict | None:
+    if not return_info:
+        return None
+    return {
+        "location": return_info.get("returnLocation"),
+        "days": return_info.get("returnDays"),
+        "policy_text": return_info.get("returnDescription"),
+        "policy_link": return_info.get("returnLinkUrl"),
+    }
 
-    if parsed_data:
-        specs_list = []
-        for item in parsed_data:
-            # Handle dict-type specifications (from table)
-            if isinstance(item, dict):
-                for key, value in item.items():
-                    # Handle cases where values are lists/arrays
-                    if isinstance(value, list):
-                        # Add to additional_details as a name-value pair with list value
-                        detail["additional_details"].append({"name": key, "value": value})
-                    # If it's a section with list values (like Package Contents)
-                    elif key in item and isinstance(item[key], list):
-                        # Add to additional_details as a name-value pair with list value
-                        detail["additional_details"].append({"name": key, "value": item[key]})
-                    else:
-                        # Regular key-value pair
-                        specs_list.append({"name": key, "value": value})
-            # Handle list-type specifications (from ul/li)
-            elif isinstance(item, list):
-                for entry in item:
-                    # Try to split entries that might have a colon separator
-                    if ":" in entry:
-                        name, value = entry.split(":", 1)
-                        specs_list.append({"name": name.strip(), "value": value.strip()})
-                    else:
-                        specs_list.append({"name": "Feature", "value": entry.strip()})
-
-        if specs_list:
-            detail["specifications"] = specs_list
-
-        # If no additional_details found, remove the empty list
-        if not detail["additional_details"]:
-            del detail["additional_details"]
-
-    # Manufacturing Info
-    detail["shipping_info"] = []
-    detail["warranty"] = parse_html_as_str(get_from_json(product_data, ["manufacturingInfo", "warranty"]))
-    detail["country_of_origin"] = get_from_json(product_data, ["manufacturingInfo", "componentCountry"])
-    detail["assembled_in"] = get_from_json(product_data, ["manufacturingInfo", "assembledCountry"])
-    detail["shipping_info"].append(get_from_json(product_data, ["shippingOption", "info"]))
-
-    # Shipping
-    for message in messages_data:
-        if message.get("key") == "sidesheet.shipping.upsell.message":
-            detail["shipping_info"].append(parse_html_as_str(message.get("message")))
-            break
-
-    # Pickup
-    detail["curbside_pickup"] = None
-    for message in messages_data:
-        if message.get("key") == "channelbanner.pickup.message":
-            detail["curbside_pickup"] = parse_html_as_str(message.get("message", ""))
-            break
-
-    # Returns
-    return_info = get_from_json(product_data, ["skus", 0, "returnInfo"])
-    if return_info:
-        detail["returns"] = {
-            "location": return_info.get("returnLocation"),
-            "days": return_info.get("returnDays"),
-            "policy_text": return_info.get("returnDescription"),
-            "policy_link": return_info.get("returnLinkUrl"),
-        }
-    else:
-        detail["returns"] = None
 
-    # Reviews
-    detail["rating"] = get_from_json(product_data, ["reviewsAndRatings", "avgRating"])
+def index_variant_info(variant_info: list | None) -> dict[tuple[Any, Any], list[dict]]:
+    """Maps every `(name, value)` pair of `variantInfoMap` to the variant infos carrying it, in order."""
 
-    # Total Ratings
-    detail["total_ratings"] = get_from_json(product_data, ["reviewsAndRatings", "numReviews"])
+    index: dict[tuple[Any, Any], list[dict]] = {}
+    for info in variant_info or []:
+        for variant_value_info in info.get("values", []):
+            key = (variant_value_info.get("name"), variant_value_info.get("value"))
+            index.setdefault(key, []).append(info)
+    return index
 
-    # Total Reviews
-    detail["total_reviews"] = get_from_json(product_data, ["reviewsAndRatings", "numReviews"])
 
-    # Variants
-    variant_options = get_from_json(product_data, ["variantSummary", "variantCriteria"]) or []
-    variant_info = get_from_json(product_data, ["variantSummary", "variantInfoMap"]) or []
+def parse_variants(variant_options: list | None, variant_info: list | None) -> list:
+    variant_index = index_variant_info(variant_info)
 
     variants = []
-    for option in variant_options:
+    for option in variant_options or []:
         option_type = option.get("name")
         for value in option.get("values", []):
             variant_value = value.get("value")
             variant_image = value.get("imageUrl")
 
-            # Find matching variant info
-            for info in variant_info:
-                for variant_value_info in info.get("values", []):
-                    if (
-                        variant_value_info.get("name") == option_type
-                        and variant_value_info.get("value") == variant_value
-                    ):
-                        variants.append(
-                            {
-                                "type": option_type,
-                                "name": variant_value,
-                                "sku_id": info.get("variantSkuId"),
-                                "family_sku_id": info.get("variantItemGroupId"),
-                                "image_url": variant_image,
-                            }
-                        )
-
-    detail["variants"] = variants
-
-    # Breadcrumbs
-    detail["breadcrumbs"] = None
-    breadcrumbs = get_from_json(product_data, ["category", "breadcrumbs"])
-    if breadcrumbs:
-        detail["breadcrumbs"] = [
-            {
-                "name": get_from_json(a, ["displayName"]),
-                "url": get_from_json(a, ["seoUrl"]),
-                "nav_id": get_from_json(a, ["navId"]),
-            }
-            for a in breadcrumbs
-        ]
-
-    dict_details["detail"] = detail
-    dict_details["remaining_credits"] = None
-
-    return dict_details
-
-
-def parse_detail_api(html_content: str) -> dict[str, Any]:
-    page_elem = BeautifulSoup(html_content, "html.parser")
-    dict_details: dict[str, Any] = {}
-
-    html_json_data = {}
-    html_product_data = {}
-    script_elem = page_elem.select_one("script#tb-djs-wml-redux-state")
-    if script_elem is not None:
-        json_data_str = script_elem.text
-        html_json_data: dict = json.loads(json_data_str)
-
-        html_products_data: dict = html_json_data.get("cache", {}).get("products", {})
-        if html_products_data:
-            html_product_data = list(html_products_data.values())[0]
-
-    product_id = get_from_json(html_product_data, ["productId"])
-    api_resp_data = get_products_from_api(product_id=product_id)
-    product_data = {}
-    image_data = []
-    messages_data = []
-    if api_resp_data.get("status") == "SUCCESS":
-        product_data = get_from_json(api_resp_data, ["payload", "products", 0])
-        product_images: dict = html_json_data.get("productImages", {})
-        image_data = (list(product_images.values())[0]).get("images", [])
-        messages_data: list = product_data.get("messages", [])
-
-    # Success
-    dict_details["success"] = True
-
-    # Url
-    canonical_elem = page_elem.select_one("link[rel=canonical]")
-    dict_details["url"] = canonical_elem.attrs.get("href") if canonical_elem else None
-
-    # Result Count
-    dict_details["result_count"] = 1
-
-    detail: dict[str, Any] = {}
-
-    # Name
-    detail["name"] = get_from_json(product_data, ["descriptors", "name"])
-
-    # Brand
-    detail["brand"] = get_from_json(product_data, ["manufacturingInfo", "brand"])
-
-    # Url
-    detail["url"] = dict_details.get("url")
+            # Join against the matching variant infos
+            for info in variant_index.get((option_type, variant_value), []):
+                variants.append(
+                    {
+                        "type": option_type,
+                        "name": variant_value,
+                        "sku_id": info.get("variantSkuId"),
+                        "family_sku_id": info.get("variantItemGroupId"),
+                        "image_url": variant_image,
+                    }
+                )
+    return variants
+
+
+# Detail fields, evaluated against the html-embedded or the api product data (`data`),
+# the html-embedded images (`images`) and the page head (`page`)
+DETAIL_SPEC = FieldSpec(
+    [
+        Field("name", path=["descriptors", "name"]),
+        Field("brand", path=["manufacturingInfo", "brand"]),
+        Field("url", selector="link[rel=canonical]", attr="href", source="page"),
+        Field("highlights", path=["descriptors", "shortDescription"], transform=parse_highlights),
+        Field("description", path=["descriptors", "longDescription"], transform=parse_html_as_str),
+        Field("product_id", path=["productId"]),
+        Field("sku_id", path=["skus", 0, "skuId"]),
+        Field("upc", path=["skus", 0, "onlineOffer", "generatedUPC"]),
+        Field("gtin", path=["skus", 0, "onlineOffer", "gtin"]),
+        Field("item_no", path=["skus", 0, "onlineOffer", "itemNumber"]),
+        Field("model_no", path=["manufacturingInfo", "model"]),
+        Field("main_image", path=[0, "ImageUrl"], source="images"),
+        Field("images", path=[], source="images", transform=lambda images: [data.get("ImageUrl") for data in images]),
+        Field("price", path=["skus", 0, "onlineOffer", "price", "finalPrice", "amount"]),
+        Field("list_price", path=["skus", 0, "onlineOffer", "price", "startPrice", "amount"]),
+        Field("price_per_unit", path=["skus", 0, "onlineOffer", "price", "unitPrice", "amount"]),
+        Field("currency", path=["skus", 0, "onlineOffer", "price", "startPrice", "currency"]),
+        Field("_weight", path=["skus", 0, "skuLogistics", "weight"]),
+        Field("weight", inputs=["_weight"], transform=parse_weight),
+        Field("weight_data", inputs=["_weight"], transform=parse_weight_data),
+        Field("_logistics", path=["skus", 0, "skuLogistics"]),
+        Field("dimensions", inputs=["_logistics"], transform=parse_dimensions),
+        Field("dimensions_data", inputs=["_logistics"], transform=parse_dimensions_data),
+        Field(
+            "buying_offers",
+            path=["skus", 0, "onlineOffer", "price", "savings"],
+            transform=lambda savings: SAVINGS_PATHS.extract(savings) if savings else None,
+        ),
+        Field("_specifications", path=["manufacturingInfo", "specification"], transform=parse_specifications),
+        Field("specifications", inputs=["_specifications"], transform=lambda specs: specs[0]),
+        Field("additional_details", inputs=["_specifications"], transform=lambda specs: specs[1]),
+        Field("_messages", path=["messages"]),
+        Field("_shipping_info", path=["shippingOption", "info"]),
+        Field("shipping_info", inputs=["_shipping_info", "_messages"], transform=parse_shipping_info),
+        Field("warranty", path=["manufacturingInfo", "warranty"], transform=parse_html_as_str),
+        Field("country_of_origin", path=["manufacturingInfo", "componentCountry"]),
+        Field("assembled_in", path=["manufacturingInfo", "assembledCountry"]),
+        Field("curbside_pickup", inputs=["_messages"], transform=parse_curbside_pickup),
+        Field("returns", path=["skus", 0, "returnInfo"], transform=parse_returns),
+        Field("rating", path=["reviewsAndRatings", "avgRating"]),
+        Field("total_ratings", path=["reviewsAndRatings", "numReviews"]),
+        Field("total_reviews", path=["reviewsAndRatings", "numReviews"]),
+        Field("_variant_criteria", path=["variantSummary", "variantCriteria"]),
+        Field("_variant_info_map", path=["variantSummary", "variantInfoMap"]),
+        Field("variants", inputs=["_variant_criteria", "_variant_info_map"], transform=parse_variants),
+        Field(
+            "breadcrumbs",
+            path=["category", "breadcrumbs"],
+            transform=lambda breadcrumbs: [BREADCRUMB_PATHS.extract(a) for a in breadcrumbs] if breadcrumbs else None,
+        ),
+    ]
+)
+
+
+# Fields read from the page head or the html-embedded images, which `parse_detail_api` has without calling the api
+PAGE_FIELDS = frozenset(name for name, field in DETAIL_SPEC.fields.items() if field.source != "data")
+
+
+def build_details(
+    page_elem: BeautifulSoup,
+    product_data: dict,
+    image_data: list,
+    fields: set[str] | None = None,
+) -> dict[str, Any]:
+    # The canonical url is always resolved for the result envelope
+    names = None if fields is None else set(fields) | {"url"}
+    detail = DETAIL_SPEC.extract({"data": product_data, "images": image_data, "page": page_elem}, names)
+    url = detail["url"] if wants(fields, "url") else detail.pop("url")
+    return {
+        "success": True,
+        "url": url,
+        "result_count": 1,
+        "detail": detail,
+        "remaining_credits": None,
+    }
 
-    # Highlight
-    detail["highlights"] = None
-    highlight_text = get_from_json(product_data, ["descriptors", "shortDescription"])
-    parsed_data = parse_html_as_data(highlight_text)
-    if parsed_data:
-        detail["highlights"] = parsed_data[0]
 
-    # Description
-    detail["description"] = parse_html_as_str(get_from_json(product_data, ["descriptors", "longDescription"]))
+@profiled("samsclub")
+def parse_detail(html_content: str | bytes, fields: set[str] | None = None) -> dict[str, Any]:
+    mark("head_tags")
+    page_elem = parse_head_tags(html_content)
 
-    # Product ID
-    detail["product_id"] = get_from_json(product_data, ["productId"])
+    mark("redux_state")
+    product_data, image_data = read_redux_state(html_content)
 
-    # SKU
-    detail["sku_id"] = get_from_json(product_data, ["skus", 0, "skuId"])
+    mark("fields")
+    return build_details(page_elem, product_data, image_data, fields)
 
-    # UPC
-    detail["upc"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "generatedUPC"])
 
-    # GTIN
-    detail["gtin"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "gtin"])
+def read_redux_state(html_content: str | bytes) -> tuple[dict, list]:
+    """The product and its images from the page's embedded redux state."""
 
-    # Item Number
-    detail["item_no"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "itemNumber"])
+    product_data = {}
+    image_data = []
+    json_data_str = extract_script_text(html_content, "tb-djs-wml-redux-state")
+    if json_data_str is not None:
+        json_data: dict = json.loads(json_data_str)
+        products_data: dict = json_data.get("cache", {}).get("products", {})
+        product_data = list(products_data.values())[0]
+        product_images: dict = json_data.get("productImages", {})
+        image_data = (list(product_images.values())[0]).get("images", [])
+    return product_data, image_data
+
+
+def embedded_age(product_data: dict, now: float) -> float | None:
+    """Seconds between rendering the embedded product and `now`, or None when it has no usable `expiresAt`."""
+
+    expires_at = get_from_json(product_data, ["expiresAt"])
+    try:
+        return now - datetime.fromisoformat(expires_at).timestamp() + EMBEDDED_TTL
+    except (TypeError, ValueError):
+        return None
+
+
+def get_live_product(product_id: str) -> dict | None:
+    """The api product, from `VIVALDI_CACHE` while it is fresh, otherwise fetched like `parse_detail_api` does.
+
+    None when the api fails or does not have the product.
+    """
+
+    product = VIVALDI_CACHE.get(product_id)
+    if product is None:
+        try:
+            if VIVALDI_CLIENT is not None:
+                api_resp_data = VIVALDI_CLIENT.get(product_id)
+            else:
+                api_resp_data = get_products_from_api(product_id=product_id)
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"vivaldi request for {product_id} failed: {type(e).__name__}: {e}")
+            return None
+        if api_resp_data.get("status") != "SUCCESS":
+            return None
+        product = get_from_json(api_resp_data, ["payload", "products", 0])
+        if product:
+            VIVALDI_CACHE.put(product_id, product)
+    return product
+
+
+def graft(product_data: dict, live_product: dict, path: list[str | int]) -> None:
+    """Copies the value at `path` of `live_product` into `product_data`, at the deepest level the latter already has.
+
+    An embedded sku without an `onlineOffer` gets the api's whole offer; values the api lacks are left alone.
+    """
+
+    for depth in range(len(path), 0, -1):
+        parent = get_from_json(product_data, path[: depth - 1])
+        if isinstance(parent, dict):
+            value = get_from_json(live_product, path[:depth])
+            if value:
+                parent[path[depth - 1]] = value
+            return
+
+
+@profiled("samsclub")
+def parse_detail_hybrid(
+    html_content: str | bytes,
+    fields: set[str] | None = None,
+    max_age: float = HYBRID_MAX_AGE,
+    now: float | None = None,
+) -> dict[str, Any]:
+    """`parse_detail`, with the offer's price taken from the api when the embedded one is missing, empty, or more than
+    `max_age` seconds old at `now` (the current time by default).
+
+    Everything else comes from the page, and a page captured moments ago needs no api call at all. When the api call
+    fails the embedded offer is kept, and the result's `stale` is set.
+    """
+
+    mark("head_tags")
+    page_elem = parse_head_tags(html_content)
+
+    mark("redux_state")
+    product_data, image_data = read_redux_state(html_content)
+
+    mark("api")
+    refresh_failed = False
+    product_id = get_from_json(product_data, ["productId"])
+    if product_id is not None and wants(fields, *LIVE_FIELDS):
+        age = embedded_age(product_data, time.time() if now is None else now)
+        stale = age is None or age > max_age
+        paths = [path for path in LIVE_PATHS if stale or not get_from_json(product_data, path)]
+        live_product = get_live_product(product_id) if paths else None
+        refresh_failed = bool(paths) and not live_product
+        for path in paths if live_product else []:
+            graft(product_data, live_product, path)
+
+    mark("fields")
+    result = build_details(page_elem, product_data, image_data, fields)
+    result["stale"] = refresh_failed
+    return result
+
+
+def redux_state_span(html_text: str) -> tuple[int, int] | None:
+    """Start and end of the page's redux state script, or None.
+
+    Scans for its keys stop there, before the products of carousels and recommendations further down the page.
+    """
+
+    start = html_text.find("tb-djs-wml-redux-state")
+    if start == -1:
+        return None
+    end = html_text.find("</script>", start)
+    return start, len(html_text) if end == -1 else end
+
+
+def parse_offer(html_content: str) -> dict[str, Any]:
+    """Price, savings and inventory of the page's product, decoded from its `onlineOffer` object alone.
+
+    The object is a couple of KB inside the redux state, so this skips both the soup and the full json decode.
+    Products sold in clubs only have no online offer and come back with just their id.
+    """
+
+    span = redux_state_span(html_content)
+    if span is None:
+        return {"product_id": None, **OFFER_PATHS.extract(None), "buying_offers": None}
+    product_id = PRODUCT_ID_PATTERN.search(html_content, *span)
+    offer_str = extract_json_value(html_content, '"onlineOffer":', *span)
+    offer = OFFER_PATHS.extract(json.loads(offer_str) if offer_str is not None else None)
+    savings = offer.pop("savings")
+    return {
+        "product_id": product_id.group(1) if product_id else None,
+        **offer,
+        "buying_offers": SAVINGS_PATHS.extract(savings) if savings else None,
+    }
 
-    # Model Number
-    detail["model_no"] = get_from_json(product_data, ["manufacturingInfo", "model"])
 
-    # Image
-    detail["main_image"] = get_from_json(image_data, [0, "ImageUrl"])
+@profiled("samsclub")
+def parse_detail_api(html_content: str | bytes, fields: set[str] | None = None) -> dict[str, Any]:
+    # The product data always comes from the api; only a projection of page and image fields skips the call
+    needs_api = fields is None or not set(fields) <= PAGE_FIELDS
 
-    # Images
-    detail["images"] = [data.get("ImageUrl") for data in image_data]
+    mark("head_tags")
+    page_elem = parse_head_tags(html_content)
 
-    # Price
-    detail["price"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "finalPrice", "amount"])
-    detail["list_price"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "startPrice", "amount"])
-    detail["price_per_unit"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "unitPrice", "amount"])
+    mark("redux_state")
+    html_json_data = {}
+    html_product_data = {}
+    json_data_str = extract_script_text(html_content, "tb-djs-wml-redux-state")
+    if json_data_str is not None:
+        html_json_data: dict = json.loads(json_data_str)
 
-    # Currency
-    detail["currency"] = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "startPrice", "currency"])
+        html_products_data: dict = html_json_data.get("cache", {}).get("products", {})
+        if html_products_data:
+            html_product_data = list(html_products_data.values())[0]
 
-    # Demensions & Weight
-    weight = get_from_json(product_data, ["skus", 0, "skuLogistics", "weight"])
-    if weight:
-        detail["weight"] = (
-            f"{weight.get('value')} {weight.get('unitOfMeasure')}"
-            if weight.get("value") and weight.get("unitOfMeasure")
-            else None
-        )
-        detail["weight_data"] = {"value": weight.get("value"), "unit": weight.get("unitOfMeasure")}
-    else:
-        detail["weight"] = None
-        detail["weight_data"] = None
-
-    # Additional Dimensions
-    logistics_data = get_from_json(product_data, ["skus", 0, "skuLogistics"])
-    if logistics_data:
-        length = logistics_data.get("length", {})
-        width = logistics_data.get("width", {})
-        height = logistics_data.get("height", {})
-
-        if (
-            length.get("value")
-            and length.get("unitOfMeasure")
-            and width.get("value")
-            and width.get("unitOfMeasure")
-            and height.get("value")
-            and height.get("unitOfMeasure")
-        ):
-            detail["dimensions"] = (
-                f"{length.get('value')}L x {width.get('value')}W x {height.get('value')}H "
-                f"{length.get('unitOfMeasure')}"
-            )
+    mark("api")
+    product_data = {}
+    api_success = True
+    if needs_api:
+        product_id = get_from_json(html_product_data, ["productId"])
+        if VIVALDI_CLIENT is not None:
+            api_resp_data = VIVALDI_CLIENT.get(product_id)
         else:
-            detail["dimensions"] = None
-
-        detail["dimensions_data"] = {
-            "box_count": logistics_data.get("numberOfBoxes"),
-            "length": {"value": length.get("value"), "unit": length.get("unitOfMeasure")},
-            "width": {"value": width.get("value"), "unit": width.get("unitOfMeasure")},
-            "height": {"value": height.get("value"), "unit": height.get("unitOfMeasure")},
-            "is_hazardous": logistics_data.get("hazardMaterial"),
-        }
-    else:
-        detail["dimensions"] = None
-        detail["dimensions_data"] = None
-
-    # Retailer Badge
-    savings = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "savings"])
-    if savings:
-        detail["buying_offers"] = {
-            "amount_saved": get_from_json(savings, ["savingsAmount"]),
-            "type": get_from_json(savings, ["memberPromotions", 0, "type"]),
-            "max_quantity": get_from_json(savings, ["householdLimit"]),
-            "start_date": get_from_json(savings, ["startDate"]),
-            "end_date": get_from_json(savings, ["endDate"]),
-        }
-    else:
-        detail["buying_offers"] = None
-
-    # Specifications
-    detail["specifications"] = None
-    detail["additional_details"] = []
-    specifications_text = get_from_json(product_data, ["manufacturingInfo", "specification"])
-    parsed_data = parse_html_as_data(specifications_text)
-
-    if parsed_data:
-        specs_list = []
-        for item in parsed_data:
-            # Handle dict-type specifications (from table)
-            if isinstance(item, dict):
-                for key, value in item.items():
-                    # Handle cases where values are lists/arrays
-                    if isinstance(value, list):
-                        # Add to additional_details as a name-value pair with list value
-                        detail["additional_details"].append({"name": key, "value": value})
-                    # If it's a section with list values (like Package Contents)
-                    elif key in item and isinstance(item[key], list):
-                        # Add to additional_details as a name-value pair with list value
-                        detail["additional_details"].append({"name": key, "value": item[key]})
-                    else:
-                        # Regular key-value pair
-                        specs_list.append({"name": key, "value": value})
-            # Handle list-type specifications (from ul/li)
-            elif isinstance(item, list):
-                for entry in item:
-                    # Try to split entries that might have a colon separator
-                    if ":" in entry:
-                        name, value = entry.split(":", 1)
-                        specs_list.append({"name": name.strip(), "value": value.strip()})
-                    else:
-                        specs_list.append({"name": "Feature", "value": entry.strip()})
-
-        if specs_list:
-            detail["specifications"] = specs_list
-
-        # If no additional_details found, remove the empty list
-        if not detail["additional_details"]:
-            del detail["additional_details"]
-
-    # Manufacturing Info
-    detail["shipping_info"] = []
-    detail["warranty"] = parse_html_as_str(get_from_json(product_data, ["manufacturingInfo", "warranty"]))
-    detail["country_of_origin"] = get_from_json(product_data, ["manufacturingInfo", "componentCountry"])
-    detail["assembled_in"] = get_from_json(product_data, ["manufacturingInfo", "assembledCountry"])
-    detail["shipping_info"].append(get_from_json(product_data, ["shippingOption", "info"]))
-
-    # Shipping
-    for message in messages_data:
-        if message.get("key") == "sidesheet.shipping.upsell.message":
-            detail["shipping_info"].append(parse_html_as_str(message.get("message")))
-            break
-
-    # Pickup
-    detail["curbside_pickup"] = None
-    for message in messages_data:
-        if message.get("key") == "channelbanner.pickup.message":
-            detail["curbside_pickup"] = parse_html_as_str(message.get("message", ""))
-            break
-
-    # Returns
-    return_info = get_from_json(product_data, ["skus", 0, "returnInfo"])
-    if return_info:
-        detail["returns"] = {
-            "location": return_info.get("returnLocation"),
-            "days": return_info.get("returnDays"),
-            "policy_text": return_info.get("returnDescription"),
-            "policy_link": return_info.get("returnLinkUrl"),
-        }
-    else:
-        detail["returns"] = None
-
-    # Reviews
-    detail["rating"] = get_from_json(product_data, ["reviewsAndRatings", "avgRating"])
-
-    # Total Ratings
-    detail["total_ratings"] = get_from_json(product_data, ["reviewsAndRatings", "numReviews"])
-
-    # Total Reviews
-    detail["total_reviews"] = get_from_json(product_data, ["reviewsAndRatings", "numReviews"])
-
-    # Variants
-    variant_options = get_from_json(product_data, ["variantSummary", "variantCriteria"]) or []
-    variant_info = get_from_json(product_data, ["variantSummary", "variantInfoMap"]) or []
-
-    variants = []
-    for option in variant_options:
-        option_type = option.get("name")
-        for value in option.get("values", []):
-            variant_value = value.get("value")
-            variant_image = value.get("imageUrl")
+            api_resp_data = get_products_from_api(product_id=product_id)
+        api_success = api_resp_data.get("status") == "SUCCESS"
+        if api_success:
+            product_data = get_from_json(api_resp_data, ["payload", "products", 0])
+    image_data = []
+    if api_success:
+        product_images: dict = html_json_data.get("productImages", {})
+        image_data = (list(product_images.values())[0]).get("images", [])
 
-            # Find matching variant info
-            for info in variant_info:
-                for variant_value_info in info.get("values", []):
-                    if (
-                        variant_value_info.get("name") == option_type
-                        and variant_value_info.get("value") == variant_value
-                    ):
-                        variants.append(
-                            {
-                                "type": option_type,
-                                "name": variant_value,
-                                "sku_id": info.get("variantSkuId"),
-                                "family_sku_id": info.get("variantItemGroupId"),
-                                "image_url": variant_image,
-                            }
-                        )
-
-    detail["variants"] = variants
-
-    # Breadcrumbs
-    detail["breadcrumbs"] = None
-    breadcrumbs = get_from_json(product_data, ["category", "breadcrumbs"])
-    if breadcrumbs:
-        detail["breadcrumbs"] = [
-            {
-                "name": get_from_json(a, ["displayName"]),
-                "url": get_from_json(a, ["seoUrl"]),
-                "nav_id": get_from_json(a, ["navId"]),
-            }
-            for a in breadcrumbs
-        ]
-
-    dict_details["detail"] = detail
-    dict_details["remaining_credits"] = None
-
-    return dict_details
+    mark("fields")
+    return build_details(page_elem, product_data, image_data, fields)
 
 
 def test_with_api() -> None:
@@ -1,32 +1,201 @@
-import requests
-
-url = "https://www.samsclub.com/api/node/vivaldi/browse/v2/products"
-
-payload = {
-    "productIds": ["P03005870"],
-    "type": "LARGE",
-    "clubId": ""
-}
-headers = {
-    "host": "www.samsclub.com",
-    "connection": "keep-alive",
-    "sec-ch-ua-platform": "\"macOS\"",
-    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36",
-    "accept": "application/json, text/plain, */*",
-    "sec-ch-ua": "\"Chromium\";v=\"134\", \"Not:A-Brand\";v=\"24\", \"Google Chrome\";v=\"134\"",
-    "content-type": "application/json",
-    "dnt": "1",
-    "sec-ch-ua-mobile": "?0",
-    "origin": "https://www.samsclub.com",
-    "sec-fetch-site": "same-origin",
-    "sec-fetch-mode": "cors",
-    "sec-fetch-dest": "empty",
-    "referer": "https://www.samsclub.com/p/tramontina-aluminum-fry-pans-set-of-3-assorted-colors/P03005870?xid=hpg_carousel_rich-relevance.product_0_3",
-    "accept-encoding": "gzip, deflate, br, zstd",
-    "accept-language": "en-GB,en-US;q=0.9,en;q=0.8",
-    "cookie": "SSLB=1; vtc=aD41JWyFA4SLLSagy1fqVk; SSRT1=rQjcZwADAA; s_ecid=MCMID%7C04132543087547887273693291396054216962; _gcl_au=1.1.1678157949.1742473390; _pxvid=161c7d9a-0586-11f0-9090-f8b63fea5150; QuantumMetricUserID=8f11bc5d66d17c3f5dfd98178071ee4f; SSID1=CQBCYh0cAAAAAACrCNxnWEdBFKsI3GcBAAAAAABXPb1pqwjcZwBjBk5YAQMMHSoAqwjcZwEA-lUBA7HjKQCrCNxnAQA; SSOD1=ADW3AAAAEgAYtGwAAQAAAK4I3GeuCNxnAQAAAA; samsathrvi=RVI~prod24380340; salsify_session_id=d43057a6-34a5-4b23-86bb-9f59dbe18af4; BVBRANDID=418ea085-f6ba-4825-92c4-a35d58d33ee8; __pxvid=166645fe-0586-11f0-8c6f-0242ac120002; acstkn=87:14#624975973#7=931678458_1742473391063; astract=ca-c796af40-e875-46a9-84e9-a6a0e67416a7; _mibhv=anon-1742473392979-6598855352_4591; rmStore=dmid:8096; _fbp=fb.1.1742473393332.164989035486725929; _tt_enable_cookie=1; _ttp=01JPSR3X7313V402K3QPH6WJ31_.tt.1; _pin_unauth=dWlkPU56azNaV05rWmpndFl6RTFNeTAwTXpBNExUZzRZekF0T0RKallUUTFNVGszWW1JMA; cto_bundle=NogYOl9tMjltaFhaV3dyOGJYaGkxQmdHdk5EaHFSVUhzOUh0OWZhdUFBdXZQSlN0RlR6dDhUWXJVRUFZdlN5N0pnUDZ1bmZNZURvVE5UdTJtQjlTeXdheDJ6ak81YXBiR01KVVQ0UFZwUzVUJTJGOEU4ZyUyQjlZNENHdUJTNGRHd3hjJTJGd2pmcjFzTVl5dkxXQUNHMDhTJTJGQ3dKUklpOFBYcG9Pc2c3JTJCdURqRGFxenc5S21rJTNE; _uetvid=17cfff60058611f0aeb7f5594c149de4; __gads=ID=3d38cf714f3aa417:T=1742473394:RT=1742473394:S=ALNI_Mb1pbZR33UjUXVGMqHCi8q4IjCBFg; __gpi=UID=0000106a8a4ce673:T=1742473394:RT=1742473394:S=ALNI_Ma-ZtGZ2vTdHrhgirm2luAu6NtFMw; __eoi=ID=7992908a68822ab3:T=1742473394:RT=1742473394:S=AA-AfjY9d9SC2tuBOVpG3RqEJ8ut; sxp-rl-SAT_CME-rn=69; sxp-rl-SAT_DISABLE_SYN_PREQUALIFY-rn=29; sxp-rl-SAT_GEO_LOC-rn=46; sxp-rl-SAT_NEW_ORDERS_UI-rn=38; sxp-rl-SAT_ORDER_REPLACEMENT-rn=72; sxp-rl-SAT_REORDER_V4-rn=62; sxp-rl-SCR_CANCEL_ORDER_V3-rn=83; sxp-rl-SCR_CANRV4-rn=47; sxp-rl-SCR_NEXT3-rn=46; sxp-rl-SCR_OHLIMIT-rn=58; sxp-rl-SCR_SHAPEJS-rn=99; sxp-rl-SCR_VERIFICATION_V4-rn=4; sxp-rl-SAT_ADD_ITEM-rn=12; sxp-rl-SCR_SCRE-rn=6; sxp-rl-SCR_TII-rn=35; SAT_WPWCNP=1; bstc=RJSIW93r1sJp0gOWgaTVQA; xpa=t5Tz_; exp-ck=t5Tz_1; SAT_NEO_EXPO=1; sxp-rl-SAT_CME-c=r|1|100; SAT_CME=1; sxp-rl-SAT_DISABLE_SYN_PREQUALIFY-c=r|1|0; SAT_DISABLE_SYN_PREQUALIFY=0; sxp-rl-SAT_GEO_LOC-c=r|1|50; SAT_GEO_LOC=1; sxp-rl-SAT_NEW_ORDERS_UI-c=r|1|0; SAT_NEW_ORDERS_UI=0; sxp-rl-SAT_ORDER_REPLACEMENT-c=r|1|0; SAT_ORDER_REPLACEMENT=0; sxp-rl-SAT_REORDER_V4-c=r|1|0; SAT_REORDER_V4=0; sxp-rl-SCR_CANCEL_ORDER_V3-c=r|1|0; SCR_CANCEL_ORDER_V3=0; sxp-rl-SCR_CANRV4-c=r|1|100; SCR_CANRV4=1; sxp-rl-SCR_NEXT3-c=r|1|100; SCR_NEXT3=1; sxp-rl-SCR_OHLIMIT-c=r|1|0; SCR_OHLIMIT=0; sxp-rl-SCR_SHAPEJS-c=r|1|0; SCR_SHAPEJS=0; sxp-rl-SCR_VERIFICATION_V4-c=r|1|0; SCR_VERIFICATION_V4=0; sxp-rl-SAT_ADD_ITEM-c=r|1|100; SAT_ADD_ITEM=1; sxp-rl-SCR_SCRE-c=r|1|100; SCR_SCRE=1; sxp-rl-SCR_TII-c=r|1|100; SCR_TII=1; xpm=1%2B1742881871%2BaD41JWyFA4SLLSagy1fqVk~%2B1; sams-pt=eyJ4NXQiOiJzOXN6ZUptWldjMWhRYktIOUVqSmNoOUZkTkEiLCJraWQiOiJCM0RCMzM3ODk5OTk1OUNENjE0MUIyODdGNDQ4Qzk3MjFGNDU3NEQwIiwidHlwIjoiSldUIiwiYWxnIjoiUlMyNTYifQ.eyJleHQiOiI4SkZtWW1KbE1HRTBNREV4T0dFNVkyUm1ZbUptTURGaU0yTXpOakk0TnpFME56Qm1OalUxWVRZMVlXWTJOekprTlRBMlpqa3daamsyTnpBeU9XVTRPV0ZpT1RnME5XWmhPVFpqWVRFNFlqTmpNRFUzWmpkak5UTTVZVEZrTkRrd1kyWmpZVE14Wm1NNFlUSmlOREJsWldWa1l6UmxZVGM1WVRNNE4yWTVNalkyTW1NM01tWXlNV0V5TmpReFlXWm1PVEkyTURNelpqazFZams1WldKaU5UZ3oiLCJ2ZXIiOiIxLjAiLCJjaGkiOiJkZXNrdG9wIiwiZmJ0IjpmYWxzZSwiYWhiIjp7InYiOnRydWUsInAiOltdfSwib3ZyZCI6ZmFsc2UsInNoYSI6eyJ2Ijp0cnVlLCJwIjpbXX0sImV4cCI6MTc0Mjg4NTQ3NCwiaWF0IjoxNzQyODgxODc0LCJuYmYiOjE3NDI4ODE4NzQsImlzcyI6Imh0dHBzOi8vdGl0YW4uc2Ftc2NsdWIuY29tL2M4Y2MwNzBlLWRmZWQtNDVjOS1iZGE1LTI5ZDAwMTIxYWNiYi92Mi4wLyIsImp0aSI6IjM2OGM2MTdjLTQ4NTEtNDhmYy1hYmI1LTg0NjEwZmNhNDJkMiJ9.VzfSJ7tjdLYaRUTerjWtoIt1CS0JMJF07Q6eOsOSAirToeWdq-c4OzhdJUE-pDiFlEalva2wN96chflTMw7FWCdQC_mdVyqRyyDatFL8C0KPF8W4nifW_mMTdPOHp3DX5THJfdDXQl43CDFx9yJ5Ql7qKvX-WCz5aN7sL7DU-evCCSozOIge9JkyHjYJ8qWeSOgerSvNSDOu9-_sv2Pknw7vqO8D4HpULKkaiBsDOt1wcP_yXw4c02iHfqxhhi_nOWA9O7z3yixU4_SYVPvbDFNOWor4JZmI9XZZKPiwWjY61qcHGfzA1HI04cWw6693TVpuue_rIA-x9TtOn3lhw96B_ghmfNfG1XckHL37bXRpBg4JUFMw_R7vJ2NrXP9fynrXeD57dsR0qPC7-fLbEnrFWwNtTbJIOppIMpKgZh91xVKVxCoS40wT7CAhliSiuift2z5dG93MK74l0zVEdK6ubEgpHbgD9a1Y6qWYoddpgOapC5Lv8BDshCPPmYcbNhgS6LLSgEw72DhjT-WKgJEpjmpA6Yt9UbA5s6rKFPJbvY_Y1nuUMSflhZ_RIZ4A3MC18-IGFAsoorO6X_d6tZ-KqbozGxEyg8d_ESRk5eHM2seca2kd7iYVRvRqAw8dtD1byInGH7PYMD3hqhJfGbteVzKmg1MbH-YRcGl9b28; ak_bmsc=AC9176AAD2678EF6C1FB47331C2FB53A~000000000000000000000000000000~YAAQ0WncF/yPU6iVAQAAIObayxs+0nEBCbsE2socx2OmAyqUfG4uVrANvmimznpQSLpsBmPfe3EDrmKiXa4kLGQ7lzGbGpiIZZHBGrgM2749gM0o8y/+wS03SM3/IOyY9wG/W36mBJQlFV+qxkl0DKmbC2f5f3/MvqwcXd8qgbG9TPqiEFgiSXcujldXffMAWPndTDAQ0/jH33WLNiMq/ff2NK/f6UnLShjh8nHnm7S+RympqroxBPRNBSFEXyYgz+CuIrzLElr+el+wCeBxeb56UwNjeiU/1CF51o+Pizmg0MW6cCuJDvxQYKzb9MxAQiOl2lKaKgrsYQMrg+RK3xQTornQugA6aHIR8MKjiW/eTiZLd8T+eq8uDuXZGiGu+qe+tKplmPtqp0Mw9i8FUDs=; xptwj=js:12d22df6f93b87a2737d:CvjLSnK9UWS8sTWH529x7tFB5nHpYUNozfUw/gmDgsiDUYv48E+zyJSkC+jyPxhIk++15esXWYOUdUlXv7HWaIgRoz6Dl13zN0FRnmwbJy37Vaynu54=; rcs=eF5jYSlN9rA0T0m2TDQx0jUys0jRNUkzM9M1MDE0AbFMzY3SzCyN04y5cstKMlMEDM2NzXQNdQ0BiSINwQ; AMCVS_B98A1CFE53309C340A490D45%40AdobeOrg=1; AMCV_B98A1CFE53309C340A490D45%40AdobeOrg=1585540135%7CMCIDTS%7C20173%7CMCMID%7C04132543087547887273693291396054216962%7CMCAAMLH-1743486677%7C7%7CMCAAMB-1743486677%7CRKhpRz8krg2tLO6pguXWp5olkAcUniQYPHaMWWgdJ3xzPWQmdj0y%7CMCOPTOUT-1742889077s%7CNONE%7CMCAID%7CNONE%7CvVersion%7C4.4.0; s_cc=true; pxcts=2bce2a7c-093d-11f0-a1d6-d163d12456bd; bm_sv=0D1DBF4EE05CA147B4144066D053FD5F~YAAQ0WncFxyTU6iVAQAABvLayxvPzNs/thnc5wxDjCpUancDaQelL8azXNjb3/zPnyOa7mFjR/nOCvxjUJKAP876uCsWCvBaXUahoQlbvT+Go8e0xG/InEe+JnG5TRiI2fAWpR0DfiroEXYbmNrR5ePPnaJUbP2dL1QkxsxBiYTyqvq6GlZqrUVBvFs1LjCDBHtjGuKIIX8YnjiLIEVelYw4TeBDgn+/WCFMiOrYaqZPI3sreenABTrRGE285lk3byk=~1; _px3=07829f49e7f8450fa334b3eee011cac34d4ebd42eb021dfcd1ddca43fa23993c:xCo5X9gxRRYEIwFdhKPUY6XmFQGOnP7VgFsdQBLNc/uWQcyMtVi7GZzRS9zO/YSQi2S5ItNFQub9oE+Tu5dbqA==:1000:CYoTt/Lef32YfD61c6bMDk5MHcYdR8R6vT1Pu2xTMrTmq59ZH9VZLSwO1J//v0XOO42fXLesBFPNUvEkgKF/Y/hpb7CyDX0saLsWNv8sPP8lkf2/UVX4CbcYtXxZamLnfURrr47P1FiYBrGxT6G/bJ/2a8H2f8QrhJL4KEH3sYyDS4qzOAAubd/9A9KnZrTMajnIN/worIrN7Mw7SPMZFJxr9Qwc8SUzK/RiUew8J5k=; s_sq=samclub3prod%3D%2526c.%2526a.%2526activitymap.%2526page%253Dhomepage%2526link%253DInstant%252520Savings%252520Tramontina%2525203-Piece%252520Nonstick%252520Fry%252520Pan%252520Set%25252C%252520Choose%252520Color%252520%2525281882%252529%252520%2525246%252520off%252520%25252429.84%252520Previous%252520price%25253A%252520%25252429.84%252520From%252520CURRENT%252520P%2526region%253Dmain%2526pageIDType%253D1%2526.activitymap%2526.a%2526.c%2526pid%253Dhomepage%2526pidt%253D1%2526oid%253Dhttps%25253A%25252F%25252Fwww.samsclub.com%25252Fp%25252Ftramontina-aluminum-fry-pans-set-of-3-assorted-colors%25252FP03005870%25253Fxid%25253Dhpg_c%2526ot%253DA; QuantumMetricSessionID=bbf98e34ac6e6b4b58da2dced3efde4f; _pxde=6f301d72749dcb3da7c2308acef4df5942fbfb1945e1e351145abe37dc391636:eyJ0aW1lc3RhbXAiOjE3NDI4ODE4ODIxNzJ9; seqnum=4; TS017c4a41=0181c636c19af7dcaf60fc876389b9cf95056dccb5f168a8d18a6d893f5a9e91db83c32cc1b621b65f77e067bb31780e20b09873dc; TS01b1959a=0181c636c19af7dcaf60fc876389b9cf95056dccb5f168a8d18a6d893f5a9e91db83c32cc1b621b65f77e067bb31780e20b09873dc; TS017260c8=0181c636c19af7dcaf60fc876389b9cf95056dccb5f168a8d18a6d893f5a9e91db83c32cc1b621b65f77e067bb31780e20b09873dc; TSbdf847b3027=08eb9900a5ab2000ae56f776b27f011377fbb5ff488ed5473a2c52f8aaf0b97cab8e4c3f863a10a8080bbd6d1f11300090fd22d7981d51300ed644cb7b25bb9607b3e45edf3855b330814690a7137722c89a1117d7a2bab460062a382c2d3e4d; akavpau_P1_Sitewide=1742882483~id=46e3490966efc42edbccf8b9e0514be6"
-}
-
-response = requests.post(url, json=payload, headers=headers)
-
-print(response.text)
\ No newline at end of file
+"""Exercises the vivaldi products api clients of `parse_samsclub`.
+
+    python 1.samsclub/samsclub-vivaldi-product-api.py [--copies 5] [--batch-size 20] [--flush-after 0.05]
+    python 1.samsclub/samsclub-vivaldi-product-api.py --live P03005870
+
+By default a local stand-in answers for any product ids with the recorded browse response, at `--latency` per
+request and at most `MAX_IDS` ids per request. Every Sam's Club fixture, `--copies` times over, then goes through
+`parse_detail_api` once with one request per page and once from `--workers` threads sharing a `VivaldiBatcher`.
+Both runs must give the same results.
+
+`parse_detail_hybrid` then refreshes every fixture once, with the stand-in serving the page's own embedded product
+one dollar dearer: at the time the page was captured, where only pages without an online offer need the api, then
+`HYBRID_MAX_AGE` later, twice, the second time from `VIVALDI_CACHE`, and last with the api unreachable, where every
+page keeps its embedded offer and is marked `stale`. `--live` posts the given ids to samsclub.com instead and prints
+the response.
+"""
+
+import argparse
+import copy
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import parse_samsclub
+from parse_samsclub import (
+    VivaldiBatcher,
+    get_products_from_api,
+    parse_detail,
+    parse_detail_api,
+    parse_detail_hybrid,
+    parse_offer,
+    read_redux_state,
+)
+from utils.json_path import get_from_json
+from utils.replay_server import ReplayServer
+
+CUR_DIR = Path(__file__).parent
+recorded_path = CUR_DIR / "samsclub-product-vivaldi-browse.json"
+
+COPIES = 5
+LATENCY = 0.1
+WORKERS = 32
+# Ids the stand-in takes per request before it answers 400
+MAX_IDS = 50
+
+
+class Vivaldi:
+    """Answers every requested id with its product in `live`, or else a copy of the recorded one renamed to it."""
+
+    def __init__(self) -> None:
+        with recorded_path.open("r", encoding="utf-8") as recorded_file:
+            self.recorded = json.load(recorded_file)
+        self.live: dict[str, dict[str, Any]] = {}
+        self.ids_requested = 0
+
+    def route(self, path: str, query: dict[str, list[str]], body: Any) -> tuple[int, Any]:
+        product_ids = (body or {}).get("productIds") or []
+        if len(product_ids) > MAX_IDS:
+            return 400, {"status": "ERROR", "payload": {"messages": [f"at most {MAX_IDS} productIds"]}}
+        self.ids_requested += len(product_ids)
+
+        response = copy.deepcopy(self.recorded)
+        product = response["payload"]["products"][0]
+        response["payload"]["products"] = [
+            self.live.get(product_id) or dict(product, productId=product_id) for product_id in product_ids
+        ]
+        return 200, response
+
+
+def load_pages() -> list[tuple[float, str]]:
+    """The capture time, read off the file name, and content of every fixture with a product."""
+
+    pages = []
+    for html_path in sorted(CUR_DIR.glob("samsclub_detail_*.html")):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            html_content = html_file.read()
+        if parse_offer(html_content)["product_id"] is not None:
+            captured_at = datetime.strptime(html_path.stem, "samsclub_detail_%Y-%m-%d_%H-%M-%S")
+            pages.append((captured_at.replace(tzinfo=timezone.utc).timestamp(), html_content))
+    return pages
+
+
+def dearer_product(html_content: str) -> dict[str, Any]:
+    product_data, _ = read_redux_state(html_content)
+    final_price = get_from_json(product_data, ["skus", 0, "onlineOffer", "price", "finalPrice"])
+    if final_price:
+        final_price["amount"] += 1
+    return product_data
+
+
+def check_hybrid(server: ReplayServer, vivaldi: Vivaldi, pages: list[tuple[float, str]]) -> int:
+    """Runs the hybrid refreshes; returns how many results came from the wrong source."""
+
+    vivaldi.live = {}
+    for _, html_content in pages:
+        product_data = dearer_product(html_content)
+        vivaldi.live[product_data["productId"]] = product_data
+    parse_samsclub.VIVALDI_CACHE.clear()
+
+    mismatches = 0
+    for name, age in (("at capture", 0), ("stale", parse_samsclub.HYBRID_MAX_AGE + 1), ("stale again", None)):
+        server.reset_counters()
+        for captured_at, html_content in pages:
+            offset = parse_samsclub.HYBRID_MAX_AGE + 1 if age is None else age
+            result = parse_detail_hybrid(html_content, now=captured_at + offset)
+            detail = result["detail"]
+            embedded = parse_detail(html_content)["detail"]
+            expected = embedded["price"] + 1 if age != 0 and embedded["price"] is not None else embedded["price"]
+            if detail["price"] != expected or detail["name"] != embedded["name"] or result["stale"]:
+                mismatches += 1
+                logger.error(f"{detail['product_id']} {name}: price {detail['price']}, expected {expected}")
+        logger.info(f"hybrid {name:<12} {len(pages)} pages, {server.requests:>3} requests")
+
+    parse_samsclub.VIVALDI_CACHE.clear()
+    base_url = parse_samsclub.SAMSCLUB_URL
+    # Nothing listens on the discard port
+    parse_samsclub.SAMSCLUB_URL = "http://127.0.0.1:9"
+    try:
+        for captured_at, html_content in pages:
+            result = parse_detail_hybrid(html_content, now=captured_at + parse_samsclub.HYBRID_MAX_AGE + 1)
+            detail = result["detail"]
+            expected = parse_detail(html_content)["detail"]["price"]
+            if detail["price"] != expected or not result["stale"]:
+                mismatches += 1
+                logger.error(f"{detail['product_id']} api down: price {detail['price']}, stale {result['stale']}")
+    finally:
+        parse_samsclub.SAMSCLUB_URL = base_url
+    logger.info(f"hybrid {'api down':<12} {len(pages)} pages")
+    return mismatches
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Compare per-page and batched vivaldi product requests.")
+    arg_parser.add_argument("--live", nargs="+", metavar="PRODUCT_ID", help="post these ids to samsclub.com")
+    arg_parser.add_argument("--copies", type=int, default=COPIES, help="times every fixture is parsed")
+    arg_parser.add_argument("--batch-size", type=int, default=parse_samsclub.VIVALDI_BATCH_SIZE)
+    arg_parser.add_argument("--flush-after", type=float, default=parse_samsclub.VIVALDI_FLUSH_AFTER)
+    arg_parser.add_argument("--workers", type=int, default=WORKERS, help="threads parsing pages concurrently")
+    arg_parser.add_argument("--latency", type=float, default=LATENCY, help="seconds added to every response")
+    args = arg_parser.parse_args()
+
+    if args.live:
+        if len(args.live) == 1:
+            print(json.dumps(get_products_from_api(args.live[0]), indent=2))
+        else:
+            with VivaldiBatcher(args.batch_size, args.flush_after) as batcher:
+                futures = [batcher.submit(product_id) for product_id in args.live]
+                batcher.flush()
+                print(json.dumps([future.result() for future in futures], indent=2))
+        return
+
+    pages = [html_content for _, html_content in load_pages()] * args.copies
+    vivaldi = Vivaldi()
+    with ReplayServer({parse_samsclub.VIVALDI_PRODUCTS_PATH: vivaldi.route}, latency=args.latency) as server:
+        parse_samsclub.SAMSCLUB_URL = server.base_url
+
+        runs = []
+        server.reset_counters()
+        start = time.perf_counter()
+        serial = [parse_detail_api(html_content) for html_content in pages]
+        runs.append((time.perf_counter() - start, server.requests, server.connections, serial))
+
+        server.reset_counters()
+        start = time.perf_counter()
+        with VivaldiBatcher(args.batch_size, args.flush_after, server.base_url) as batcher:
+            parse_samsclub.VIVALDI_CLIENT = batcher
+            try:
+                with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                    batched = list(executor.map(parse_detail_api, pages))
+            finally:
+                parse_samsclub.VIVALDI_CLIENT = None
+        runs.append((time.perf_counter() - start, server.requests, server.connections, batched))
+
+        hybrid_mismatches = check_hybrid(server, vivaldi, load_pages())
+
+    logger.info(f"{len(pages)} pages, {args.latency * 1000:.0f}ms per request")
+    logger.info(f"{'':<10} {'s':>7} {'requests':>9} {'connections':>12}")
+    for name, (elapsed, requests, connections, _) in zip(("per page", "batched"), runs):
+        logger.info(f"{name:<10} {elapsed:>7.2f} {requests:>9} {connections:>12}")
+
+    if any(results != runs[0][3] for *_, results in runs):
+        logger.error("results differ between the runs")
+        sys.exit(1)
+    if hybrid_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from parse_bedbathbeyond import split_description
+from utils.json_path import get_from_json
+from utils.script_tags import extract_script_text
+
+CUR_DIR = Path(__file__).parent
+
+REPEAT = 20
+
+
+def split_description_reparsed(desc_str: str) -> tuple[str, list[str], list[str]]:
+    """The previous walker, which re-parses every child node, kept as the reference."""
+
+    features = []
+    dimensions = []
+    description = ""
+    status = "details"
+    desc_elem = BeautifulSoup(desc_str, "html.parser")
+    for child in desc_elem.contents:
+        if isinstance(child, str):
+            continue
+        if child.text.strip().lower() == "features:":
+            status = "features"
+        elif child.text.strip().lower() == "dimensions:":
+            status = "dimensions"
+        elif status == "details":
+            child_elem = BeautifulSoup(str(child), "html.parser")
+            if child_elem.text.strip() == "":
+                continue
+            description += child_elem.text + "\n"
+        elif status == "features":
+            child_elem = BeautifulSoup(str(child), "html.parser")
+            elems = child_elem.select("li")
+            features = [elem.text.strip() for elem in elems]
+        elif status == "dimensions":
+            child_elem = BeautifulSoup(str(child), "html.parser")
+            elems = child_elem.select("li")
+            dimensions = [elem.text.strip() for elem in elems]
+    return description, features, dimensions
+
+
+def best_of(func, *args) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    logger.info(f"{'fixture':<45} {'chars':>6} {'reparsed ms':>12} {'in place ms':>12}")
+    for html_path in sorted(CUR_DIR.glob("bedbathbeyond_detail_*.html")):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            html_content = html_file.read()
+
+        json_data = json.loads(extract_script_text(html_content, "__NEXT_DATA__"))
+        desc_str = get_from_json(json_data, ["props", "pageProps", "product", "description"])
+        if split_description(desc_str) != split_description_reparsed(desc_str):
+            raise AssertionError(f"description output differs for {html_path.name}")
+
+        reparsed_time = best_of(split_description_reparsed, desc_str)
+        in_place_time = best_of(split_description, desc_str)
+        logger.info(
+            f"{html_path.name:<45} {len(desc_str):>6} {reparsed_time * 1000:>12.3f} {in_place_time * 1000:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import copy
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from parse_bedbathbeyond import parse_next_data
+from utils.json_path import get_from_json
+
+CUR_DIR = Path(__file__).parent
+
+SCALES = [1, 4, 16, 64]
+REPEAT = 5
+FIELDS = {"list_price", "variants"}
+
+
+def scan_lookups(json_data: dict[str, Any]) -> tuple[Any, list[dict[str, Any]]]:
+    """The previous option and image rescans, kept as the reference."""
+
+    product_data = get_from_json(json_data, ["props", "pageProps", "product"])
+    variant_option_id = get_from_json(product_data, ["defaultOptionId"])
+    list_price = None
+    for variant in get_from_json(product_data, ["options"]):
+        if get_from_json(variant, ["optionId"]) == variant_option_id:
+            list_price = get_from_json(variant, ["comparePrice"])
+
+    variants = []
+    for option in get_from_json(product_data, ["options"]):
+        img_url = None
+        img_id = get_from_json(option, ["oViewerImagesIds"])
+        for img_info in get_from_json(product_data, ["oViewerImages"]):
+            if img_id == get_from_json(img_info, ["id"]):
+                img_url = f'https://ak1.ostkcdn.com/images/products/{get_from_json(img_info, ["cdnPath"])}'
+        variants.append(
+            {
+                "option_id": get_from_json(option, ["optionId"]),
+                "description": get_from_json(option, ["decription"]),
+                "price": get_from_json(option, ["price"]),
+                "listing_price": get_from_json(option, ["comparePrice"]),
+                "in_stock": get_from_json(option, ["isInStock"]),
+                "selector": img_url,
+                "url": None,
+            }
+        )
+    return list_price, variants
+
+
+def scale_next_data(json_data: dict[str, Any], scale: int) -> dict[str, Any]:
+    """Repeats the product's options and images `scale` times under fresh ids."""
+
+    scaled = copy.deepcopy(json_data)
+    product_data = scaled["props"]["pageProps"]["product"]
+    options = product_data["options"]
+    images = product_data["oViewerImages"]
+
+    product_data["options"] = list(options)
+    product_data["oViewerImages"] = list(images)
+    for i in range(1, scale):
+        for option in options:
+            option = dict(option)
+            option["optionId"] = f"{option.get('optionId')}-{i}"
+            if option.get("oViewerImagesIds") is not None:
+                option["oViewerImagesIds"] = f"{option['oViewerImagesIds']}-{i}"
+            product_data["options"].append(option)
+        for image in images:
+            image = dict(image)
+            image["id"] = f"{image.get('id')}-{i}"
+            product_data["oViewerImages"].append(image)
+    return scaled
+
+
+def best_of(func, *args) -> tuple[float, Any]:
+    best = float("inf")
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    logger.info(f"{'fixture':<18} {'options':>8} {'images':>7} {'scan ms':>8} {'indexed ms':>11}")
+    for json_path in sorted(CUR_DIR.glob("next_data*.json")):
+        with json_path.open("r", encoding="utf-8") as json_file:
+            json_data = json.load(json_file)
+
+        for scale in SCALES:
+            scaled = scale_next_data(json_data, scale)
+            scan_time, (list_price, variants) = best_of(scan_lookups, scaled)
+            indexed_time, result = best_of(parse_next_data, scaled, FIELDS)
+            if result["detail"] != {"list_price": list_price, "variants": variants}:
+                raise AssertionError(f"lookup output differs for {json_path.name} x{scale}")
+
+            product_data = scaled["props"]["pageProps"]["product"]
+            logger.info(
+                f"{json_path.name + ' x' + str(scale):<18} {len(product_data['options']):>8} "
+                f"{len(product_data['oViewerImages']):>7} {scan_time * 1000:>8.2f} {indexed_time * 1000:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
 import json
+import sys
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 from loguru import logger
 
 import requests
 import urllib.parse
 
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.json_path import get_from_json
+from utils.projection import project, wants
+from utils.review_store import ReviewStore
+from utils.script_tags import extract_script_text
+
 CUR_DIR = Path(__file__).parent
 
 html_path = CUR_DIR / "123.html"
@@ -19,28 +31,78 @@ html_path = CUR_DIR / "bedbathbeyond_detail_2024-12-18_16-28-22.html"
 
 output_path = CUR_DIR.parent / "result" / "bedbathbeyond-result.json"
 
+# Set to seed the incremental review sync (see `parse_overstock.sync_reviews`) from the reviews each page embeds
+REVIEW_STORE: ReviewStore | None = None
 
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        if isinstance(key, int):
-            obj = obj[key]
-        elif isinstance(key, str):
-            obj = obj.get(key)
-    return obj
 
+def list_items(elem: Tag) -> list[str]:
+    """Returns the text of every `<li>` in `elem`, including `elem` itself."""
 
-def parse_bedbathbeyond(html_content: str) -> list[dict[str, Any]]:
-    """Parses html content and returns a list of product information."""
+    elems = elem.select("li")
+    if elem.name == "li":
+        elems.insert(0, elem)
+    return [item.text.strip() for item in elems]
 
-    page_elem = BeautifulSoup(html_content, "html.parser")
-    dict_details: dict[str, Any] = {}
+
+def split_description(desc_str: str) -> tuple[str, list[str], list[str]]:
+    """Splits the description html into its details text and its features and dimensions lists.
+
+    The top-level nodes are walked once in place, a `Features:` or `Dimensions:` heading switching section.
+    """
+
+    features = []
+    dimensions = []
+    description = ""
+    status = "details"
+    desc_elem = BeautifulSoup(desc_str, "html.parser")
+    for child in desc_elem.contents:
+        if isinstance(child, str):
+            continue
+        text = child.text
+        heading = text.strip().lower()
+        if heading == "features:":
+            status = "features"
+        elif heading == "dimensions:":
+            status = "dimensions"
+        elif status == "details":
+            if heading == "":
+                continue
+            description += text + "\n"
+        elif status == "features":
+            features = list_items(child)
+        elif status == "dimensions":
+            dimensions = list_items(child)
+    return description, features, dimensions
+
+
+def parse_bedbathbeyond(html_content: str | bytes, fields: set[str] | None = None) -> list[dict[str, Any]]:
+    """Parses html content and returns a list of product information, limited to `fields` when given."""
 
     # Extract __NEXT_DATA__ from html
-    json_data_str = page_elem.select_one("script[id=__NEXT_DATA__]").text
+    json_data_str = extract_script_text(html_content, "__NEXT_DATA__")
     json_data = json.loads(json_data_str)
+    if REVIEW_STORE is not None:
+        seed_reviews(REVIEW_STORE, json_data)
+
+    return parse_next_data(json_data, fields)
+
+
+def seed_reviews(store: ReviewStore, json_data: dict[str, Any]) -> None:
+    """Merges the newest page of reviews the page embeds (`initialPowerReviews`) into `store`, without a request."""
+
+    page_props_data = get_from_json(json_data, ["props", "pageProps"])
+    merchant_id = get_from_json(page_props_data, ["config", "powerReviews", "merchantId"])
+    result = get_from_json(page_props_data, ["initialPowerReviews", "results", 0])
+    page_id = get_from_json(result, ["page_id"])
+    if merchant_id is None or page_id is None:
+        return
+    store.merge(merchant_id, page_id, get_from_json(result, ["rollup"]), get_from_json(result, ["reviews"]) or [])
+
+
+def parse_next_data(json_data: dict[str, Any], fields: set[str] | None = None) -> dict[str, Any]:
+    """Parses the page's `__NEXT_DATA__` json."""
+
+    dict_details: dict[str, Any] = {}
 
     page_props_data = get_from_json(json_data, ["props", "pageProps"])
     meta_data = get_from_json(page_props_data, ["meta"])
@@ -66,11 +128,12 @@ def parse_bedbathbeyond(html_content: str) -> list[dict[str, Any]]:
     detail["listing_id"] = get_from_json(product_data, ["id"])
 
     variant_option_id = get_from_json(product_data, ["defaultOptionId"])
-    list_price = None
-    for variant in get_from_json(product_data, ["options"]):
-        if get_from_json(variant, ["optionId"]) == variant_option_id:
-            list_price = get_from_json(variant, ["comparePrice"])
-    detail["list_price"] = list_price
+    if wants(fields, "list_price"):
+        # Later options win, like the previous scan
+        options_by_id = {
+            get_from_json(option, ["optionId"]): option for option in get_from_json(product_data, ["options"])
+        }
+        detail["list_price"] = get_from_json(options_by_id.get(variant_option_id), ["comparePrice"])
 
     detail["price"] = get_from_json(product_data, ["memberPrice"])
     detail["price_reduced"] = None  # TODO
@@ -78,170 +141,158 @@ def parse_bedbathbeyond(html_content: str) -> list[dict[str, Any]]:
     detail["currency"] = get_from_json(data_layer_data, ["order_currency"])
     detail["currency_symbol"] = get_from_json(product_data, ["priceSet", 0, "symbol"])
 
-    finnancing_offers = get_from_json(page_props_data, ["financingOffer"])
-    buying_offers = []
-    for offer in finnancing_offers:
-        offer_description = None
-        description_html = get_from_json(offer, ["html", "messageHtml"])
-        if description_html is not None:
-            offer_description = BeautifulSoup(
-                description_html, "html.parser"
-            ).text.strip()
-        buying_offers.append(
-            {
-                "offer_type": get_from_json(offer, ["data", "financingOfferType"]),
-                "offer_description": offer_description,
-                "price": None,
-                "seller": None,
-            }
-        )
-    detail["buying_offers"] = buying_offers
+    if wants(fields, "buying_offers"):
+        finnancing_offers = get_from_json(page_props_data, ["financingOffer"])
+        buying_offers = []
+        for offer in finnancing_offers:
+            offer_description = None
+            description_html = get_from_json(offer, ["html", "messageHtml"])
+            if description_html is not None:
+                offer_description = BeautifulSoup(
+                    description_html, "html.parser"
+                ).text.strip()
+            buying_offers.append(
+                {
+                    "offer_type": get_from_json(offer, ["data", "financingOfferType"]),
+                    "offer_description": offer_description,
+                    "price": None,
+                    "seller": None,
+                }
+            )
+        detail["buying_offers"] = buying_offers
 
     detail["other_sellers"] = []  # TODO
 
-    ratings: dict[str, int] = get_from_json(product_data, ["ratingCounts"])
-    total_point = 0
-    total_count = 0
-    for key, value in ratings.items():
-        total_point += int(key) * value
-        total_count += value
-    detail["rating"] = total_point / total_count if total_count > 0 else 0
-    detail["total_ratings"] = total_count
+    if wants(fields, "rating", "total_ratings"):
+        ratings: dict[str, int] = get_from_json(product_data, ["ratingCounts"])
+        total_point = 0
+        total_count = 0
+        for key, value in ratings.items():
+            total_point += int(key) * value
+            total_count += value
+        detail["rating"] = total_point / total_count if total_count > 0 else 0
+        detail["total_ratings"] = total_count
 
     detail["past_month_sales"] = None  # TODO
     detail["is_prime"] = None  # TODO
     detail["shipping_info"] = get_from_json(config_data, ["shipping"])
     detail["delivery_zipcode"] = get_from_json(meta_data, ["zipCode"])
 
-    btns_marketing: dict[str, Any] = get_from_json(
-        page_props_data,
-        ["extendResponse", "marketing", "adh", "offerTypeModal", "buttonsMarketing"],
-    )
-    addon_offers = []
-    if btns_marketing is not None:
-        for key, btn_marketing in btns_marketing.items():
-            addon_offers.append(
-                {
-                    "name": get_from_json(btn_marketing, ["termLength"]),
-                    "price": float(get_from_json(btn_marketing, ["price"])[1:]),
-                }
-            )
-    detail["addon_offers"] = addon_offers
+    if wants(fields, "addon_offers"):
+        btns_marketing: dict[str, Any] = get_from_json(
+            page_props_data,
+            ["extendResponse", "marketing", "adh", "offerTypeModal", "buttonsMarketing"],
+        )
+        addon_offers = []
+        if btns_marketing is not None:
+            for key, btn_marketing in btns_marketing.items():
+                addon_offers.append(
+                    {
+                        "name": get_from_json(btn_marketing, ["termLength"]),
+                        "price": float(get_from_json(btn_marketing, ["price"])[1:]),
+                    }
+                )
+        detail["addon_offers"] = addon_offers
 
     detail["pay_later_offers"] = None  # TODO
     detail["max_quantity"] = None  # TODO
     detail["variant"] = {"option_id": variant_option_id}
 
-    subcategories: list[dict[str, Any]] = get_from_json(
-        page_props_data, ["crossSell", 0, "tiles"]
-    )
-    categories: list[dict[str, Any]] = []
-    for subcategory in subcategories:
-        categories.append(
-            {
-                "name": get_from_json(subcategory, ["subcategory_title"]),
-                "url": f'https://www.bedbathandbeyond.com/{get_from_json(subcategory, ["subcategory_url"])}',
-            }
+    if wants(fields, "categories"):
+        subcategories: list[dict[str, Any]] = get_from_json(
+            page_props_data, ["crossSell", 0, "tiles"]
         )
-    detail["categories"] = categories
+        categories: list[dict[str, Any]] = []
+        for subcategory in subcategories:
+            categories.append(
+                {
+                    "name": get_from_json(subcategory, ["subcategory_title"]),
+                    "url": f'https://www.bedbathandbeyond.com/{get_from_json(subcategory, ["subcategory_url"])}',
+                }
+            )
+        detail["categories"] = categories
 
     detail["main_image"] = get_from_json(data_layer_data, ["product_image_url", 0])
-    detail["images"] = [
-        f'https://ak1.ostkcdn.com/images/products/{get_from_json(img_info, ["cdnPath"])}'
-        for img_info in get_from_json(product_data, ["oViewerImages"])
-    ]
+    if wants(fields, "images"):
+        detail["images"] = [
+            f'https://ak1.ostkcdn.com/images/products/{get_from_json(img_info, ["cdnPath"])}'
+            for img_info in get_from_json(product_data, ["oViewerImages"])
+        ]
     detail["labelled_images"] = None
 
-    attributes = get_from_json(
-        product_data, ["specificationAttributes", "attributeGroups", 0, "attributes"]
-    )
-    detail["overview"] = [
-        {"name": attr["label"], "value": attr["values"]} for attr in attributes
-    ]
-
-    desc_str = get_from_json(product_data, ["description"])
-    features = []
-    dimensions = []
-    description = ""
-    status = "details"
-    desc_elem = BeautifulSoup(desc_str, "html.parser")
-    for child in desc_elem.contents:
-        if isinstance(child, str):
-            continue
-        if child.text.strip().lower() == "features:":
-            status = "features"
-        elif child.text.strip().lower() == "dimensions:":
-            status = "dimensions"
-        elif status == "details":
-            child_elem = BeautifulSoup(str(child), "html.parser")
-            if child_elem.text.strip() == "":
-                continue
-            description += child_elem.text + "\n"
-        elif status == "features":
-            child_elem = BeautifulSoup(str(child), "html.parser")
-            elems = child_elem.select("li")
-            features = [elem.text.strip() for elem in elems]
-        elif status == "dimensions":
-            child_elem = BeautifulSoup(str(child), "html.parser")
-            elems = child_elem.select("li")
-            dimensions = [elem.text.strip() for elem in elems]
-    if description != "":
-        detail["description"] = description
-    detail["features"] = features
-    detail["dimensions"] = dimensions
-
-    detail["details_table"] = detail["overview"]
+    if wants(fields, "overview", "details_table"):
+        attributes = get_from_json(
+            product_data, ["specificationAttributes", "attributeGroups", 0, "attributes"]
+        )
+        detail["overview"] = [
+            {"name": attr["label"], "value": attr["values"]} for attr in attributes
+        ]
+
+    if wants(fields, "description", "features", "dimensions"):
+        desc_str = get_from_json(product_data, ["description"])
+        description, features, dimensions = split_description(desc_str)
+        if description != "":
+            detail["description"] = description
+        detail["features"] = features
+        detail["dimensions"] = dimensions
+
+    if wants(fields, "details_table"):
+        detail["details_table"] = detail["overview"]
     detail["technical_details"] = None  # TODO
     detail["bestseller_ranks"] = None  # TODO
     detail["seller_name"] = None  # TODO
     detail["seller_url"] = None  # TODO
 
-    options: list[dict[str, Any]] = get_from_json(product_data, ["options"])
-    variants: list[dict[str, Any]] = []
-    for option in options:
-        img_url = None
-        img_id = get_from_json(option, ["oViewerImagesIds"])
-        for img_info in get_from_json(product_data, ["oViewerImages"]):
-            if img_id == get_from_json(img_info, ["id"]):
+    if wants(fields, "variants"):
+        images_by_id = {
+            get_from_json(img_info, ["id"]): img_info for img_info in get_from_json(product_data, ["oViewerImages"])
+        }
+        options: list[dict[str, Any]] = get_from_json(product_data, ["options"])
+        variants: list[dict[str, Any]] = []
+        for option in options:
+            img_url = None
+            img_info = images_by_id.get(get_from_json(option, ["oViewerImagesIds"]))
+            if img_info is not None:
                 img_url = f'https://ak1.ostkcdn.com/images/products/{get_from_json(img_info, ["cdnPath"])}'
 
-        variants.append(
-            {
-                "option_id": get_from_json(option, ["optionId"]),
-                "description": get_from_json(option, ["decription"]),
-                "price": get_from_json(option, ["price"]),
-                "listing_price": get_from_json(option, ["comparePrice"]),
-                "in_stock": get_from_json(option, ["isInStock"]),
-                "selector": img_url,
-                "url": None,
-            }
-        )
-    detail["variants"] = variants
+            variants.append(
+                {
+                    "option_id": get_from_json(option, ["optionId"]),
+                    "description": get_from_json(option, ["decription"]),
+                    "price": get_from_json(option, ["price"]),
+                    "listing_price": get_from_json(option, ["comparePrice"]),
+                    "in_stock": get_from_json(option, ["isInStock"]),
+                    "selector": img_url,
+                    "url": None,
+                }
+            )
+        detail["variants"] = variants
 
     detail["reviews_summary"] = None  # TODO
 
-    reviews: list[dict[str, Any]] = get_from_json(
-        page_props_data, ["initialPowerReviews", "results", 0, "reviews"]
-    )
-    aspects: list[dict[str, Any]] = []
-    for review in reviews:
-        aspects.append(
-            {
-                "name": get_from_json(review, ["details", "nickname"]),
-                "headline": get_from_json(review, ["details", "headline"]),
-                "comments": get_from_json(review, ["details", "comments"]),
-                "rating": get_from_json(review, ["metrics", "rating"]),
-                "helpful_votes": get_from_json(review, ["metrics", "helpful_votes"]),
-                "not_helpful_votes": get_from_json(
-                    review, ["metrics", "not_helpful_votes"]
-                ),
-                "helpful_score": get_from_json(review, ["metrics", "helpful_score"]),
-                "verified_purchase": get_from_json(
-                    review, ["badges", "is_verified_buyer"]
-                ),
-            }
+    if wants(fields, "review_aspects"):
+        reviews: list[dict[str, Any]] = get_from_json(
+            page_props_data, ["initialPowerReviews", "results", 0, "reviews"]
         )
-    detail["review_aspects"] = aspects
+        aspects: list[dict[str, Any]] = []
+        for review in reviews:
+            aspects.append(
+                {
+                    "name": get_from_json(review, ["details", "nickname"]),
+                    "headline": get_from_json(review, ["details", "headline"]),
+                    "comments": get_from_json(review, ["details", "comments"]),
+                    "rating": get_from_json(review, ["metrics", "rating"]),
+                    "helpful_votes": get_from_json(review, ["metrics", "helpful_votes"]),
+                    "not_helpful_votes": get_from_json(
+                        review, ["metrics", "not_helpful_votes"]
+                    ),
+                    "helpful_score": get_from_json(review, ["metrics", "helpful_score"]),
+                    "verified_purchase": get_from_json(
+                        review, ["badges", "is_verified_buyer"]
+                    ),
+                }
+            )
+        detail["review_aspects"] = aspects
     detail["total_reviews"] = get_from_json(
         page_props_data, ["initialPowerReviews", "paging", "total_results"]
     )
@@ -250,22 +301,23 @@ def parse_bedbathbeyond(html_content: str) -> list[dict[str, Any]]:
     detail["policy_badges"] = None  # TODO
     detail["product_videos"] = None  # TODO
 
-    contents = get_from_json(product_data, ["productContents"])
-    guides = []
-    for content in contents:
-        guides.append(
-            {
-                "text": get_from_json(content, ["contentName"]),
-                "url": f'https://www.bedbathandbeyond.com{get_from_json(content, ["contentUrl"])}',
-            }
-        )
-    detail["product_guides"] = guides
+    if wants(fields, "product_guides"):
+        contents = get_from_json(product_data, ["productContents"])
+        guides = []
+        for content in contents:
+            guides.append(
+                {
+                    "text": get_from_json(content, ["contentName"]),
+                    "url": f'https://www.bedbathandbeyond.com{get_from_json(content, ["contentUrl"])}',
+                }
+            )
+        detail["product_guides"] = guides
 
     detail["warranty_and_support"] = None  # TODO
     detail["from_the_manufacturer"] = None  # TODO
     detail["small_business"] = None  # TODO
 
-    dict_details["detail"] = detail
+    dict_details["detail"] = project(detail, fields)
     dict_details["remaining_credits"] = None
 
     return dict_details
@@ -1,11 +1,19 @@
 import json
 import re
 import ast
+import sys
 from typing import Any
 from lxml import html
-from bs4 import BeautifulSoup
 from pathlib import Path
 
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.json_extract import scan_value_end
+
 CUR_DIR = Path(__file__).parent
 output_path = CUR_DIR.parent / "result" / "costco-result.json"
 
@@ -13,18 +21,20 @@ output_path = CUR_DIR.parent / "result" / "costco-result.json"
 def parse_product_data(html_file_path):
     with open(html_file_path, 'r', encoding='utf-8') as f:
         html_content = f.read()
-    
+    return parse_bestbuy_html(html_content)
+
+
+def parse_bestbuy_html(html_content):
+    # One lxml tree serves both the xpath lookups and the script scan below
     response = html.fromstring(html_content)
-    page_elem = BeautifulSoup(html_content, "html.parser")
 
     initial_data: dict[str, Any] = {}
-    script_elems = page_elem.select("script")
-    for script_elem in script_elems:
-        if "initializer.initializeComponent({" in script_elem.text and "\\\"UPC\\\"" in script_elem.text:
-            pattern = re.compile(r"\"(\{\\\"app\\\".*?\}\})\",", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            json_str = matches[0]
-            json_str = json.loads(f"\"{json_str}\"")
+    for script_text in response.xpath("//script/text()"):
+        if "initializer.initializeComponent({" in script_text and "\\\"UPC\\\"" in script_text:
+            # The state is passed as a JSON-encoded string argument
+            start_index = script_text.find('"{\\"app\\"')
+            end_index = scan_value_end(script_text, start_index)
+            json_str = json.loads(script_text[start_index:end_index])
             initial_data = json.loads(json_str)
 
     detail = {}
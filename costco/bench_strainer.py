@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from parse_costco import BODY_FIELDS
+from utils.parse_bench import measure_parse
+
+CUR_DIR = Path(__file__).parent
+
+PARSERS = [("parse_costco", "parse_costco", "costco_*.html")]
+# Only the body fields read the parsed tree
+FIELDS = set(BODY_FIELDS)
+# The strainer only applies to the BeautifulSoup backends
+BACKEND = "lxml"
+
+
+def main() -> None:
+    logger.info(f"{'fixture':<40} {'MB':>5} {'full ms':>8} {'full MiB':>9} {'strained ms':>12} {'strained MiB':>13}")
+    for module_name, func_name, pattern in PARSERS:
+        for html_path in sorted(CUR_DIR.glob(pattern)):
+            kwargs = {"fields": FIELDS, "backend": BACKEND}
+            full_time, full_rss, full_result = measure_parse(module_name, func_name, html_path, kwargs, False)
+            strained_time, strained_rss, strained_result = measure_parse(module_name, func_name, html_path, kwargs, True)
+            if full_result != strained_result:
+                raise AssertionError(f"strained output differs for {html_path.name}")
+
+            logger.info(
+                f"{html_path.name:<40} {html_path.stat().st_size / 1e6:>5.1f} {full_time * 1000:>8.1f} "
+                f"{full_rss / 1024:>9.1f} {strained_time * 1000:>12.1f} {strained_rss / 1024:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
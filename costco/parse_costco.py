@@ -1,14 +1,28 @@
 import base64
 import json
 import re
+import sys
 import urllib.parse
 from pathlib import Path
 from typing import Any
 
 import requests
-from bs4 import BeautifulSoup
 from loguru import logger
 
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.field_timing import mark, profiled
+from utils.html_backend import LXML, PageStrainer, parse_html
+from utils.json_extract import extract_json_value, loads_js_value
+from utils.json_path import get_from_json
+from utils.projection import project, wants
+from utils.script_scanner import ScriptScanner
+from utils.script_tags import parse_head_tags
+
 TEST_LOCAL = True
 
 CUR_DIR = Path(__file__).parent
@@ -20,284 +34,361 @@ html_path = CUR_DIR / "costco_4.html"
 
 output_path = CUR_DIR.parent / "result" / "costco-result.json"
 
+# The body walk below uses contents/find_next_sibling, so it needs a BeautifulSoup backend
+HTML_BACKEND = LXML
+# Subtrees the BeautifulSoup backends build; the rest of the page is skipped while parsing
+PARSE_ONLY = PageStrainer(ids=["product-page"])
 
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        if isinstance(key, int):
-            obj = obj[key]
-        elif isinstance(key, str):
-            obj = obj.get(key)
-    return obj
 
+def extract_product_info(script_text: str) -> dict[str, Any]:
+    product_info = {}
 
-def parse_costco(html_content: str) -> dict[str, Any]:
-    page_elem = BeautifulSoup(html_content, "html.parser")
-    dict_details: dict[str, Any] = {}
+    pattern = re.compile(r"priceMax\s*:\s*\'(.*?)\',", re.DOTALL)
+    matches = pattern.findall(script_text)
+    product_info["price"] = matches[0]
+
+    pattern = re.compile(r"priceMin\s*:\s*\'(.*?)\',", re.DOTALL)
+    matches = pattern.findall(script_text)
+    product_info["price_listing"] = matches[0]
+
+    pattern = re.compile(r"pid\s*:\s*\'(.*?)\',", re.DOTALL)
+    matches = pattern.findall(script_text)
+    product_info["product_id"] = matches[0]
+
+    pattern = re.compile(r"sku\s*:\s*\'(.*?)\',", re.DOTALL)
+    matches = pattern.findall(script_text)
+    product_info["sku"] = matches[0]
+
+    return product_info
+
+
+def extract_images(script_text: str) -> list[str]:
+    pattern = re.compile(r"cdn_url:\s*\'(.*?)\',", re.DOTALL)
+    return pattern.findall(script_text)
 
-    script_elems = page_elem.select("script")
-    paragraph_elems = page_elem.select("p")
 
-    price = None
-    price_listing = None
-    product_id = None
-    sku = None
-    for script_elem in script_elems:
-        if "priceMax" in script_elem.text:
-            pattern = re.compile(r"priceMax\s*:\s*\'(.*?)\',", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            price = matches[0]
+def extract_variants(script_text: str) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    # Both are declared as `var name = [[...]];`
+    json_text = extract_json_value(script_text, "var products =")
+    variant_data = json.loads(json_text)[0]
 
-            pattern = re.compile(r"priceMin\s*:\s*\'(.*?)\',", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            price_listing = matches[0]
+    json_text = extract_json_value(script_text, "var options =")
+    variant_options_data = loads_js_value(json_text)[0]
 
-            pattern = re.compile(r"pid\s*:\s*\'(.*?)\',", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            product_id = matches[0]
+    return variant_data, variant_options_data
 
-            pattern = re.compile(r"sku\s*:\s*\'(.*?)\',", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            sku = matches[0]
-            break
+
+# All script anchors are matched in one pass over the page
+SCRIPT_SCANNER = ScriptScanner(
+    {
+        "priceMax": extract_product_info,
+        "itemDetailsList": extract_images,
+        "var products = [": extract_variants,
+    }
+)
+
+
+# Fields read from the page body rather than its head tags or scripts
+BODY_FIELDS = (
+    "brand",
+    "model_numbers",
+    "pills",
+    "currency",
+    "product_label",
+    "warning",
+    "includes",
+    "features",
+    "dimensions_weight",
+    "additional_demensions",
+    "specifications",
+    "manuals_guides",
+    "shipping",
+    "returns",
+)
+
+
+@profiled("costco")
+def parse_costco(html_content: str, fields: set[str] | None = None, backend: str | None = None) -> dict[str, Any]:
+    mark("head_tags")
+    head_elem = parse_head_tags(html_content)
+    mark("page_tree")
+    page_elem = parse_html(html_content, backend or HTML_BACKEND, PARSE_ONLY) if wants(fields, *BODY_FIELDS) else None
+    dict_details: dict[str, Any] = {}
+
+    mark("scripts")
+    anchors = []
+    if wants(fields, "price", "price_listing", "product_id", "sku"):
+        anchors.append("priceMax")
+    if wants(fields, "images"):
+        anchors.append("itemDetailsList")
+    if wants(fields, "variant_options", "variants"):
+        anchors.append("var products = [")
+    script_data = SCRIPT_SCANNER.scan(html_content, anchors)
+
+    product_info: dict[str, Any] = script_data.get("priceMax", {})
+    price = product_info.get("price")
+    price_listing = product_info.get("price_listing")
+    product_id = product_info.get("product_id")
+    sku = product_info.get("sku")
 
     # Success
+    mark("success")
     dict_details["success"] = True
 
     # Url
-    canonical_elem = page_elem.select_one("link[rel=canonical]")
+    mark("url")
+    canonical_elem = head_elem.select_one("link[rel=canonical]")
     dict_details["url"] = canonical_elem.attrs.get("href") if canonical_elem else None
 
     # Result Count
+    mark("result_count")
     dict_details["result_count"] = 1
 
     detail: dict[str, Any] = {}
 
     # Name
-    name_elem = page_elem.select_one("meta[property='og:title']")
+    mark("name")
+    name_elem = head_elem.select_one("meta[property='og:title']")
     detail["name"] = name_elem.attrs.get("content") if name_elem else None
 
     # Brand
-    brand_elem = page_elem.select_one("div[itemprop=brand]")
-    detail["brand"] = brand_elem.text.strip() if brand_elem else None
+    mark("brand")
+    if wants(fields, "brand"):
+        brand_elem = page_elem.select_one("div[itemprop=brand]")
+        detail["brand"] = brand_elem.text.strip() if brand_elem else None
 
     # Url
+    mark("detail_url")
     detail["url"] = dict_details.get("url")
 
     # Description
-    description_elem = page_elem.select_one("meta[name=description]")
+    mark("description")
+    description_elem = head_elem.select_one("meta[name=description]")
     detail["description"] = description_elem.attrs.get("content") if description_elem else None
 
     # Product ID
+    mark("product_id")
     detail["product_id"] = product_id
 
     # SKU
+    mark("sku")
     detail["sku"] = sku
 
     # Model Number
-    detail["model_numbers"] = None
-    model_numbers = []
-    model_number_elems = page_elem.select("div.item-model-number")
-    for model_number_elem in model_number_elems:
-        span_elem = model_number_elem.select_one("span[itemprop=sku]")
-        if span_elem:
-            model_numbers.append(span_elem.text.strip())
-    detail["model_numbers"] = model_numbers
+    mark("model_number")
+    if wants(fields, "model_numbers"):
+        model_numbers = []
+        model_number_elems = page_elem.select("div.item-model-number")
+        for model_number_elem in model_number_elems:
+            span_elem = model_number_elem.select_one("span[itemprop=sku]")
+            if span_elem:
+                model_numbers.append(span_elem.text.strip())
+        detail["model_numbers"] = model_numbers
 
     # Pills
-    detail["pills"] = None
-    pills = []
-    pills_elem = page_elem.select_one("div.pills-section")
-    if pills_elem:
-        pill_elems = pills_elem.select("div.single-pill")
-        for pill_elem in pill_elems:
-            pills.append(pill_elem.text.strip())
-    detail["pills"] = pills
+    mark("pills")
+    if wants(fields, "pills"):
+        pills = []
+        pills_elem = page_elem.select_one("div.pills-section")
+        if pills_elem:
+            pill_elems = pills_elem.select("div.single-pill")
+            for pill_elem in pill_elems:
+                pills.append(pill_elem.text.strip())
+        detail["pills"] = pills
 
     # Image
-    image_elem = page_elem.select_one("meta[property='og:image']")
-    image_url = image_elem.attrs.get("content")
-    detail["main_image"] = image_url.split("?")[0] if image_url else None
+    mark("image")
+    if wants(fields, "main_image"):
+        image_elem = head_elem.select_one("meta[property='og:image']")
+        image_url = image_elem.attrs.get("content")
+        detail["main_image"] = image_url.split("?")[0] if image_url else None
 
     # Images
-    images = []
-    for script_elem in script_elems:
-        if "itemDetailsList" in script_elem.text:
-            pattern = re.compile(r"cdn_url:\s*\'(.*?)\',", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            images = matches
-            break
-    detail["images"] = images
+    mark("images")
+    detail["images"] = script_data.get("itemDetailsList", [])
 
     # Price
+    mark("price")
     detail["price"] = price
     detail["price_listing"] = price_listing
 
     # Currency
-    detail["currency"] = None
-    currenty_elem = page_elem.select_one("span.currency")
-    if currenty_elem:
-        detail["currency"] = currenty_elem.text.strip()
+    mark("currency")
+    if wants(fields, "currency"):
+        detail["currency"] = None
+        currenty_elem = page_elem.select_one("span.currency")
+        if currenty_elem:
+            detail["currency"] = currenty_elem.text.strip()
 
     # Product Label
-    detail["product_label"] = None
-    product_label_elem = page_elem.select_one("img[alt='Product Label']")
-    if product_label_elem:
-        link_elem = product_label_elem.select_one("a")
-        if link_elem:
-            detail["product_label"] = link_elem.attrs.get("href")
+    mark("product_label")
+    if wants(fields, "product_label"):
+        detail["product_label"] = None
+        product_label_elem = page_elem.select_one("img[alt='Product Label']")
+        if product_label_elem:
+            link_elem = product_label_elem.select_one("a")
+            if link_elem:
+                detail["product_label"] = link_elem.attrs.get("href")
 
     # Warning
-    detail["warning"] = None
-    warning_elem = page_elem.select_one("div.prop65warning")
-    if warning_elem:
-        detail["warning"] = warning_elem.text
+    mark("warning")
+    if wants(fields, "warning"):
+        detail["warning"] = None
+        warning_elem = page_elem.select_one("div.prop65warning")
+        if warning_elem:
+            detail["warning"] = warning_elem.text
+
+    paragraph_elems = []
+    if wants(fields, "includes", "features", "dimensions_weight", "additional_demensions"):
+        paragraph_elems = page_elem.select("p")
 
     # Includes
-    detail["includes"] = None
-    for paragraph_elem in paragraph_elems:
-        if "Includes:" in paragraph_elem.text:
-            includes: list[str] = paragraph_elem.contents[4].text.strip().split(",")
-            detail["includes"] = [i.strip() for i in includes]
-            break
+    mark("includes")
+    if wants(fields, "includes"):
+        detail["includes"] = None
+        for paragraph_elem in paragraph_elems:
+            if "Includes:" in paragraph_elem.text:
+                includes: list[str] = paragraph_elem.contents[4].text.strip().split(",")
+                detail["includes"] = [i.strip() for i in includes]
+                break
 
     # Features
-    detail["features"] = None
-    features = []
-    for paragraph_elem in paragraph_elems:
-        if "Features:" in paragraph_elem.text:
-            item_list_elem = paragraph_elem.find_next_sibling("ul")
-            if item_list_elem:
-                item_elems = item_list_elem.select("li")
-                for item_elem in item_elems:
-                    features.append(item_elem.text.strip())
-    detail["features"] = features
+    mark("features")
+    if wants(fields, "features"):
+        features = []
+        for paragraph_elem in paragraph_elems:
+            if "Features:" in paragraph_elem.text:
+                item_list_elem = paragraph_elem.find_next_sibling("ul")
+                if item_list_elem:
+                    item_elems = item_list_elem.select("li")
+                    for item_elem in item_elems:
+                        features.append(item_elem.text.strip())
+        detail["features"] = features
 
     # Demensions & Weight
-    detail["dimensions_weight"] = None
-    demensions_weight = []
-    for paragraph_elem in paragraph_elems:
-        if "Dimensions and Weight:" in paragraph_elem.text:
-            item_list_elem = paragraph_elem.find_next_sibling("ul")
-            if item_list_elem:
-                item_elems = item_list_elem.select("li")
-                for item_elem in item_elems:
-                    demensions_weight.append(item_elem.text.strip())
-    detail["dimensions_weight"] = demensions_weight
+    mark("demensions_weight")
+    if wants(fields, "dimensions_weight"):
+        demensions_weight = []
+        for paragraph_elem in paragraph_elems:
+            if "Dimensions and Weight:" in paragraph_elem.text:
+                item_list_elem = paragraph_elem.find_next_sibling("ul")
+                if item_list_elem:
+                    item_elems = item_list_elem.select("li")
+                    for item_elem in item_elems:
+                        demensions_weight.append(item_elem.text.strip())
+        detail["dimensions_weight"] = demensions_weight
 
     # Additional Demensions
-    detail["additional_demensions"] = None
-    additional_demensions = []
-    for paragraph_elem in paragraph_elems:
-        if "Additional Dimensions:" in paragraph_elem.text:
-            item_list_elem = paragraph_elem.find_next_sibling("ul")
-            if item_list_elem:
-                item_elems = item_list_elem.select("li")
-                for item_elem in item_elems:
-                    additional_demensions.append(item_elem.text.strip())
-    detail["additional_demensions"] = additional_demensions
+    mark("additional_demensions")
+    if wants(fields, "additional_demensions"):
+        additional_demensions = []
+        for paragraph_elem in paragraph_elems:
+            if "Additional Dimensions:" in paragraph_elem.text:
+                item_list_elem = paragraph_elem.find_next_sibling("ul")
+                if item_list_elem:
+                    item_elems = item_list_elem.select("li")
+                    for item_elem in item_elems:
+                        additional_demensions.append(item_elem.text.strip())
+        detail["additional_demensions"] = additional_demensions
 
     # Specifications
-    detail["specifications"] = None
-    specifications = {}
-    section_title_elems = page_elem.select("h3.section-title")
-    for section_title_elem in section_title_elems:
-        if "Specifications" in section_title_elem.text:
-            item_list_elem = section_title_elem.find_next_sibling("div")
-            if item_list_elem:
-                item_elems = item_list_elem.select("div.row")
-                for item_elem in item_elems:
-                    elems = item_elem.select("div")
-                    if len(elems) != 2:
-                        continue
-
-                    key = elems[0].text.strip()
-                    value = elems[1].text.strip()
-                    specifications[key] = value
-    detail["specifications"] = specifications
+    mark("specifications")
+    if wants(fields, "specifications"):
+        specifications = {}
+        section_title_elems = page_elem.select("h3.section-title")
+        for section_title_elem in section_title_elems:
+            if "Specifications" in section_title_elem.text:
+                item_list_elem = section_title_elem.find_next_sibling("div")
+                if item_list_elem:
+                    item_elems = item_list_elem.select("div.row")
+                    for item_elem in item_elems:
+                        elems = item_elem.select("div")
+                        if len(elems) != 2:
+                            continue
+
+                        key = elems[0].text.strip()
+                        value = elems[1].text.strip()
+                        specifications[key] = value
+        detail["specifications"] = specifications
 
     # Manuals & Guides
-    detail["manuals_guides"] = None
-    manuals = []
-    manuals_elem = page_elem.select_one("figure.product-manuals")
-    if manuals_elem:
-        item_elems = manuals_elem.select("li")
-        for item_elem in item_elems:
-            if item_elem:
-                link_elem = item_elem.select_one("a")
-                if link_elem:
-                    manuals.append(link_elem.attrs.get("href"))
-    detail["manuals_guides"] = manuals
+    mark("manuals_guides")
+    if wants(fields, "manuals_guides"):
+        manuals = []
+        manuals_elem = page_elem.select_one("figure.product-manuals")
+        if manuals_elem:
+            item_elems = manuals_elem.select("li")
+            for item_elem in item_elems:
+                if item_elem:
+                    link_elem = item_elem.select_one("a")
+                    if link_elem:
+                        manuals.append(link_elem.attrs.get("href"))
+        detail["manuals_guides"] = manuals
 
     # Shipping
-    detail["shipping"] = ""
-    shipping_elem = page_elem.select_one("div.product-info-shipping")
-    if shipping_elem:
-        for content in shipping_elem.contents:
-            if isinstance(content, str):
-                shipping = content.strip()
-                if shipping:
-                    detail["shipping"] += content.strip() + "\n"
-            else:
-                shipping = content.text.strip()
-                if shipping:
-                    detail["shipping"] += content.text.strip() + "\n"
+    mark("shipping")
+    if wants(fields, "shipping"):
+        detail["shipping"] = ""
+        shipping_elem = page_elem.select_one("div.product-info-shipping")
+        if shipping_elem:
+            for content in shipping_elem.contents:
+                if isinstance(content, str):
+                    shipping = content.strip()
+                    if shipping:
+                        detail["shipping"] += content.strip() + "\n"
+                else:
+                    shipping = content.text.strip()
+                    if shipping:
+                        detail["shipping"] += content.text.strip() + "\n"
 
     # Returns
-    detail["returns"] = ""
-    returns_elem = page_elem.select_one("div.product-info-returns")
-    if returns_elem:
-        for content in returns_elem.contents:
-            if isinstance(content, str):
-                return_str = content.strip()
-                if return_str:
-                    detail["returns"] += return_str + "\n"
-            else:
-                return_str = content.text.strip()
-                if return_str:
-                    detail["returns"] += return_str + "\n"
+    mark("returns")
+    if wants(fields, "returns"):
+        detail["returns"] = ""
+        returns_elem = page_elem.select_one("div.product-info-returns")
+        if returns_elem:
+            for content in returns_elem.contents:
+                if isinstance(content, str):
+                    return_str = content.strip()
+                    if return_str:
+                        detail["returns"] += return_str + "\n"
+                else:
+                    return_str = content.text.strip()
+                    if return_str:
+                        detail["returns"] += return_str + "\n"
 
     # Reviews
+    mark("reviews")
     detail["rating"] = None
 
     # Total Ratings
+    mark("total_ratings")
     detail["total_ratings"] = None
 
     # Review Aspects
+    mark("review_aspects")
     detail["review_aspects"] = None
 
     # Total Reviews
+    mark("total_reviews")
     detail["total_reviews"] = None
 
     # Variant
+    mark("variant")
     detail["variant"] = None
 
     # Variant Options
+    mark("variant_options")
 
     # Variants
+    mark("variants")
     detail["variant_options"] = None
     detail["variants"] = None
 
     variant_options: list[dict[str, Any]] = []
     variants: list[dict[str, Any]] = []
 
-    variant_options_data: dict[str, Any] = {}
-    variant_data: dict[str, Any] = {}
-    for script_elem in script_elems:
-        if "var products = [" in script_elem.text:
-            pattern = re.compile(r"var\s*products\s*=\s*\[\s*(\[.*?\])\s*\]\;", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            json_text = matches[0]
-            variant_data = json.loads(json_text)
-
-            pattern = re.compile(r"var\s*options\s*=\s*\[\s*(\[.*?\])\s*\]\;", re.DOTALL)
-            matches = pattern.findall(script_elem.string)
-            json_text = matches[0]
-            json_text = json_text.replace("'", '"')
-            variant_options_data = json.loads(json_text)
-            break
+    variant_data, variant_options_data = script_data.get("var products = [", ({}, {}))
 
     for variant_option in variant_options_data:
         variant_options.append(
@@ -332,7 +423,7 @@ def parse_costco(html_content: str) -> dict[str, Any]:
         )
     detail["variants"] = variants
 
-    dict_details["detail"] = detail
+    dict_details["detail"] = project(detail, fields)
     dict_details["remaining_credits"] = None
 
     return dict_details
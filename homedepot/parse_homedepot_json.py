@@ -1,8 +1,17 @@
 import json
+import sys
 from typing import Any
 from loguru import logger
 from pathlib import Path
 
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.json_path import get_from_json
+
 CUR_DIR = Path(__file__).parent
 
 
@@ -10,18 +19,6 @@ input_path = CUR_DIR / "homedepot_raw_ca_search.json"
 output_path = CUR_DIR.parent / "result" / "homedepot-result.json"
 
 
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        if isinstance(key, int):
-            obj = obj[key]
-        elif isinstance(key, str):
-            obj = obj.get(key)
-    return obj
-
-
 def parse_homedepot_json(input_json: list[dict[str, Any]]) -> dict[str, Any]:
     """Parses raw tesco review json and returns parsed result json."""
 
@@ -0,0 +1,54 @@
+import sys
+import time
+from pathlib import Path
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from parse_overstock import parse_overstock
+from utils.html_backend import HTML_BACKENDS, HTML_PARSER
+
+CUR_DIR = Path(__file__).parent
+
+REPEAT = 5
+# Only the image gallery is read from the parsed tree; the rest needs no soup or hits the review api
+FIELDS = {"images"}
+
+
+def best_of(html_content: str, backend: str) -> tuple[float, dict | str]:
+    best = float("inf")
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        try:
+            result = parse_overstock(html_content, FIELDS, backend)
+        except Exception as e:
+            return best, f"{type(e).__name__}: {e}"
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    logger.info(f"{'fixture':<42} " + " ".join(f"{backend:>22}" for backend in HTML_BACKENDS))
+    for html_path in sorted(CUR_DIR.glob("overstock_detail_*.html")):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            html_content = html_file.read()
+
+        _, reference = best_of(html_content, HTML_PARSER)
+        cells = []
+        for backend in HTML_BACKENDS:
+            elapsed, result = best_of(html_content, backend)
+            if isinstance(result, str):
+                cells.append(f"{'-':>12} {'error':>9}")
+            else:
+                cells.append(f"{elapsed * 1000:>9.2f} ms {'same' if result == reference else 'differs':>9}")
+        logger.info(f"{html_path.name:<42} " + " ".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
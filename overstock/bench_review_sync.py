@@ -0,0 +1,118 @@
+"""Counts the requests of the incremental review sync against the local PowerReviews stand-in of `bench_reviews`.
+
+    python overstock/bench_review_sync.py [--reviews 2000] [--new 5] [--latency 0.05]
+
+For every overstock fixture the store is first filled by a full fetch, then `--new` reviews are posted and synced
+again. BB&B pages are seeded from the reviews they embed instead, with no request, then synced to fill in the older
+pages and once more after new reviews are posted. After each sync the store must equal what the api serves.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from bench_reviews import LATENCY, REVIEWS, PowerReviews, make_reviews, recorded_reviews, render_configs
+from parse_overstock import get_reviews, sync_reviews
+from utils.json_path import get_from_json
+from utils.replay_server import ReplayServer
+from utils.retailers import load_parser
+from utils.review_store import ReviewStore
+
+CUR_DIR = Path(__file__).parent
+BBB_PATHS = sorted((CUR_DIR.parent / "bedbathbeyond").glob("*.json"))
+
+NEW_REVIEWS = 5
+# The BB&B pages do not carry the api key; the stand-in only needs one that matches
+BBB_API_KEY = "bench"
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Count the requests of the incremental review sync.")
+    arg_parser.add_argument("--reviews", type=int, default=REVIEWS)
+    arg_parser.add_argument("--new", type=int, default=NEW_REVIEWS, help="reviews posted between two syncs")
+    arg_parser.add_argument("--latency", type=float, default=LATENCY, help="seconds added to every response")
+    args = arg_parser.parse_args()
+
+    rollup, recorded = recorded_reviews()
+    power_reviews = PowerReviews(rollup)
+    seed_reviews = load_parser("bedbathbeyond", "seed_reviews")
+
+    products = []
+    for name, config in render_configs():
+        power_reviews.add(config, make_reviews(recorded, args.reviews))
+        products.append((name, config, None))
+    for json_path in BBB_PATHS:
+        with json_path.open("r", encoding="utf-8") as json_file:
+            json_data = json.load(json_file)
+        page_props_data = get_from_json(json_data, ["props", "pageProps"])
+        embedded = get_from_json(page_props_data, ["initialPowerReviews", "results", 0, "reviews"])
+        if not embedded:
+            continue
+        total_results = get_from_json(page_props_data, ["initialPowerReviews", "paging", "total_results"])
+        config = {
+            "api_key": BBB_API_KEY,
+            "merchant_id": str(get_from_json(page_props_data, ["config", "powerReviews", "merchantId"])),
+            "page_id": get_from_json(page_props_data, ["initialPowerReviews", "results", 0, "page_id"]),
+        }
+        if (config["merchant_id"], config["page_id"]) in power_reviews.products:
+            continue
+        # The embedded page is the newest one; older generated reviews make up the rest of the count
+        power_reviews.add(config, embedded + make_reviews(recorded, total_results - len(embedded)))
+        products.append((json_path.name, config, json_data))
+
+    mismatches = 0
+    logger.info(
+        f"{'product':<45} {'reviews':>8} {'full reqs':>10} {'first sync':>11} {'ms':>7} {'next sync':>10} {'ms':>7}"
+    )
+    server = ReplayServer({"/m/": power_reviews.route}, latency=args.latency)
+    with server, tempfile.TemporaryDirectory() as store_dir:
+        store = ReviewStore(store_dir)
+        for name, config, json_data in products:
+            key = (config["merchant_id"], config["page_id"])
+            server.reset_counters()
+            get_reviews(**config, base_url=server.base_url)
+            full_requests = server.requests
+
+            # First sync: a full fetch for overstock, the embedded page plus the older pages for BB&B
+            server.reset_counters()
+            if json_data is not None:
+                seed_reviews(store, json_data)
+            start = time.perf_counter()
+            sync_reviews(store, **config, base_url=server.base_url)
+            first_elapsed = time.perf_counter() - start
+            first_requests = server.requests
+
+            api_key, served = power_reviews.products[key]
+            newest_id = max(review["review_id"] for review in served)
+            power_reviews.products[key] = (api_key, make_reviews(recorded, args.new, newest_id + 1) + served)
+            server.reset_counters()
+            start = time.perf_counter()
+            reviews = sync_reviews(store, **config, base_url=server.base_url)
+            elapsed = time.perf_counter() - start
+
+            served_ids = [review["review_id"] for review in power_reviews.products[key][1]]
+            if [review["review_id"] for review in reviews["reviews"]] != served_ids:
+                mismatches += 1
+                logger.error(f"{name}: synced reviews differ from the served ones")
+            logger.info(
+                f"{name:<45} {len(served_ids):>8} {full_requests:>10} {first_requests:>11} "
+                f"{first_elapsed * 1000:>7.1f} {server.requests:>10} {elapsed * 1000:>7.1f}"
+            )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
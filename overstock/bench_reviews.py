@@ -0,0 +1,161 @@
+"""Times `get_reviews` against a local PowerReviews stand-in and checks the concurrent fetch against a serial one.
+
+    python overstock/bench_reviews.py [--reviews 2000] [--latency 0.05] [--concurrency 8]
+
+The stand-in serves the product of every overstock fixture, under the merchant, page id and api key of the page's
+render config, with `--reviews` reviews cycled from the PowerReviews payloads recorded in the BB&B fixtures. Review
+ids and dates are rewritten so each review is unique and the order can be checked. Pages are clamped at
+`MAX_PAGE_SIZE`, so the fetcher has to follow the `paging.page_size` it gets back.
+"""
+
+import argparse
+import copy
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from parse_overstock import SCRIPT_SCANNER, get_reviews
+from utils.json_path import get_from_json
+from utils.replay_server import ReplayServer
+
+CUR_DIR = Path(__file__).parent
+RECORDED_PATHS = sorted((CUR_DIR.parent / "bedbathbeyond").glob("*.json"))
+
+REVIEWS = 2000
+LATENCY = 0.05
+CONCURRENCY = 8
+MAX_PAGE_SIZE = 25
+# Generated reviews are an hour apart: review `n` was created `n` hours after this (ms)
+FIRST_DATE = 1704067200000
+HOUR_MS = 3600 * 1000
+
+
+def recorded_reviews() -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """The rollup and reviews of every PowerReviews payload embedded in the BB&B fixtures."""
+
+    rollup: dict[str, Any] = {}
+    reviews: list[dict[str, Any]] = []
+    for json_path in RECORDED_PATHS:
+        with json_path.open("r", encoding="utf-8") as json_file:
+            json_data = json.load(json_file)
+        result = get_from_json(json_data, ["props", "pageProps", "initialPowerReviews", "results", 0])
+        rollup = rollup or get_from_json(result, ["rollup"]) or {}
+        reviews.extend(get_from_json(result, ["reviews"]) or [])
+    return rollup, reviews
+
+
+def make_reviews(recorded: list[dict[str, Any]], count: int, first_id: int = 1) -> list[dict[str, Any]]:
+    """`count` reviews, newest first, with ids counting down to `first_id`."""
+
+    reviews = []
+    for i in range(count):
+        review = copy.deepcopy(recorded[i % len(recorded)])
+        review_id = first_id + count - 1 - i
+        review["review_id"] = review["ugc_id"] = review_id
+        review["details"]["created_date"] = FIRST_DATE + review_id * HOUR_MS
+        reviews.append(review)
+    return reviews
+
+
+def render_configs() -> list[tuple[str, dict[str, str]]]:
+    configs = []
+    for html_path in sorted(CUR_DIR.glob("overstock_detail_*.html")):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            html_content = html_file.read()
+        configs.append((html_path.name, SCRIPT_SCANNER.scan(html_content, ["merchant_group_id"])["merchant_group_id"]))
+    return configs
+
+
+class PowerReviews:
+    """Reviews served per (merchant, page id), newest first, `paging.from`/`paging.size` sliced like the api."""
+
+    def __init__(self, rollup: dict[str, Any]) -> None:
+        self.rollup = rollup
+        self.products: dict[tuple[str, str], tuple[str, list[dict[str, Any]]]] = {}
+
+    def add(self, config: dict[str, str], reviews: list[dict[str, Any]]) -> None:
+        self.products[(config["merchant_id"], config["page_id"])] = (config["api_key"], reviews)
+
+    def route(self, path: str, query: dict[str, list[str]], body: Any) -> tuple[int, Any]:
+        # /m/<merchant_id>/l/en_US/product/<page_id>/reviews
+        parts = path.split("/")
+        product = self.products.get((parts[2], parts[6])) if len(parts) > 6 else None
+        if product is None:
+            return 404, {"error": "unknown product"}
+        api_key, reviews = product
+        if query.get("apikey") != [api_key]:
+            return 401, {"error": "invalid api key"}
+
+        offset = int(query["paging.from"][0])
+        size = min(int(query["paging.size"][0]), MAX_PAGE_SIZE)
+        return 200, {
+            "name": "review",
+            "paging": {
+                "total_results": len(reviews),
+                "pages_total": math.ceil(len(reviews) / size),
+                "page_size": size,
+                "current_page_number": offset // size + 1,
+            },
+            "results": [{"page_id": parts[6], "rollup": self.rollup, "reviews": reviews[offset : offset + size]}],
+        }
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Time the PowerReviews fetch against a local stand-in.")
+    arg_parser.add_argument("--reviews", type=int, default=REVIEWS)
+    arg_parser.add_argument("--latency", type=float, default=LATENCY, help="seconds added to every response")
+    arg_parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    args = arg_parser.parse_args()
+
+    rollup, recorded = recorded_reviews()
+    power_reviews = PowerReviews(rollup)
+    configs = render_configs()
+    for _, config in configs:
+        power_reviews.add(config, make_reviews(recorded, args.reviews))
+
+    mismatches = 0
+    logger.info(
+        f"{'fixture':<40} {'serial s':>9} {'reqs':>5} {'conns':>6} {'concurrent s':>13} {'reqs':>5} {'conns':>6}"
+    )
+    with ReplayServer({"/m/": power_reviews.route}, latency=args.latency) as server:
+        for name, config in configs:
+            timings = []
+            results = []
+            # One page of 10 at a time is how the reviews used to be fetched
+            for concurrency, page_size in ((1, 10), (args.concurrency, MAX_PAGE_SIZE)):
+                server.reset_counters()
+                start = time.perf_counter()
+                results.append(
+                    get_reviews(**config, concurrency=concurrency, page_size=page_size, base_url=server.base_url)
+                )
+                timings.append((time.perf_counter() - start, server.requests, server.connections))
+
+            serial, concurrent = results
+            _, served = power_reviews.products[(config["merchant_id"], config["page_id"])]
+            expected_ids = [review["review_id"] for review in served]
+            if [review["review_id"] for review in concurrent["reviews"]] != expected_ids or concurrent != serial:
+                mismatches += 1
+                logger.error(f"{name}: concurrent reviews differ from the serial fetch")
+            (serial_time, serial_reqs, serial_conns), (concurrent_time, concurrent_reqs, concurrent_conns) = timings
+            logger.info(
+                f"{name:<40} {serial_time:>9.2f} {serial_reqs:>5} {serial_conns:>6} "
+                f"{concurrent_time:>13.2f} {concurrent_reqs:>5} {concurrent_conns:>6}"
+            )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,30 @@
 import requests
 import re
 import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
 import requests
 import urllib.parse
+from requests.adapters import HTTPAdapter
+
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.field_timing import mark, profiled
+from utils.html_backend import SELECTOLAX, PageStrainer, parse_html
+from utils.json_extract import extract_json_value, iter_json_values
+from utils.json_path import get_from_json
+from utils.projection import project, wants
+from utils.review_store import ReviewStore, is_newer
+from utils.script_scanner import ScriptScanner
 
 TEST_LOCAL = True
 
@@ -26,100 +42,210 @@ html_path = CUR_DIR / "overstock_detail_2025-02-10_10-45-49.html"
 
 output_path = CUR_DIR.parent / "result" / "overstock-result.json"
 
+HTML_BACKEND = SELECTOLAX
+# Subtrees the BeautifulSoup backends build; the rest of the page is skipped while parsing
+PARSE_ONLY = PageStrainer(classes=["media-viewer__item"])
+# Set to sync reviews incrementally against the reviews stored here instead of fetching all of them on every parse
+REVIEW_STORE: ReviewStore | None = None
 
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        if isinstance(key, int):
-            obj = obj[key]
-        elif isinstance(key, str):
-            obj = obj.get(key)
-    return obj
+
+POWERREVIEWS_URL = "https://display.powerreviews.com"
+# Asked for on every request; the api clamps larger pages, and the size it served comes back in `paging.page_size`
+REVIEWS_PAGE_SIZE = 25
+# Review pages in flight at once
+REVIEWS_CONCURRENCY = 8
+
+
+def get_reviews_page(
+    session: requests.Session,
+    base_url: str,
+    api_key: str,
+    merchant_id: str,
+    page_id: str,
+    offset: int,
+    size: int,
+) -> dict[str, Any]:
+    url = f"{base_url}/m/{merchant_id}/l/en_US/product/{page_id}/reviews?paging.from={offset}&paging.size={size}&filters=&search=&sort=Newest&image_only=false&page_locale=en_US&_noconfig=true&apikey={api_key}"
+    resp = session.get(url)
+    return resp.json()
 
 
 def get_reviews(
     api_key: str,
     merchant_id: str,
     page_id: str,
+    concurrency: int = REVIEWS_CONCURRENCY,
+    page_size: int = REVIEWS_PAGE_SIZE,
+    base_url: str = POWERREVIEWS_URL,
 ) -> dict[str, Any]:
+    """Rollup and every review of the product, newest first.
+
+    The first page tells how many there are; the rest are fetched `concurrency` at a time over one pooled session
+    and reassembled in page order.
+    """
+
     ret: dict[str, Any] = {}
 
-    size = 10
-    offset = 10 * 0
-    url = f"https://display.powerreviews.com/m/{merchant_id}/l/en_US/product/{page_id}/reviews?paging.from={offset}&paging.size={size}&filters=&search=&sort=Newest&image_only=false&page_locale=en_US&_noconfig=true&apikey={api_key}"
-    resp = requests.get(url)
-    resp_json = resp.json()
-
-    ret["rollup"] = get_from_json(resp_json, ["results", 0, "rollup"])
-    ret["reviews"] = list(get_from_json(resp_json, ["results", 0, "reviews"]))
-
-    pages_total = get_from_json(resp_json, ["paging", "pages_total"])
-    for i in range(1, pages_total):
-        logger.debug(f"fetching review: {i}/{pages_total} page")
-        offset = size * i
-        url = f"https://display.powerreviews.com/m/{merchant_id}/l/en_US/product/{page_id}/reviews?paging.from={offset}&paging.size={size}&filters=&search=&sort=Newest&image_only=false&page_locale=en_US&_noconfig=true&apikey={api_key}"
-        resp = requests.get(url)
-        resp_json = resp.json()
-        ret["reviews"].extend(list(get_from_json(resp_json, ["results", 0, "reviews"])))
+    with requests.Session() as session:
+        session.mount(base_url, HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+
+        resp_json = get_reviews_page(session, base_url, api_key, merchant_id, page_id, 0, page_size)
+        ret["rollup"] = get_from_json(resp_json, ["results", 0, "rollup"])
+        ret["reviews"] = list(get_from_json(resp_json, ["results", 0, "reviews"]))
+
+        size = get_from_json(resp_json, ["paging", "page_size"]) or page_size
+        pages_total = get_from_json(resp_json, ["paging", "pages_total"]) or 0
+        logger.debug(f"fetching {max(pages_total - 1, 0)} more review pages of {size}")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pages = executor.map(
+                lambda i: get_reviews_page(session, base_url, api_key, merchant_id, page_id, size * i, size),
+                range(1, pages_total),
+            )
+            for resp_json in pages:
+                ret["reviews"].extend(list(get_from_json(resp_json, ["results", 0, "reviews"])))
     return ret
 
 
-def parse_overstock(html_content: str) -> dict[str, Any]:
-    page_elem = BeautifulSoup(html_content, "html.parser")
-    dict_details: dict[str, Any] = {}
+def sync_reviews(
+    store: ReviewStore,
+    api_key: str,
+    merchant_id: str,
+    page_id: str,
+    concurrency: int = REVIEWS_CONCURRENCY,
+    page_size: int = REVIEWS_PAGE_SIZE,
+    base_url: str = POWERREVIEWS_URL,
+) -> dict[str, Any]:
+    """`get_reviews`, but pages stop at the newest stored review and only the new ones are merged into the store.
+
+    A product with nothing stored gets a full `get_reviews`. New reviews are paged one at a time until they reach the
+    stored ones; a partial store (seeded from a single embedded page) that still holds fewer than the rollup counts
+    then gets all the older pages, `concurrency` at a time.
+    """
+
+    state = store.get(merchant_id, page_id)
+    if state is None:
+        reviews = get_reviews(api_key, merchant_id, page_id, concurrency, page_size, base_url)
+        store.put(merchant_id, page_id, reviews["rollup"], reviews["reviews"])
+        return reviews
+
+    known = {review["review_id"] for review in state["reviews"]}
+    rollup = None
+    unseen = []
+
+    def collect(resp_json: dict[str, Any]) -> bool:
+        """Keeps the page's unknown reviews; returns whether it reached the stored ones."""
+
+        reached_known = False
+        for review in get_from_json(resp_json, ["results", 0, "reviews"]) or []:
+            if review["review_id"] in known or not is_newer(review, state["newest_date"]):
+                reached_known = True
+            if review["review_id"] not in known:
+                unseen.append(review)
+        return reached_known
+
+    with requests.Session() as session:
+        session.mount(base_url, HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+
+        size = page_size
+        total_results = 0
+        pages_total = 1
+        page = 0
+        reached_known = False
+        while page < pages_total and not reached_known:
+            resp_json = get_reviews_page(session, base_url, api_key, merchant_id, page_id, size * page, size)
+            if page == 0:
+                rollup = get_from_json(resp_json, ["results", 0, "rollup"])
+                total_results = get_from_json(resp_json, ["paging", "total_results"]) or 0
+                size = get_from_json(resp_json, ["paging", "page_size"]) or size
+                pages_total = get_from_json(resp_json, ["paging", "pages_total"]) or 0
+            reached_known = collect(resp_json)
+            page += 1
+
+        fetched = page
+        if len(known) + len(unseen) < total_results and page < pages_total:
+            logger.debug(f"backfilling {pages_total - page} review pages of {size}")
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                pages = executor.map(
+                    lambda i: get_reviews_page(session, base_url, api_key, merchant_id, page_id, size * i, size),
+                    range(page, pages_total),
+                )
+                for resp_json in pages:
+                    collect(resp_json)
+            fetched = pages_total
+    logger.debug(f"{len(unseen)} new reviews in {fetched} of {pages_total} pages")
+
+    state = store.merge(merchant_id, page_id, rollup, unseen)
+    return {"rollup": state["rollup"], "reviews": state["reviews"]}
+
+
+def extract_missing_attrs(script_text: str) -> dict[str, Any]:
+    json_text = extract_json_value(script_text, "const missingAttributes")
+    return json.loads(json_text)
+
+
+def extract_init_data(script_text: str) -> dict[str, Any]:
+    json_text = extract_json_value(script_text, "initData:")
+    return json.loads(json_text)
+
+
+def extract_datalayer_product(script_text: str) -> dict[str, Any]:
+    # The first assignment initialises the product to `{}`
+    json_texts = list(iter_json_values(script_text, "window.salesforce.datalayer.product"))
+    return json.loads(json_texts[1])
+
+
+def extract_render_config(script_text: str) -> dict[str, Any]:
+    patterns = {
+        "api_key": r'api_key:\s*"([^"]+)"',
+        "merchant_id": r'merchant_id:\s*"([^"]+)"',
+        "page_id": r'page_id:\s*"([^"]+)"',
+    }
+    return {key: re.search(pattern, script_text).group(1) for key, pattern in patterns.items()}
 
-    missing_attrs: dict[str, Any] = {}
-    init_data: dict[str, Any] = {}
-    datalayer_product: dict[str, Any] = {}
-    render_config: dict[str, Any] = {}
-
-    script_elems = page_elem.select("script")
-    for script_elem in script_elems:
-        if "const missingAttributes" in script_elem.text:
-            pattern = re.compile(
-                r"const\s+missingAttributes\s*=\s*(\{.*?\})\s*const\s+scripts",
-                re.DOTALL,
-            )
-            matches = pattern.findall(script_elem.string)
-            json_text = matches[0]
-            missing_attrs = json.loads(json_text)
-        if script_elem.attrs.get("id") == "web-pixels-manager-setup":
-            pattern = re.compile(
-                r"initData:\s*(\{.*?purchasingCompany\"\:null\})\,\}",
-                re.DOTALL,
-            )
-            matches = pattern.findall(script_elem.string)
-            json_text = matches[0]
-            init_data = json.loads(json_text)
-        if "window.salesforce.datalayer.product" in script_elem.text:
-            pattern = re.compile(
-                r"window.salesforce.datalayer.product\s*=\s*(\{.*?\})\;",
-                re.DOTALL,
-            )
-            matches = pattern.findall(script_elem.string)
-            json_text = matches[1]
-            datalayer_product = json.loads(json_text)
-        if "merchant_group_id" in script_elem.text:
-            patterns = {
-                "api_key": r'api_key:\s*"([^"]+)"',
-                "merchant_id": r'merchant_id:\s*"([^"]+)"',
-                "page_id": r'page_id:\s*"([^"]+)"',
-            }
-            render_config = {key: re.search(pattern, script_elem.string).group(1) for key, pattern in patterns.items()}
 
+# All script anchors are matched in one pass over the page
+SCRIPT_SCANNER = ScriptScanner(
+    {
+        "const missingAttributes": extract_missing_attrs,
+        "web-pixels-manager-setup": extract_init_data,
+        "window.salesforce.datalayer.product": extract_datalayer_product,
+        "merchant_group_id": extract_render_config,
+    }
+)
+
+
+# Fields that need the PowerReviews api
+REVIEW_FIELDS = ("rating", "total_ratings", "review_aspects", "total_reviews")
+
+
+@profiled("overstock")
+def parse_overstock(html_content: str, fields: set[str] | None = None, backend: str | None = None) -> dict[str, Any]:
+    dict_details: dict[str, Any] = {}
+
+    mark("scripts")
+    anchors = ["const missingAttributes", "web-pixels-manager-setup", "window.salesforce.datalayer.product"]
+    if wants(fields, *REVIEW_FIELDS):
+        anchors.append("merchant_group_id")
+    script_data = SCRIPT_SCANNER.scan(html_content, anchors)
+    missing_attrs: dict[str, Any] = script_data.get("const missingAttributes", {})
+    init_data: dict[str, Any] = script_data.get("web-pixels-manager-setup", {})
+    datalayer_product: dict[str, Any] = script_data.get("window.salesforce.datalayer.product", {})
+    render_config: dict[str, Any] = script_data.get("merchant_group_id", {})
+
+    mark("envelope")
     dict_details["success"] = True
     dict_details["url"] = get_from_json(missing_attrs, ["url"])
     dict_details["result_count"] = 1
 
     detail: dict[str, Any] = {}
 
+    mark("name_brand_url")
     detail["name"] = get_from_json(missing_attrs, ["name"])
     detail["brand"] = get_from_json(missing_attrs, ["brand", "name"])
     detail["url"] = get_from_json(missing_attrs, ["url"])
 
     # Description
+    mark("description")
     description: str = get_from_json(missing_attrs, ["description"])
     detail["description"] = description
 
@@ -128,18 +254,21 @@ def parse_overstock(html_content: str) -> dict[str, Any]:
     detail["deal_badge"] = None  # TODO
 
     # Listing ID
+    mark("listing_id")
     product_variants = get_from_json(init_data, ["productVariants"])
     detail["listing_id"] = get_from_json(product_variants, [0, "product", "id"])
 
     detail["list_price"] = None  # TODO
 
     # Price
+    mark("price")
     detail["price"] = get_from_json(product_variants, [0, "price", "amount"])
 
     detail["price_reduced"] = None  # TODO
     detail["price_per_unit"] = None  # TODO
 
     # Currency & Symbol
+    mark("currency_symbol")
     detail["currency"] = get_from_json(product_variants, [0, "price", "currencyCode"])  # TODO
     detail["currency_symbol"] = get_from_json(datalayer_product, ["currency"])
 
@@ -147,11 +276,18 @@ def parse_overstock(html_content: str) -> dict[str, Any]:
     detail["other_sellers"] = None  # TODO
 
     # Rating
-    reviews = get_reviews(
-        api_key=get_from_json(render_config, ["api_key"]),
-        merchant_id=get_from_json(render_config, ["merchant_id"]),
-        page_id=get_from_json(render_config, ["page_id"]),
-    )
+    mark("rating")
+    reviews = {}
+    if wants(fields, *REVIEW_FIELDS):
+        review_args = {
+            "api_key": get_from_json(render_config, ["api_key"]),
+            "merchant_id": get_from_json(render_config, ["merchant_id"]),
+            "page_id": get_from_json(render_config, ["page_id"]),
+        }
+        if REVIEW_STORE is not None:
+            reviews = sync_reviews(REVIEW_STORE, **review_args)
+        else:
+            reviews = get_reviews(**review_args)
     detail["rating"] = get_from_json(reviews, ["rollup", "average_rating"])
     detail["total_ratings"] = get_from_json(reviews, ["rollup", "rating_count"])
 
@@ -163,73 +299,87 @@ def parse_overstock(html_content: str) -> dict[str, Any]:
     detail["pay_later_offers"] = None  # TODO
 
     # Quantity
+    mark("quantity")
     detail["max_quantity"] = get_from_json(datalayer_product, ["inventory", 0, "quantity"])
 
     # Variant
+    mark("variant")
     detail["variant"] = {
         "id": get_from_json(product_variants, [0, "id"]),
     }
 
     # Categories
+    mark("categories")
     detail["categories"] = get_from_json(datalayer_product, ["taxonomyList"])
 
     # Main Image
-    detail["main_image"] = "https:" + get_from_json(product_variants, [0, "image", "src"])
+    mark("main_image")
+    if wants(fields, "main_image"):
+        detail["main_image"] = "https:" + get_from_json(product_variants, [0, "image", "src"])
 
     # Images
-    images: list[str] = []
-    image_elems = page_elem.select("li.media-viewer__item")
-    for image_elem in image_elems:
-        image_elem = image_elem.select_one("img")
-        if image_elem is not None:
-            image_src = image_elem.attrs.get("data-src", image_elem.attrs.get("src"))
-            if image_src is not None:
-                image_url = "https:" + image_src
-                image_url = image_url.split("?")[0].strip() # Ensures max image size 2000x2000
-                images.append(image_url)
-    detail["images"] = images
+    mark("images")
+    if wants(fields, "images"):
+        page_elem = parse_html(html_content, backend or HTML_BACKEND, PARSE_ONLY)
+        images: list[str] = []
+        image_elems = page_elem.select("li.media-viewer__item")
+        for image_elem in image_elems:
+            image_elem = image_elem.select_one("img")
+            if image_elem is not None:
+                image_src = image_elem.attrs.get("data-src", image_elem.attrs.get("src"))
+                if image_src is not None:
+                    image_url = "https:" + image_src
+                    image_url = image_url.split("?")[0].strip() # Ensures max image size 2000x2000
+                    images.append(image_url)
+        detail["images"] = images
 
     detail["labelled_images"] = None  # TODO
 
     # Overview
-    attribute_list = get_from_json(datalayer_product, ["attributeList"])
-    detail["overview"] = [
-        {
-            "name": get_from_json(attribute, ["label"]),
-            "value": get_from_json(attribute, ["values"]),
-        }
-        for attribute in attribute_list
-    ]
+    mark("overview")
+    if wants(fields, "overview", "details_table"):
+        attribute_list = get_from_json(datalayer_product, ["attributeList"])
+        detail["overview"] = [
+            {
+                "name": get_from_json(attribute, ["label"]),
+                "value": get_from_json(attribute, ["values"]),
+            }
+            for attribute in attribute_list
+        ]
 
     # Features & Dimensions & Description
-    features = []
-    dimensions = []
-    description_new = ""
-    status = "description"
-    for line in description.splitlines():
-        line = line.strip()
-        if line == "":
-            continue
-
-        if line.lower() == "features:":
-            status = "features"
-        elif line.lower() == "dimensions:":
-            status = "dimensions"
-        elif line.endswith(":"):
-            status = "none"
-        else:
-            if status == "features":
-                features.append(line)
-            elif status == "dimensions":
-                dimensions.append(line)
-            elif status == "description":
-                description_new += f"{line}\n"
-    detail["description"] = description_new
-    detail["features"] = features
-    detail["dimensions"] = dimensions
+    mark("features_dimensions_description")
+    if wants(fields, "description", "features", "dimensions"):
+        features = []
+        dimensions = []
+        description_new = ""
+        status = "description"
+        for line in description.splitlines():
+            line = line.strip()
+            if line == "":
+                continue
+
+            if line.lower() == "features:":
+                status = "features"
+            elif line.lower() == "dimensions:":
+                status = "dimensions"
+            elif line.endswith(":"):
+                status = "none"
+            else:
+                if status == "features":
+                    features.append(line)
+                elif status == "dimensions":
+                    dimensions.append(line)
+                elif status == "description":
+                    description_new += f"{line}\n"
+        detail["description"] = description_new
+        detail["features"] = features
+        detail["dimensions"] = dimensions
 
     # Details Table
-    detail["details_table"] = detail["overview"]
+    mark("details_table")
+    if wants(fields, "details_table"):
+        detail["details_table"] = detail["overview"]
 
     detail["technical_details"] = None  # TODO
     detail["bestseller_ranks"] = None  # TODO
@@ -237,43 +387,49 @@ def parse_overstock(html_content: str) -> dict[str, Any]:
     detail["seller_url"] = None  # TODO
 
     # Variants
-    detail["variants"] = [
-        {
-            "price": get_from_json(product_variant, ["price", "amount"]),
-            "currency_code": get_from_json(product_variant, ["price", "currencyCode"]),
-            "title": get_from_json(product_variant, ["product", "title"]),
-            "vendor": get_from_json(product_variant, ["product", "vendor"]),
-            "id": get_from_json(product_variant, ["id"]),
-            "image": get_from_json(product_variant, ["image", "src"]),
-            "sku": get_from_json(product_variant, ["sku"]),
-            "variant_title": get_from_json(product_variant, ["title"]),
-        }
-        for product_variant in product_variants
-    ]
+    mark("variants")
+    if wants(fields, "variants"):
+        detail["variants"] = [
+            {
+                "price": get_from_json(product_variant, ["price", "amount"]),
+                "currency_code": get_from_json(product_variant, ["price", "currencyCode"]),
+                "title": get_from_json(product_variant, ["product", "title"]),
+                "vendor": get_from_json(product_variant, ["product", "vendor"]),
+                "id": get_from_json(product_variant, ["id"]),
+                "image": get_from_json(product_variant, ["image", "src"]),
+                "sku": get_from_json(product_variant, ["sku"]),
+                "variant_title": get_from_json(product_variant, ["title"]),
+            }
+            for product_variant in product_variants
+        ]
 
     detail["reviews_summary"] = None  # TODO
 
     # Review Aspects
-    detail["review_aspects"] = [
-        {
-            "name": get_from_json(review, ["details", "nickname"]),
-            "headline": get_from_json(review, ["details", "headline"]),
-            "comments": get_from_json(review, ["details", "comments"]),
-            "rating": get_from_json(review, ["metrics", "rating"]),
-            "helpful_votes": get_from_json(review, ["metrics", "helpful_votes"]),
-            "not_helpful_votes": get_from_json(review, ["metrics", "not_helpful_votes"]),
-            "helpful_score": get_from_json(review, ["metrics", "helpful_score"]),
-            "is_staff_reviewer": get_from_json(review, ["badges", "is_staff_reviewer"]),
-            "is_verified_buyer": get_from_json(review, ["badges", "is_verified_buyer"]),
-            "is_verified_reviewer": get_from_json(review, ["badges", "is_verified_reviewer"]),
-        }
-        for review in get_from_json(reviews, ["reviews"])
-    ]
+    mark("review_aspects")
+    if wants(fields, "review_aspects"):
+        detail["review_aspects"] = [
+            {
+                "name": get_from_json(review, ["details", "nickname"]),
+                "headline": get_from_json(review, ["details", "headline"]),
+                "comments": get_from_json(review, ["details", "comments"]),
+                "rating": get_from_json(review, ["metrics", "rating"]),
+                "helpful_votes": get_from_json(review, ["metrics", "helpful_votes"]),
+                "not_helpful_votes": get_from_json(review, ["metrics", "not_helpful_votes"]),
+                "helpful_score": get_from_json(review, ["metrics", "helpful_score"]),
+                "is_staff_reviewer": get_from_json(review, ["badges", "is_staff_reviewer"]),
+                "is_verified_buyer": get_from_json(review, ["badges", "is_verified_buyer"]),
+                "is_verified_reviewer": get_from_json(review, ["badges", "is_verified_reviewer"]),
+            }
+            for review in get_from_json(reviews, ["reviews"])
+        ]
 
     # Total Reviews
+    mark("total_reviews")
     detail["total_reviews"] = get_from_json(reviews, ["rollup", "review_count"])
 
     # Country of Region
+    mark("country_of_region")
     detail["country_of_origin"] = get_from_json(init_data, ["shop", "countryCode"])
 
     detail["top_reviews"] = None  # TODO
@@ -284,7 +440,7 @@ def parse_overstock(html_content: str) -> dict[str, Any]:
     detail["from_the_manufacturer"] = None  # TODO
     detail["small_business"] = None  # TODO
 
-    dict_details["detail"] = detail
+    dict_details["detail"] = project(detail, fields)
     dict_details["remaining_credits"] = None
 
     return dict_details
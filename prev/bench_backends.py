@@ -0,0 +1,57 @@
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from parse_mercado import parse_mercado_html
+from parse_tesco_html import parse_tesco_html
+from parse_wayfair import parse_wayfair_html
+from parse_wayfair_category import parse_wayfair_html as parse_wayfair_category_html
+from utils.html_backend import HTML_BACKENDS, HTML_PARSER
+
+CUR_DIR = Path(__file__).parent
+
+REPEAT = 5
+
+PARSERS = [
+    (parse_wayfair_html, "wayfair_detail_*.html"),
+    (parse_wayfair_html, "wayfair-variation.html"),
+    (parse_wayfair_category_html, "wayfair_category.html"),
+    (parse_mercado_html, "mercado_search.html"),
+    (parse_tesco_html, "tesco_detail.html"),
+]
+
+
+def best_of(parse, html_content: str, backend: str) -> tuple[float, dict | list | str]:
+    best = float("inf")
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        try:
+            result = parse(html_content, backend=backend)
+        except Exception as e:
+            return best, f"{type(e).__name__}: {e}"
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    logger.info(f"{'fixture':<42} " + " ".join(f"{backend:>22}" for backend in HTML_BACKENDS))
+    for parse, pattern in PARSERS:
+        for html_path in sorted(CUR_DIR.glob(pattern)):
+            with html_path.open("r", encoding="utf-8") as html_file:
+                html_content = html_file.read()
+
+            _, reference = best_of(parse, html_content, HTML_PARSER)
+            cells = []
+            for backend in HTML_BACKENDS:
+                elapsed, result = best_of(parse, html_content, backend)
+                if isinstance(result, str):
+                    cells.append(f"{'-':>12} {'error':>9}")
+                else:
+                    cells.append(f"{elapsed * 1000:>9.2f} ms {'same' if result == reference else 'differs':>9}")
+            logger.info(f"{html_path.name:<42} " + " ".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
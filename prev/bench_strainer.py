@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from loguru import logger
+
+from utils.parse_bench import measure_parse
+
+CUR_DIR = Path(__file__).parent
+
+PARSERS = [
+    ("parse_wayfair", "parse_wayfair_html", "wayfair_detail_*.html"),
+    ("parse_wayfair", "parse_wayfair_html", "wayfair-variation.html"),
+    ("parse_wayfair_category", "parse_wayfair_html", "wayfair_category.html"),
+    ("parse_mercado", "parse_mercado_html", "mercado_search.html"),
+    ("parse_tesco_html", "parse_tesco_html", "tesco_detail.html"),
+]
+# The strainer only applies to the BeautifulSoup backends
+BACKEND = "lxml"
+
+
+def main() -> None:
+    logger.info(f"{'fixture':<40} {'MB':>5} {'full ms':>8} {'full MiB':>9} {'strained ms':>12} {'strained MiB':>13}")
+    for module_name, func_name, pattern in PARSERS:
+        for html_path in sorted(CUR_DIR.glob(pattern)):
+            kwargs = {"backend": BACKEND}
+            full_time, full_rss, full_result = measure_parse(module_name, func_name, html_path, kwargs, False)
+            strained_time, strained_rss, strained_result = measure_parse(module_name, func_name, html_path, kwargs, True)
+            if full_result != strained_result:
+                raise AssertionError(f"strained output differs for {html_path.name}")
+
+            logger.info(
+                f"{html_path.name:<40} {html_path.stat().st_size / 1e6:>5.1f} {full_time * 1000:>8.1f} "
+                f"{full_rss / 1024:>9.1f} {strained_time * 1000:>12.1f} {strained_rss / 1024:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
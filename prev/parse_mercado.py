@@ -3,28 +3,24 @@ import json
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
+from utils.html_backend import SELECTOLAX, PageStrainer, parse_html
+
 CUR_DIR = Path(__file__).parent
 
 html_path = CUR_DIR / "mercado_search.html"
 output_path = CUR_DIR / "mercado-result.json"
 
-
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        obj = obj.get(key)
-    return obj
+HTML_BACKEND = SELECTOLAX
+# Subtrees the BeautifulSoup backends build; the rest of the page is skipped while parsing
+PARSE_ONLY = PageStrainer(classes=["ui-search-layout__item"])
 
 
-def parse_mercado_html(html_content: str) -> list[dict[str, Any]]:
+def parse_mercado_html(html_content: str, backend: str | None = None) -> list[dict[str, Any]]:
     """Parses html content and returns a list of product information."""
 
-    page_elem = BeautifulSoup(html_content, "html.parser")
+    page_elem = parse_html(html_content, backend or HTML_BACKEND, PARSE_ONLY)
 
     card_elems = page_elem.select("li.ui-search-layout__item")
     list_results: list[dict[str, Any]] = []
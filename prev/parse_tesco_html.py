@@ -2,28 +2,25 @@ import json
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
+from utils.html_backend import SELECTOLAX, PageStrainer, parse_html
+from utils.json_path import get_from_json
+
 CUR_DIR = Path(__file__).parent
 
 html_path = CUR_DIR / "tesco_detail.html"
 output_path = CUR_DIR / "tesco-detail-result.json"
 
-
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        obj = obj.get(key)
-    return obj
+HTML_BACKEND = SELECTOLAX
+# Subtrees the BeautifulSoup backends build; the rest of the page is skipped while parsing
+PARSE_ONLY = PageStrainer(names=["script"])
 
 
-def parse_tesco_html(html_content: str) -> list[dict[str, Any]]:
+def parse_tesco_html(html_content: str, backend: str | None = None) -> list[dict[str, Any]]:
     """Parses html content and returns a list of product information."""
 
-    page_elem = BeautifulSoup(html_content, "html.parser")
+    page_elem = parse_html(html_content, backend or HTML_BACKEND, PARSE_ONLY)
     dict_details: dict[str, Any] = {}
 
     json_data_str = page_elem.select_one("script[type='application/discover+json']").text
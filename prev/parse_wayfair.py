@@ -3,9 +3,12 @@ import json
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
+from utils.html_backend import LXML, PageStrainer, parse_html
+from utils.json_path import get_from_json
+from utils.projection import project, wants
+
 CUR_DIR = Path(__file__).parent
 
 html_path = CUR_DIR / "wayfair_detail_2024-12-08_12-51-54.html"
@@ -20,23 +23,19 @@ html_path = CUR_DIR / "wayfair_detail_2.html"
 
 output_path = CUR_DIR / "wayfair-result.json"
 
-
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        obj = obj.get(key)
-    return obj
+# The rating cell is read through .contents, so it needs a BeautifulSoup backend
+HTML_BACKEND = LXML
+# Subtrees the BeautifulSoup backends build; the rest of the page is skipped while parsing
+PARSE_ONLY = PageStrainer(names=["script", "link"], ids=["sf-ui-browse::application"])
 
 
-def parse_wayfair_html(html_content: str) -> dict[str, Any]:
-    """Parses wayfair product html content and returns parsed product detail as json."""
+def parse_wayfair_html(html_content: str, fields: set[str] | None = None, backend: str | None = None) -> dict[str, Any]:
+    """Parses wayfair product html content and returns parsed product detail as json, limited to `fields` when given."""
 
     dict_detail: dict[str, Any] = {}
     dict_detail["success"] = True
 
-    page_elem = BeautifulSoup(html_content, "html.parser")
+    page_elem = parse_html(html_content, backend or HTML_BACKEND, PARSE_ONLY)
     content_elem = page_elem.select_one("div[id='sf-ui-browse::application']")
 
     data_json = None
@@ -77,18 +76,19 @@ def parse_wayfair_html(html_content: str) -> dict[str, Any]:
     # ================================
     # Images
     # ================================
-    list_elem = content_elem.select_one("ul.HotDealsThumbnailCarousel-container")
-    item_elem_list = list_elem.select("li")
-    images: list[str] = []
-    for item_elem in item_elem_list:
-        img_url = item_elem.select_one("img").attrs["src"]
-        if img_url.startswith("data:image"):
-            continue
-        img_url = re.sub(r'timg-h\d+(?:-w\d+)?', 'resize-h800-w800', img_url)
-        img_url = re.sub(r'resize-h\d+(?:-w\d+)?', 'resize-h800-w800', img_url)
-        img_url = re.sub(r'compr-r\d+', 'compr-r85', img_url)
-        images.append(img_url)
-    detail["images"] = images
+    if wants(fields, "images"):
+        list_elem = content_elem.select_one("ul.HotDealsThumbnailCarousel-container")
+        item_elem_list = list_elem.select("li")
+        images: list[str] = []
+        for item_elem in item_elem_list:
+            img_url = item_elem.select_one("img").attrs["src"]
+            if img_url.startswith("data:image"):
+                continue
+            img_url = re.sub(r'timg-h\d+(?:-w\d+)?', 'resize-h800-w800', img_url)
+            img_url = re.sub(r'resize-h\d+(?:-w\d+)?', 'resize-h800-w800', img_url)
+            img_url = re.sub(r'compr-r\d+', 'compr-r85', img_url)
+            images.append(img_url)
+        detail["images"] = images
 
     # ================================
     # Price
@@ -150,13 +150,14 @@ def parse_wayfair_html(html_content: str) -> dict[str, Any]:
     # ================================
     # Rating
     # ================================
-    rating_str_list = content_elem.select_one("button[data-hb-id=ReviewStars]>p").contents
-    detail["rating"] = float(rating_str_list[0].split()[1].strip())
+    if wants(fields, "rating", "total_ratings"):
+        rating_str_list = content_elem.select_one("button[data-hb-id=ReviewStars]>p").contents
+        detail["rating"] = float(rating_str_list[0].split()[1].strip())
 
-    # ================================
-    # Total ratings
-    # ================================
-    detail["total_ratings"] = int(rating_str_list[2].split()[0].strip())
+        # ================================
+        # Total ratings
+        # ================================
+        detail["total_ratings"] = int(rating_str_list[2].split()[0].strip())
 
     # ================================
     # Total reviews
@@ -176,38 +177,39 @@ def parse_wayfair_html(html_content: str) -> dict[str, Any]:
     # ================================
     # Variant
     # ================================
-    selected_options = get_from_json(product_data, ["options", "selectedOptions"])
-    detail["variant"] = []
-
-    # ================================
-    # Variants
-    # ================================
-    variants = []
-    categories = get_from_json(product_data, ["options", "standardOptions"])
-    if categories is not None:
-        for category in categories:
-            type_name = get_from_json(category, ["category_name"])
-
-            options = get_from_json(category, ["options"])
-            for option in options:
-                option_value = get_from_json(option, ["name"])
-                option_id = get_from_json(option, ["option_id"])
-                if option_id in selected_options:
-                    detail["variant"].append(
-                        {
-                            "type":type_name,
-                            "value":option_value,
-                        }
-                    )
-
-                thumbnail_id = str(get_from_json(option, ["thumbnail_id"]))
-                image_url = re.sub(r"/\d+/\d+/", f"/{thumbnail_id[:4]}/{thumbnail_id}/", main_image)
-                variants.append({
-                    "type": type_name,
-                    "value": option_value,
-                    "image_url": image_url,
-                })
-    detail["variants"] = variants
+    if wants(fields, "variant", "variants"):
+        selected_options = get_from_json(product_data, ["options", "selectedOptions"])
+        detail["variant"] = []
+
+        # ================================
+        # Variants
+        # ================================
+        variants = []
+        categories = get_from_json(product_data, ["options", "standardOptions"])
+        if categories is not None:
+            for category in categories:
+                type_name = get_from_json(category, ["category_name"])
+
+                options = get_from_json(category, ["options"])
+                for option in options:
+                    option_value = get_from_json(option, ["name"])
+                    option_id = get_from_json(option, ["option_id"])
+                    if option_id in selected_options:
+                        detail["variant"].append(
+                            {
+                                "type":type_name,
+                                "value":option_value,
+                            }
+                        )
+
+                    thumbnail_id = str(get_from_json(option, ["thumbnail_id"]))
+                    image_url = re.sub(r"/\d+/\d+/", f"/{thumbnail_id[:4]}/{thumbnail_id}/", main_image)
+                    variants.append({
+                        "type": type_name,
+                        "value": option_value,
+                        "image_url": image_url,
+                    })
+        detail["variants"] = variants
 
     # ================================
     # Product overview
@@ -235,7 +237,7 @@ def parse_wayfair_html(html_content: str) -> dict[str, Any]:
     # ================================
     detail["at-a-glance"] = None
 
-    dict_detail["detail"] = detail
+    dict_detail["detail"] = project(detail, fields)
 
     # ================================
     # Remaining credits
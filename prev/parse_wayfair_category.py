@@ -3,31 +3,28 @@ import re
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
+from utils.html_backend import SELECTOLAX, PageStrainer, parse_html
+from utils.json_path import get_from_json
+
 CUR_DIR = Path(__file__).parent
 
 html_path = CUR_DIR / "wayfair_category.html"
 
 output_path = CUR_DIR / "wayfair-category-result.json"
 
-
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        obj = obj.get(key)
-    return obj
+HTML_BACKEND = SELECTOLAX
+# Subtrees the BeautifulSoup backends build; the rest of the page is skipped while parsing
+PARSE_ONLY = PageStrainer(names=["script", "img"])
 
 
-def parse_wayfair_html(html_content: str) -> dict[str, Any]:
+def parse_wayfair_html(html_content: str, backend: str | None = None) -> dict[str, Any]:
     """Parses wayfair product html content and returns parsed product detail as json."""
 
     list_results: list[dict[str, Any]] = []
 
-    page_elem = BeautifulSoup(html_content, "html.parser")
+    page_elem = parse_html(html_content, backend or HTML_BACKEND, PARSE_ONLY)
 
     data_json = None
     try:
@@ -0,0 +1,245 @@
+"""Parses whole snapshot directories across a process pool and streams one json line per document.
+
+    python -m utils.batch samples/ "snapshots/2025-03-*/*.html" --output results.jsonl --workers 8
+    python -m utils.batch samples/ --output results.jsonl --retry-queue blocked.jsonl
+
+Block and captcha pages are never handed to a parser; their records carry `blocked` and, with `--retry-queue`,
+are also written to that file for the scrapers to fetch again. Once they have, the queue itself is a valid input:
+
+    python -m utils.batch blocked.jsonl --output retried.jsonl
+
+With `--cache-dir`, a page whose bytes were parsed before is served from the cache, except for retailers whose
+`cacheable` is off because their parser calls live apis. `--dedupe` also strips the regions that change on every
+request before hashing, and serves a recapture of a known product url whose simhash is within
+`utils.canonical.NEAR_DISTANCE` bits of the last parsed one, provided the fields `utils.delta` watches for the
+retailer (price, stock) read the same on both. A moved price fits in those few bits, so retailers without delta
+fields only ever get exact hits. Such records carry `near_duplicate` with the key and distance of the capture their
+result came from. Canonicalising, fingerprinting and the delta fast path cost about as much as a cheap parse, so
+`--dedupe` only pays off on recrawls of mostly unchanged products.
+"""
+
+import argparse
+import glob
+import inspect
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from loguru import logger
+
+from utils.blocking import detect_block
+from utils.canonical import NEAR_DISTANCE, canonical_url, canonicalise, distance, simhash
+from utils.classify import classify
+from utils.result_cache import DEFAULT_MAX_BYTES, MISS, ResultCache, content_key, normalise
+from utils.retailers import RETAILERS, load_parser, retailer_from_filename
+
+CHUNKSIZE = 16
+# Error kind of a record whose page was a block page
+BLOCKED = "blocked"
+# How a result came out of the cache
+EXACT = "exact"
+NEAR = "near"
+
+
+def iter_paths(inputs: list[str]) -> Iterator[str]:
+    """Expands directories (recursively, `*.html`), globs and retry queues; plain file names pass through."""
+
+    for input_path in inputs:
+        if input_path.endswith(".jsonl"):
+            with open(input_path, "r", encoding="utf-8") as queue_file:
+                yield from dict.fromkeys(json.loads(line)["path"] for line in queue_file if line.strip())
+        elif os.path.isdir(input_path):
+            yield from (str(path) for path in sorted(Path(input_path).rglob("*.html")))
+        elif glob.has_magic(input_path):
+            yield from sorted(glob.iglob(input_path, recursive=True))
+        else:
+            yield input_path
+
+
+@lru_cache(maxsize=None)
+def accepts_fields(parse: Callable) -> bool:
+    return "fields" in inspect.signature(parse).parameters
+
+
+@lru_cache(maxsize=None)
+def result_cache(directory: str, max_bytes: int) -> ResultCache:
+    """One cache object per worker process, so its size estimate carries over between documents."""
+
+    return ResultCache(directory, max_bytes)
+
+
+def volatile_values(retailer: str, html_content: str) -> str | None:
+    """Hash of the fields `utils.delta` re-extracts for the retailer, or `None` when it has none."""
+
+    # Imported here because utils.delta reads its inputs through this module
+    from utils.delta import DELTA_SPECS, fast_path
+
+    if retailer not in DELTA_SPECS:
+        return None
+    values = fast_path(retailer)(html_content)
+    return content_key(json.dumps(values, sort_keys=True, default=str).encode())
+
+
+def parse_path(
+    path: str,
+    retailer: str | None,
+    fields: frozenset[str] | None,
+    cache_dir: str | None = None,
+    cache_bytes: int = DEFAULT_MAX_BYTES,
+    dedupe: bool = False,
+) -> tuple[str, str | None, int, bool, str, str]:
+    """Worker side: reads and parses one document.
+
+    Returns (json line, retailer, bytes, ok, error kind, `EXACT` or `NEAR` when served from the cache else "").
+    """
+
+    record: dict[str, Any] = {"path": path, "retailer": retailer}
+    size = 0
+    try:
+        with open(path, "rb") as html_file:
+            raw = html_file.read()
+        size = len(raw)
+        # Decoded from the very bytes the cache key hashes
+        raw = normalise(raw)
+        html_content = raw.decode("utf-8")
+        # The page head is trusted over the file name, which is only what the scraper was pointed at
+        retailer = record["retailer"] = (
+            retailer or classify(html_content) or retailer_from_filename(os.path.basename(path))
+        )
+        blocked = detect_block(html_content, retailer)
+        if blocked is not None:
+            record["ok"] = False
+            record["blocked"] = {"reason": blocked.reason, "signature": blocked.signature}
+            return json.dumps(record, ensure_ascii=False), retailer, size, False, BLOCKED, ""
+        if retailer is None:
+            raise ValueError("retailer not recognised")
+        if retailer not in RETAILERS:
+            raise LookupError(f"no parser for {retailer}")
+
+        # Block pages were turned away above
+        parse = load_parser(retailer, RETAILERS[retailer].func_name)
+        projection = fields if fields is not None and accepts_fields(parse) else None
+        cache = result_cache(cache_dir, cache_bytes) if cache_dir and RETAILERS[retailer].cacheable else None
+        canonical = canonicalise(raw, retailer) if cache is not None and dedupe else raw
+        key = content_key(canonical, projection) if cache is not None else ""
+        result = cache.get(retailer, key) if cache is not None else MISS
+        cached = EXACT if result is not MISS else ""
+
+        url = canonical_url(raw) if not cached and cache is not None and dedupe else None
+        values = volatile_values(retailer, html_content) if url is not None else None
+        fingerprint = simhash(canonical) if values is not None else None
+        if fingerprint is not None:
+            previous = cache.get_fingerprint(retailer, url, projection)
+            if previous is not None and previous[2] == values and distance(fingerprint, previous[0]) <= NEAR_DISTANCE:
+                result = cache.get(retailer, previous[1])
+                if result is not MISS:
+                    cached = NEAR
+                    record["near_duplicate"] = {"key": previous[1], "distance": distance(fingerprint, previous[0])}
+        if not cached:
+            result = parse(html_content, fields=set(projection)) if projection is not None else parse(html_content)
+            if cache is not None:
+                cache.put(retailer, key, result)
+                # A near hit leaves the record alone, so drift is measured from a parsed capture and never adds up
+                if fingerprint is not None:
+                    cache.put_fingerprint(retailer, url, fingerprint, key, values, projection)
+        record["ok"] = True
+        record["result"] = result
+        return json.dumps(record, default=str, ensure_ascii=False), retailer, size, True, "", cached
+    except Exception as e:
+        record["ok"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+        return json.dumps(record, ensure_ascii=False), retailer, size, False, type(e).__name__, ""
+
+
+def _parse_path_args(args: tuple) -> tuple[str, str | None, int, bool, str, str]:
+    return parse_path(*args)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Parse snapshot files in bulk into json lines.")
+    arg_parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns")
+    arg_parser.add_argument("--output", default="-", help="jsonl output path, `-` for stdout")
+    arg_parser.add_argument("--retailer", choices=list(RETAILERS), help="skip detection and use this parser")
+    arg_parser.add_argument(
+        "--fields", help="comma separated fields to extract; parsers without projection return everything"
+    )
+    arg_parser.add_argument("--workers", type=int, default=os.cpu_count())
+    arg_parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    arg_parser.add_argument("--retry-queue", help="jsonl file the records of block pages are appended to")
+    arg_parser.add_argument("--cache-dir", help="reuse results of pages parsed before, stored in this directory")
+    arg_parser.add_argument(
+        "--cache-size", type=int, default=DEFAULT_MAX_BYTES // 2**20, help="cache budget in MiB, oldest evicted"
+    )
+    arg_parser.add_argument(
+        "--dedupe", action="store_true", help="with --cache-dir, also reuse results of near-identical recaptures"
+    )
+    args = arg_parser.parse_args()
+    if args.dedupe and not args.cache_dir:
+        arg_parser.error("--dedupe needs --cache-dir")
+
+    fields = frozenset(args.fields.split(",")) if args.fields else None
+    cache_bytes = args.cache_size * 2**20
+    tasks = (
+        (path, args.retailer, fields, args.cache_dir, cache_bytes, args.dedupe) for path in iter_paths(args.inputs)
+    )
+
+    docs = 0
+    total_bytes = 0
+    per_retailer: Counter[str] = Counter()
+    failures: Counter[tuple[str, str]] = Counter()
+    blocked: Counter[str] = Counter()
+    cache_hits: Counter[str] = Counter()
+    start = time.perf_counter()
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    retry_file = open(args.retry_queue, "a", encoding="utf-8") if args.retry_queue else None
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = executor.map(_parse_path_args, tasks, chunksize=args.chunksize)
+            for line, retailer, size, ok, error_kind, cached in results:
+                output_file.write(line + "\n")
+                docs += 1
+                total_bytes += size
+                if cached:
+                    cache_hits[cached] += 1
+                per_retailer[retailer or "unknown"] += 1
+                if error_kind == BLOCKED:
+                    blocked[retailer or "unknown"] += 1
+                    if retry_file is not None:
+                        retry_file.write(line + "\n")
+                elif not ok:
+                    failures[(retailer or "unknown", error_kind)] += 1
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+        if retry_file is not None:
+            retry_file.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"{docs} documents, {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s: "
+        f"{docs / elapsed:.1f} docs/sec, {total_bytes / 1e6 / elapsed:.1f} MB/sec with {args.workers} workers"
+    )
+    for retailer, count in per_retailer.most_common():
+        logger.info(f"  {retailer:<17} {count:>8}")
+    if args.cache_dir:
+        near = f", {cache_hits[NEAR]} of them near-duplicates" if args.dedupe else ""
+        logger.info(f"{cache_hits.total()} of {docs} results served from {args.cache_dir}{near}")
+    if blocked:
+        destination = f", queued in {args.retry_queue}" if args.retry_queue else ""
+        logger.warning(f"{sum(blocked.values())} block pages skipped{destination}")
+        for retailer, count in blocked.most_common():
+            logger.warning(f"  {retailer:<17} {count:>8}")
+    if failures:
+        logger.warning(f"{sum(failures.values())} failures")
+        for (retailer, error_kind), count in failures.most_common():
+            logger.warning(f"  {retailer:<17} {error_kind:<20} {count:>8}")
+
+
+if __name__ == "__main__":
+    main()
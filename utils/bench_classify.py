@@ -0,0 +1,54 @@
+"""Checks the head classifier against every checked-in fixture and times it per document.
+
+    python -m utils.bench_classify [--repeats 1000]
+
+A fixture's expected retailer comes from its file name; fixtures without a scraper prefix are only reported.
+"""
+
+import argparse
+import sys
+import timeit
+
+from loguru import logger
+
+from utils.classify import classify
+from utils.retailers import ROOT_DIR, retailer_from_filename
+
+REPEATS = 1000
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Check and time the retailer classifier over the fixtures.")
+    arg_parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = arg_parser.parse_args()
+
+    mismatches = 0
+    timings = []
+    for html_path in sorted(ROOT_DIR.glob("*/*.html")):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            html_content = html_file.read()
+        expected = retailer_from_filename(html_path.name)
+        retailer = classify(html_content)
+        # Best of a few runs, so the number is the classifier's and not the machine's
+        per_call = min(timeit.repeat(lambda: classify(html_content), number=args.repeats, repeat=3)) / args.repeats
+        timings.append(per_call)
+
+        relative_path = html_path.relative_to(ROOT_DIR)
+        if expected is not None and retailer != expected:
+            mismatches += 1
+            logger.error(f"{relative_path}: classified as {retailer}, expected {expected}")
+        else:
+            logger.info(f"{str(relative_path):<60} {str(retailer):<17} {per_call * 1e6:>7.1f} us")
+
+    timings.sort()
+    logger.info(
+        f"{len(timings)} documents: median {timings[len(timings) // 2] * 1e6:.1f} us, "
+        f"max {timings[-1] * 1e6:.1f} us per document"
+    )
+    if mismatches:
+        logger.error(f"{mismatches} documents misclassified")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Runs every retailer parser over its checked-in fixtures and compares the numbers against a stored baseline.
+
+    python -m utils.bench_runner [--retailers costco wayfair] [--rounds 5] [--output result.json]
+    python -m utils.bench_runner --update-baseline
+    python -m utils.bench_runner --retailers costco --profile-fields costco.folded
+
+Network calls are replayed from recorded json; any other request fails the run.
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import requests
+from loguru import logger
+
+from utils import field_timing
+from utils.blocking import Blocked
+from utils.json_path import get_from_json
+from utils.retailers import RETAILERS, ROOT_DIR, fixture_paths, load_parser
+
+BASELINE_PATH = Path(__file__).parent / "bench_baseline.json"
+
+ROUNDS = 5
+# Allowed relative slowdown / growth before a metric counts as a regression; shared machines swing by a third
+TOLERANCE = 0.5
+# Peak memory below this growth (MiB) is noise from allocator and interpreter state
+MEMORY_SLACK_MIB = 2.0
+
+# Recorded api responses served in place of the network, keyed on a url prefix
+REPLAYS = {
+    "https://www.samsclub.com/api/node/vivaldi/": ("1.samsclub/samsclub-product-vivaldi-browse.json", []),
+    "https://display.powerreviews.com/": (
+        "bedbathbeyond/next_data.json",
+        ["props", "pageProps", "initialPowerReviews"],
+    ),
+}
+
+
+class ReplayResponse:
+    def __init__(self, data: Any) -> None:
+        self.data = data
+        self.status_code = 200
+
+    def json(self) -> Any:
+        return self.data
+
+
+def replay_request(url: str, *args, **kwargs) -> ReplayResponse:
+    for prefix, (json_path, path) in REPLAYS.items():
+        if url.startswith(prefix):
+            with (ROOT_DIR / json_path).open("r", encoding="utf-8") as json_file:
+                return ReplayResponse(get_from_json(json.load(json_file), path))
+    raise RuntimeError(f"unexpected network call during benchmark: {url}")
+
+
+def replay_session_request(session: requests.Session, url: str, *args, **kwargs) -> ReplayResponse:
+    return replay_request(url, *args, **kwargs)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))]
+
+
+def run_retailer(name: str, rounds: int, profile_fields: bool = False) -> dict[str, Any]:
+    """Benchmarks one retailer; meant to run in its own process so peak memory is per retailer."""
+
+    requests.get = replay_request
+    requests.post = replay_request
+    requests.Session.get = replay_session_request
+    requests.Session.post = replay_session_request
+
+    parse = load_parser(name)
+
+    pages = []
+    for html_path in fixture_paths(RETAILERS[name]):
+        with html_path.open("r", encoding="utf-8") as html_file:
+            pages.append(html_file.read())
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages)
+
+    logger.remove()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # An untimed pass first, so lazy imports and selector compilation stay out of the latencies
+    errors = 0
+    blocked = 0
+    for page in pages:
+        try:
+            if isinstance(parse(page), Blocked):
+                blocked += 1
+        except Exception:
+            errors += 1
+
+    if profile_fields:
+        field_timing.enable()
+    latencies = []
+    round_times = []
+    for _ in range(rounds):
+        round_start = time.perf_counter()
+        for page in pages:
+            start = time.perf_counter()
+            try:
+                parse(page)
+            except Exception:
+                pass
+            latencies.append(time.perf_counter() - start)
+        round_times.append(time.perf_counter() - round_start)
+    peak_rss_mib = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+
+    # Throughput comes from the fastest round, which is the least disturbed by the rest of the machine;
+    # it is what regressions are judged on, while the latency percentiles are reported only
+    best_round_time = min(round_times)
+    latencies.sort()
+    profile = {}
+    if profile_fields:
+        profile = {"field_table": field_timing.report_table(), "field_stacks": field_timing.collapsed_stacks()}
+    return {
+        "docs": len(pages),
+        "errors": errors,
+        "blocked": blocked,
+        "docs_per_sec": len(pages) / best_round_time,
+        "mb_per_sec": total_bytes / 1e6 / best_round_time,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "peak_rss_mib": peak_rss_mib,
+        **profile,
+    }
+
+
+def find_regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+        if result["docs_per_sec"] < base["docs_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: docs/sec {base['docs_per_sec']:.1f} -> {result['docs_per_sec']:.1f}")
+        if result["peak_rss_mib"] > base["peak_rss_mib"] * (1 + tolerance) + MEMORY_SLACK_MIB:
+            regressions.append(f"{name}: peak rss {base['peak_rss_mib']:.1f}MiB -> {result['peak_rss_mib']:.1f}MiB")
+    return regressions
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Benchmark the retailer parsers over their fixtures.")
+    arg_parser.add_argument("--retailers", nargs="+", choices=list(RETAILERS), default=list(RETAILERS))
+    arg_parser.add_argument("--rounds", type=int, default=ROUNDS)
+    arg_parser.add_argument("--output", type=Path, help="write the results as json to this path")
+    arg_parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    arg_parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    arg_parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    arg_parser.add_argument(
+        "--profile-fields",
+        type=Path,
+        help="time every field block and selector, log the table and write collapsed stacks to this path",
+    )
+    args = arg_parser.parse_args()
+
+    results = {}
+    field_stacks = []
+    logger.info(
+        f"{'retailer':<17} {'docs':>5} {'errors':>6} {'blocked':>7} {'docs/s':>8} {'MB/s':>7} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'peak MiB':>9}"
+    )
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for name in args.retailers:
+            result = pool.apply(run_retailer, (name, args.rounds, args.profile_fields is not None))
+            field_table = result.pop("field_table", None)
+            field_stacks.extend(result.pop("field_stacks", []))
+            results[name] = result
+            logger.info(
+                f"{name:<17} {result['docs']:>5} {result['errors']:>6} {result['blocked']:>7} "
+                f"{result['docs_per_sec']:>8.1f} {result['mb_per_sec']:>7.1f} {result['p50_ms']:>8.1f} "
+                f"{result['p99_ms']:>8.1f} {result['peak_rss_mib']:>9.1f}"
+            )
+            if field_table:
+                logger.info(f"field timings for {name}:\n{field_table}")
+
+    if args.profile_fields:
+        with args.profile_fields.open("w", encoding="utf-8") as stacks_file:
+            stacks_file.write("\n".join(field_stacks) + "\n")
+        # The instrumentation inflates every number, so a profiled run is never judged against the baseline
+        logger.info(f"collapsed field stacks written to {args.profile_fields}")
+        return
+
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            with args.baseline.open("r", encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+        with args.baseline.open("w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+        logger.info(f"baseline updated: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        logger.warning(f"no baseline at {args.baseline}; run with --update-baseline to store one")
+        return
+    with args.baseline.open("r", encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for regression in regressions:
+        logger.error(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    logger.info("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
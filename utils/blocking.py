@@ -0,0 +1,80 @@
+"""Recognises bot-block, captcha and challenge pages from byte signatures, before any parser runs.
+
+Block pages are served with a 200, so without this they go through a whole parse and then fail deep inside the
+parser. Vendor block pages are a few KB and say what they are in their title, so the head is enough for them;
+only captchas rendered inside the retailer's own app shell need a signature searched over the whole page.
+"""
+
+from typing import NamedTuple
+
+CAPTCHA = "captcha"
+CHALLENGE = "challenge"
+BLOCKED = "blocked"
+
+HEAD_CHARS = 8192
+
+
+class Blocked(NamedTuple):
+    retailer: str | None
+    reason: str
+    signature: str
+
+
+BLOCK_TITLES = {
+    # Cloudflare
+    "Just a moment...": CHALLENGE,
+    "Attention Required! | Cloudflare": BLOCKED,
+    # Akamai (Costco, Best Buy, Tesco)
+    "Access Denied": BLOCKED,
+    # PerimeterX (Walmart, Wayfair)
+    "Robot or human?": CAPTCHA,
+    "Access to this page has been denied": BLOCKED,
+    "Access to this page has been denied.": BLOCKED,
+}
+
+# Vendor scripts and references that only block pages load
+HEAD_SIGNATURES = {
+    # DataDome
+    "captcha-delivery.com": CAPTCHA,
+    # Imperva
+    "_Incapsula_Resource": BLOCKED,
+    # Akamai's reference page
+    "errors.edgesuite.net": BLOCKED,
+}
+
+# Searched over the whole page, keyed like `utils.retailers.RETAILERS`
+PAGE_SIGNATURES = {
+    # The captcha comes inside the full app shell; only its canonical link (170KB in) gives it away
+    "samsclub": {"samsclub.com/are-you-human": CAPTCHA},
+    "samsclub_api": {"samsclub.com/are-you-human": CAPTCHA},
+    "samsclub_hybrid": {"samsclub.com/are-you-human": CAPTCHA},
+}
+
+
+def _title(head: str) -> str | None:
+    for tag in ("<title", "<TITLE"):
+        start = head.find(tag)
+        if start != -1:
+            start = head.find(">", start) + 1
+            end = head.find("<", start)
+            return head[start:end].strip() if start and end != -1 else None
+    return None
+
+
+def detect_block(html_content: str | bytes, retailer: str | None = None) -> Blocked | None:
+    """Returns what gave the page away as a block page, or `None` for a page worth parsing."""
+
+    head = html_content[:HEAD_CHARS]
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", "ignore")
+
+    title = _title(head)
+    if title in BLOCK_TITLES:
+        return Blocked(retailer, BLOCK_TITLES[title], f"<title>{title}</title>")
+    for signature, reason in HEAD_SIGNATURES.items():
+        if signature in head:
+            return Blocked(retailer, reason, signature)
+    for signature, reason in PAGE_SIGNATURES.get(retailer, {}).items():
+        if (signature if isinstance(html_content, str) else signature.encode()) in html_content:
+            return Blocked(retailer, reason, signature)
+    return None
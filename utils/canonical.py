@@ -0,0 +1,127 @@
+"""Page canonicalisation and simhash fingerprints, so recrawls of an unchanged product can skip the parser.
+
+`canonicalise` blanks the regions known to change on every request (nonces, tracking ids, bot-manager tokens,
+expiry timestamps, edge-server names). Pages that still differ after that, because of A/B test blocks or
+reordered config objects, are caught by `simhash`: two captures of the same url whose fingerprints are within
+`NEAR_DISTANCE` bits are treated as the same page, once their price and stock values have been checked to match.
+"""
+
+import re
+import zlib
+from array import array
+
+
+def _volatile(*regions: tuple[bytes, bytes]) -> tuple[tuple[bytes, re.Pattern], ...]:
+    """(literal, pattern) pairs: the literal is found with `bytes.find`, the pattern only runs where it matched."""
+
+    return tuple((literal, re.compile(re.escape(literal) + rest)) for literal, rest in regions)
+
+
+# Akamai bot manager: its script path, pixel and page token change on every response
+_AKAMAI = (
+    (b"/akam/", rb"\d+/(?:pixel_)?[0-9a-f]+(?:\?a=[\w=%-]*)?"),
+    (b'bazadebezolkohpepadr="', rb'\d+"'),
+)
+_NONCE = (b'nonce="', rb'[^"]*"')
+_CSRF = (b'"csrfToken":"', rb'[^"]*"')
+
+# Each literal costs one scan of the page, so a retailer only lists what its pages actually carry
+RETAILER_VOLATILE = {
+    "samsclub": _volatile(
+        *_AKAMAI,
+        (b'"expiresAt":', rb'(?:"[^"]*"|\d+)'),
+        (b'GUID:"G', rb'\d+"'),
+        (b"/__ssobj/ard.png?", rb"[^']*"),
+        (b'"timestamps":{', rb"[^}]*\}"),
+    ),
+    "bedbathbeyond": _volatile(
+        *_AKAMAI,
+        (b"<!-- j", rb"\d+\.prod\.ostk\.com"),
+        (b'"env":"', rb'[^"]*"'),
+        (b'"userSeed":"', rb'[^"]*"'),
+        (b'"callChainId":"', rb'[^"]*"'),
+        (b'"instanceId":"', rb'[^"]*"'),
+        (b'"X-Akamai-Edgescape":"', rb'[^"]*"'),
+    ),
+    "wayfair": _volatile(
+        _CSRF,
+        (b'transactionID:"', rb'[^"]*"'),
+        (b'"transaction_id":"', rb'[^"]*"'),
+        (b'"client_hostname":"', rb'[^"]*"'),
+        (b'"device_guid":"', rb'[^"]*"'),
+    ),
+    "walmart": _volatile(_NONCE, *_AKAMAI),
+    "costco": _volatile(*_AKAMAI),
+    "bestbuy": _volatile(_NONCE, (b'"instanceId":"', rb'[^"]*"')),
+    "mercado": _volatile(_NONCE, _CSRF),
+    "tesco": _volatile(_NONCE, _CSRF, *_AKAMAI),
+}
+RETAILER_VOLATILE["samsclub_api"] = RETAILER_VOLATILE["samsclub"]
+RETAILER_VOLATILE["samsclub_hybrid"] = RETAILER_VOLATILE["samsclub"]
+RETAILER_VOLATILE["wayfair_category"] = RETAILER_VOLATILE["wayfair"]
+RETAILER_VOLATILE["walmart_detail"] = RETAILER_VOLATILE["walmart"]
+
+# Fingerprints are 32 bits wide, one per crc32 bit. Recaptures of one product land 2-3 bits apart, but so can two
+# different products sharing a template, which is why fingerprints are only ever compared for the same url
+NEAR_DISTANCE = 3
+
+# Bit `bit` of every byte value, as a translate table: counting the ones of a column of hashes stays in C
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+_CANONICAL_RE = re.compile(rb"<link\b[^>]*\brel=\"canonical\"[^>]*>")
+_HREF_RE = re.compile(rb'\bhref="([^"]+)"')
+
+
+def canonicalise(html_content: bytes, retailer: str | None = None) -> bytes:
+    """`html_content` without its volatile regions; a page without any comes back as the same object."""
+
+    spans = []
+    for literal, pattern in RETAILER_VOLATILE.get(retailer, ()):
+        start = html_content.find(literal)
+        while start != -1:
+            match = pattern.match(html_content, start)
+            end = match.end() if match else start + len(literal)
+            if match:
+                spans.append((start, end))
+            start = html_content.find(literal, end)
+    if not spans:
+        return html_content
+
+    pieces = []
+    last = 0
+    for start, end in sorted(spans):
+        if start >= last:
+            pieces.append(html_content[last:start])
+        last = max(last, end)
+    pieces.append(html_content[last:])
+    return b"".join(pieces)
+
+
+def simhash(canonical: bytes) -> int:
+    """32-bit simhash over the distinct tag- and comma-delimited chunks of the page."""
+
+    features = set(canonical.replace(b",", b">").split(b">"))
+    hashes = array("I", map(zlib.crc32, features))
+    data = hashes.tobytes()
+    fingerprint = 0
+    for byte_index in range(4):
+        # One byte of every hash; on big endian machines only the order of the fingerprint's bits differs
+        column = data[byte_index :: hashes.itemsize]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) * 2 > len(features):
+                fingerprint |= 1 << (byte_index * 8 + bit)
+    return fingerprint
+
+
+def distance(fingerprint: int, other: int) -> int:
+    return (fingerprint ^ other).bit_count()
+
+
+def canonical_url(html_content: bytes) -> str | None:
+    """The page's `<link rel="canonical">` href, which identifies the product across captures."""
+
+    link = _CANONICAL_RE.search(html_content)
+    if link is None:
+        return None
+    href = _HREF_RE.search(link.group(0))
+    return href.group(1).decode("utf-8", "replace") if href else None
@@ -0,0 +1,78 @@
+"""Tells which retailer parser a snapshot needs from its first few KB, without building a tree.
+
+The head of every page names its own site many times over (canonical link, `og:` tags, preconnect and asset
+hosts), so the retailer whose hostnames come up most there decides; a path in the head splits detail from listing
+pages. Pages whose head names no retailer fall back to the signature script ids the parsers themselves rely on.
+"""
+
+import re
+
+# Walmart's canonical link ends just short of 4KB; Sam's Club's is 270KB in but its hosts show up from 1.5KB
+HEAD_CHARS = 8192
+# Hosts of one retailer seen before the rest of the head is skipped
+DECIDING_VOTES = 3
+
+# Domain label of a url host -> retailer
+HOSTS = {
+    "samsclub": "samsclub",
+    "costco": "costco",
+    "overstock": "overstock",
+    "bedbathandbeyond": "bedbathbeyond",
+    "walmart": "walmart",
+    "bestbuy": "bestbuy",
+    "wayfair": "wayfair",
+    "mercadolivre": "mercado",
+    "mercadolibre": "mercado",
+    "tesco": "tesco",
+}
+# The `//` prefix lets the regex engine jump from url to url instead of trying every offset of the head
+URL_HOST_RE = re.compile(r"//([\w.-]+)")
+
+# Retailer -> (marker in the head, retailer when present, retailer when absent)
+PAGE_TYPES = {
+    "walmart": ("walmart.com/ip/", "walmart_detail", "walmart"),
+    "wayfair": ("/pdp/", "wayfair", "wayfair_category"),
+}
+
+# Checked over the whole page, in order, when the head names no retailer
+SIGNATURES = (
+    ("tb-djs-wml-redux-state", "samsclub"),
+    ("web-pixels-manager-setup", "overstock"),
+    ("initialPowerReviews", "bedbathbeyond"),
+    ("__NEXT_DATA__", "walmart"),
+    ("WEBPACK_ENTRY_DATA", "wayfair"),
+)
+
+
+def _vote(head: str) -> str | None:
+    votes: dict[str, int] = {}
+    for match in URL_HOST_RE.finditer(head):
+        # `www.costco.com`, `digitalcontent.api.tesco.com`, `lista.mercadolivre.com.br`
+        for label in match.group(1).split(".")[-3:]:
+            retailer = HOSTS.get(label)
+            if retailer is not None:
+                votes[retailer] = votes.get(retailer, 0) + 1
+                if votes[retailer] >= DECIDING_VOTES:
+                    return retailer
+    return max(votes, key=votes.__getitem__) if votes else None
+
+
+def classify(html_content: str | bytes) -> str | None:
+    """Returns the retailer name for `html_content`, or `None` when nothing in it is recognised."""
+
+    head = html_content[:HEAD_CHARS]
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", "ignore")
+
+    retailer = _vote(head)
+    if retailer is None:
+        if isinstance(html_content, bytes):
+            html_content = html_content.decode("utf-8", "ignore")
+        retailer = next((name for signature, name in SIGNATURES if signature in html_content), None)
+        if retailer is None:
+            return None
+
+    if retailer in PAGE_TYPES:
+        marker, present, absent = PAGE_TYPES[retailer]
+        return present if marker in head else absent
+    return retailer
@@ -0,0 +1,192 @@
+"""Price and stock monitoring across successive snapshots: re-extracts only the volatile fields of each product and
+writes a record only when one of them moved.
+
+    python -m utils.delta "snapshots/*/samsclub_detail_*.html" --state delta-state.json --output changes.jsonl
+
+Snapshots are applied in the order given, which for the scrapers' timestamped file names is the order they were
+taken in. The last state of every product is kept in the `--state` file between runs. A product seen for the first
+time, or whose structural fingerprint changed, gets a full parse and a `reparsed` record carrying the whole result,
+plus the `changes` from its previous state when it had one.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple
+
+from loguru import logger
+
+from utils.batch import iter_paths
+from utils.blocking import detect_block
+from utils.classify import classify
+from utils.result_cache import normalise
+from utils.retailers import RETAILERS, load_parser, retailer_from_filename
+
+# Record kinds, also the keys of the run summary
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+NEW = "new"
+STRUCTURE = "structure"
+BLOCKED = "blocked"
+FAILED = "failed"
+
+
+class DeltaSpec(NamedTuple):
+    # Field that identifies the product across snapshots
+    id_field: str
+    # Fields re-extracted from every snapshot
+    fields: tuple[str, ...]
+    # Function of the retailer's parser module that reads `id_field` and `fields` straight off the page; without one
+    # the parser itself runs with them as its projection
+    fast_path: str | None = None
+
+
+DELTA_SPECS = {
+    "samsclub": DeltaSpec(
+        "product_id",
+        ("price", "list_price", "price_per_unit", "buying_offers", "stock_status", "available_quantity"),
+        "parse_offer",
+    ),
+    # The projection leaves out the PowerReviews calls
+    "overstock": DeltaSpec("listing_id", ("price", "max_quantity")),
+    "bedbathbeyond": DeltaSpec("listing_id", ("price", "list_price", "buying_offers", "max_quantity")),
+    "costco": DeltaSpec("product_id", ("price", "price_listing")),
+}
+
+
+@lru_cache(maxsize=None)
+def fast_path(retailer: str) -> Callable[[str], dict[str, Any]]:
+    spec = DELTA_SPECS[retailer]
+    if spec.fast_path is not None:
+        return load_parser(retailer, spec.fast_path)
+
+    # Only called once `delta_path` (or `utils.batch`) has checked the page for blocks
+    parse = load_parser(retailer, RETAILERS[retailer].func_name)
+    names = {spec.id_field, *spec.fields}
+
+    def extract(html_content: str) -> dict[str, Any]:
+        detail = parse(html_content, fields=names)["detail"]
+        return {name: detail.get(name) for name in (spec.id_field, *spec.fields)}
+
+    return extract
+
+
+def structure(retailer: str, product_id: Any, values: dict[str, Any]) -> str:
+    """Structural fingerprint: the parser version and whether the fast path found the product id and an offer.
+
+    Single fields come and go with the offer's state (a stock-out drops the quantity, a sale adds buying offers), so
+    only an offer that vanishes or appears as a whole means the page no longer looks like the one the state came from.
+    """
+
+    has_id = product_id is not None
+    has_offer = any(value is not None for value in values.values())
+    return f"v{RETAILERS[retailer].version}:id={has_id:d}:offer={has_offer:d}"
+
+
+def delta_path(path: str, retailer: str | None, state: dict[str, dict[str, Any]]) -> tuple[str, dict[str, Any]]:
+    """Applies one snapshot to `state`; returns its kind and the record to write for it."""
+
+    record: dict[str, Any] = {"path": path, "retailer": retailer}
+    try:
+        with open(path, "rb") as html_file:
+            html_content = normalise(html_file.read()).decode("utf-8")
+        retailer = record["retailer"] = (
+            retailer or classify(html_content) or retailer_from_filename(os.path.basename(path))
+        )
+        blocked = detect_block(html_content, retailer)
+        if blocked is not None:
+            record["blocked"] = {"reason": blocked.reason, "signature": blocked.signature}
+            return BLOCKED, record
+        if retailer not in DELTA_SPECS:
+            raise LookupError(f"no delta fields for {retailer}")
+
+        spec = DELTA_SPECS[retailer]
+        values = fast_path(retailer)(html_content)
+        product_id = values.pop(spec.id_field)
+        fingerprint = structure(retailer, product_id, values)
+        products = state.setdefault(retailer, {})
+        previous = products.get(str(product_id)) if product_id is not None else None
+        changes = {
+            name: {"old": previous["values"].get(name), "new": value}
+            for name, value in values.items()
+            if previous is not None and previous["values"].get(name) != value
+        }
+
+        if previous is not None and previous["structure"] == fingerprint:
+            previous["values"] = values
+            previous["path"] = path
+            if not changes:
+                return UNCHANGED, record
+            record["product_id"] = product_id
+            record["changes"] = changes
+            return CHANGED, record
+
+        result = load_parser(retailer, RETAILERS[retailer].func_name)(html_content)
+        if product_id is None:
+            raise ValueError(f"{spec.id_field} not found")
+        products[str(product_id)] = {"structure": fingerprint, "values": values, "path": path}
+        kind = NEW if previous is None else STRUCTURE
+        record["product_id"] = product_id
+        record["reparsed"] = kind
+        record["values"] = values
+        if changes:
+            record["changes"] = changes
+        record["result"] = result
+        return kind, record
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        return FAILED, record
+
+
+def load_state(state_path: str) -> dict[str, dict[str, Any]]:
+    try:
+        with open(state_path, "r", encoding="utf-8") as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_state(state_path: str, state: dict[str, dict[str, Any]]) -> None:
+    tmp_path = f"{state_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as state_file:
+        json.dump(state, state_file, default=str, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Report price and stock changes across snapshots.")
+    arg_parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns, oldest first")
+    arg_parser.add_argument("--state", required=True, help="json file holding the last state of every product")
+    arg_parser.add_argument("--output", default="-", help="jsonl output path, `-` for stdout")
+    arg_parser.add_argument("--retailer", choices=list(DELTA_SPECS), help="skip detection and use this retailer")
+    args = arg_parser.parse_args()
+
+    state = load_state(args.state)
+    kinds: Counter[str] = Counter()
+    start = time.perf_counter()
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for path in iter_paths(args.inputs):
+            kind, record = delta_path(path, args.retailer, state)
+            kinds[kind] += 1
+            if kind != UNCHANGED:
+                output_file.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+        save_state(args.state, state)
+
+    elapsed = time.perf_counter() - start
+    docs = sum(kinds.values())
+    logger.info(f"{docs} snapshots in {elapsed:.1f}s: " + ", ".join(f"{count} {kind}" for kind, count in kinds.items()))
+    for kind in (BLOCKED, FAILED):
+        if kinds[kind]:
+            logger.warning(f"{kinds[kind]} snapshots {kind}")
+
+
+if __name__ == "__main__":
+    main()
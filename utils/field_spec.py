@@ -0,0 +1,151 @@
+import re
+from typing import Any, Callable, Iterable
+
+from utils.field_timing import section
+from utils.json_path import JsonPathSet
+
+# Returned by a transform to leave the field out of the result altogether
+OMIT = object()
+
+
+class Field:
+    """One output field and where its value comes from.
+
+    Exactly one of `path` (a JSON path into `source`), `selector` (a CSS selector run on the `page` soup),
+    `regex` (first group of a search over the `html` text) or `inputs` (names of other fields) is given.
+    The raw value is passed through `transform` when set. Fields whose name starts with `_` are
+    intermediate values that other fields can use but that are never emitted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        path: list[str | int] | None = None,
+        source: str = "data",
+        selector: str | None = None,
+        attr: str | None = None,
+        regex: str | None = None,
+        inputs: Iterable[str] = (),
+        transform: Callable[..., Any] | None = None,
+    ) -> None:
+        inputs = tuple(inputs)
+        kinds = [kind for kind in (path, selector, regex, inputs or None) if kind is not None]
+        if len(kinds) > 1:
+            raise ValueError(f"field `{name}` must have only one of path, selector, regex or inputs")
+        if not kinds and transform is None:
+            raise ValueError(f"field `{name}` needs a path, selector, regex, inputs or transform")
+
+        self.name = name
+        self.path = path
+        self.source = source
+        self.selector = selector
+        self.attr = attr
+        self.regex = re.compile(regex, re.DOTALL) if regex is not None else None
+        self.inputs = inputs
+        self.transform = transform
+
+    @property
+    def is_internal(self) -> bool:
+        return self.name.startswith("_")
+
+
+class FieldSpec:
+    """A retailer's fields, compiled into an `ExtractionPlan` per requested field set."""
+
+    def __init__(self, fields: list[Field]) -> None:
+        self.fields = {field.name: field for field in fields}
+        if len(self.fields) != len(fields):
+            raise ValueError("duplicate field names")
+        for field in fields:
+            for input_name in field.inputs:
+                if input_name not in self.fields:
+                    raise ValueError(f"field `{field.name}` depends on unknown field `{input_name}`")
+        self._plans: dict[frozenset[str] | None, ExtractionPlan] = {}
+
+    @property
+    def names(self) -> list[str]:
+        return [name for name, field in self.fields.items() if not field.is_internal]
+
+    def compile(self, names: Iterable[str] | None = None) -> "ExtractionPlan":
+        """Returns the (cached) plan for `names`, or for every public field when None."""
+
+        key = frozenset(names) if names is not None else None
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = ExtractionPlan(self, key)
+            self._plans[key] = plan
+        return plan
+
+    def extract(self, sources: dict[str, Any], names: Iterable[str] | None = None) -> dict[str, Any]:
+        return self.compile(names).run(sources)
+
+
+class ExtractionPlan:
+    """The fields needed for one request, in declaration order, with shared lookups deduplicated.
+
+    JSON paths are merged per source into a single `JsonPathSet`, and identical selectors or regexes
+    are evaluated once no matter how many fields use them.
+    """
+
+    def __init__(self, spec: FieldSpec, names: frozenset[str] | None) -> None:
+        # Names this spec does not define are ignored, so one field set can be shared across retailers
+        requested = set(spec.names) if names is None else names.intersection(spec.names)
+
+        # Close over dependencies
+        needed: set[str] = set()
+        stack = list(requested)
+        while stack:
+            name = stack.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            stack.extend(spec.fields[name].inputs)
+
+        self.fields = [field for name, field in spec.fields.items() if name in needed]
+        self.emitted = [field.name for field in self.fields if field.name in requested and not field.is_internal]
+
+        paths_by_source: dict[str, dict[str, list[str | int]]] = {}
+        for field in self.fields:
+            if field.path is not None:
+                paths_by_source.setdefault(field.source, {})[field.name] = field.path
+        self.path_sets = {source: JsonPathSet(paths) for source, paths in paths_by_source.items()}
+
+    def run(self, sources: dict[str, Any]) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for source, path_set in self.path_sets.items():
+            with section(f"paths {source}"):
+                values.update(path_set.extract(sources.get(source)))
+
+        selected: dict[tuple[str, str | None], Any] = {}
+        searched: dict[re.Pattern, Any] = {}
+        for field in self.fields:
+            with section(field.name):
+                if field.selector is not None:
+                    key = (field.selector, field.attr)
+                    if key not in selected:
+                        elem = sources["page"].select_one(field.selector)
+                        if elem is None:
+                            selected[key] = None
+                        elif field.attr is not None:
+                            selected[key] = elem.attrs.get(field.attr)
+                        else:
+                            selected[key] = elem.text
+                    value = selected[key]
+                elif field.regex is not None:
+                    if field.regex not in searched:
+                        match = field.regex.search(sources["html"])
+                        searched[field.regex] = match.group(1) if match else None
+                    value = searched[field.regex]
+                elif field.inputs:
+                    value = tuple(values[name] for name in field.inputs)
+                else:
+                    value = values.get(field.name)
+
+                if field.transform is not None:
+                    value = field.transform(*value) if field.inputs else field.transform(value)
+                elif field.inputs and len(field.inputs) == 1:
+                    value = value[0]
+                values[field.name] = value
+
+        return {name: values[name] for name in self.emitted if values[name] is not OMIT}
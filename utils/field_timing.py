@@ -0,0 +1,184 @@
+"""Opt-in wall time and call counts per parser field block, selector and script extractor.
+
+Parsers are decorated with `profiled(retailer)` and call `mark("block")` at the start of each field block;
+`section(label)` times a nested step. All three cost one global check while timing is disabled.
+"""
+
+import functools
+import time
+from typing import Any, Callable
+
+from bs4 import Tag
+
+from utils.html_backend import SelectolaxNode
+
+# Per stack of labels: [calls, total ns, ns spent in child frames]
+_stats: dict[tuple[str, ...], list[int]] | None = None
+# Open frames: [label, start ns, child ns, opened by `profiled`]
+_frames: list[list[Any]] = []
+_patched: dict[tuple[type, str], Callable] = {}
+
+
+def is_enabled() -> bool:
+    return _stats is not None
+
+
+def enable(selectors: bool = True) -> None:
+    """Starts recording from scratch; with `selectors`, every `select`/`select_one` call becomes a section."""
+
+    global _stats
+    _stats = {}
+    _frames.clear()
+    if selectors and not _patched:
+        for cls in (Tag, SelectolaxNode):
+            for method_name in ("select", "select_one"):
+                method = getattr(cls, method_name)
+                _patched[(cls, method_name)] = method
+                setattr(cls, method_name, _timed_select(method, method_name))
+
+
+def disable() -> None:
+    global _stats
+    _stats = None
+    _frames.clear()
+    for (cls, method_name), method in _patched.items():
+        setattr(cls, method_name, method)
+    _patched.clear()
+
+
+def _timed_select(method: Callable, method_name: str) -> Callable:
+    @functools.wraps(method)
+    def wrapper(self, selector: str, *args, **kwargs):
+        with section(f"{method_name} {selector}"):
+            return method(self, selector, *args, **kwargs)
+
+    return wrapper
+
+
+def _open(label: str, is_root: bool = False) -> None:
+    _frames.append([label, time.perf_counter_ns(), 0, is_root])
+
+
+def _close() -> None:
+    label, start, child_ns, _ = _frames.pop()
+    elapsed = time.perf_counter_ns() - start
+    if _frames:
+        _frames[-1][2] += elapsed
+    key = tuple(frame[0] for frame in _frames) + (label,)
+    stat = _stats.setdefault(key, [0, 0, 0])
+    stat[0] += 1
+    stat[1] += elapsed
+    stat[2] += child_ns
+
+
+def _root_index() -> int:
+    for index in range(len(_frames) - 1, -1, -1):
+        if _frames[index][3]:
+            return index
+    return -1
+
+
+def profiled(retailer: str) -> Callable:
+    """Decorates a parser entry point so its field blocks are recorded under `retailer`.
+
+    A profiled parser called from another one with the same retailer (e.g. a projection delegating to the html
+    parser) records into the caller's frame.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _stats is None:
+                return func(*args, **kwargs)
+            root_index = _root_index()
+            if root_index >= 0 and _frames[root_index][0] == retailer:
+                return func(*args, **kwargs)
+
+            depth = len(_frames)
+            _open(retailer, True)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                while len(_frames) > depth:
+                    _close()
+
+        return wrapper
+
+    return decorator
+
+
+def mark(block: str) -> None:
+    """Ends the current field block of the innermost profiled parser and starts `block`."""
+
+    if _stats is None:
+        return
+    root_index = _root_index()
+    if root_index < 0:
+        return
+    while len(_frames) > root_index + 1:
+        _close()
+    _open(block)
+
+
+class _Section:
+    __slots__ = ("label",)
+
+    def __init__(self, label: str) -> None:
+        self.label = label
+
+    def __enter__(self) -> None:
+        _open(self.label)
+
+    def __exit__(self, *exc_info) -> None:
+        _close()
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NULL_SECTION = _NullSection()
+
+
+def section(label: str) -> _Section | _NullSection:
+    """A context manager timing `label` as a child of whatever block or section is open."""
+
+    return NULL_SECTION if _stats is None or not _frames else _Section(label)
+
+
+def collapsed_stacks() -> list[str]:
+    """The recorded self time per stack, in microseconds, in the collapsed format flamegraph.pl reads."""
+
+    lines = []
+    for key, (_, total_ns, child_ns) in sorted((_stats or {}).items()):
+        self_us = (total_ns - child_ns) // 1000
+        if self_us > 0:
+            lines.append(f"{';'.join(label.replace(';', ':') for label in key)} {self_us}")
+    return lines
+
+
+def report_table() -> str:
+    """Aggregated calls and wall time per retailer, block and section, each level slowest first."""
+
+    stats = _stats or {}
+    rows = [f"{'stack':<70} {'calls':>7} {'total ms':>10} {'self ms':>9} {'mean us':>9} {'share':>6}"]
+
+    def add_rows(prefix: tuple[str, ...], root_ns: int) -> None:
+        children = [key for key in stats if len(key) == len(prefix) + 1 and key[: len(prefix)] == prefix]
+        for key in sorted(children, key=lambda child: stats[child][1], reverse=True):
+            calls, total_ns, child_ns = stats[key]
+            label = "  " * len(prefix) + key[-1]
+            rows.append(
+                f"{label[:70]:<70} {calls:>7} {total_ns / 1e6:>10.2f} {(total_ns - child_ns) / 1e6:>9.2f} "
+                f"{total_ns / calls / 1e3:>9.1f} {total_ns / (root_ns or total_ns or 1):>6.1%}"
+            )
+            add_rows(key, root_ns or total_ns)
+
+    add_rows((), 0)
+    return "\n".join(rows)
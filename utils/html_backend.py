@@ -0,0 +1,111 @@
+from typing import Any, Collection, Iterator
+
+import bs4
+from bs4 import BeautifulSoup, SoupStrainer
+
+# `PageStrainer` overrides these hooks; older bs4 never calls them and would silently keep the whole page
+if not all(hasattr(SoupStrainer, hook) for hook in ("allow_tag_creation", "allow_string_creation")):
+    raise ImportError(f"utils.html_backend needs beautifulsoup4>=4.13, found {bs4.__version__}")
+
+HTML_PARSER = "html.parser"
+LXML = "lxml"
+SELECTOLAX = "selectolax"
+
+HTML_BACKENDS = (HTML_PARSER, LXML, SELECTOLAX)
+DEFAULT_BACKEND = HTML_PARSER
+
+
+class PageStrainer(SoupStrainer):
+    """Keeps only the subtrees rooted at the given tag names, ids or classes.
+
+    Everything outside them, text included, is dropped while parsing, so the soup never holds the rest of the page.
+    """
+
+    def __init__(self, names: Collection[str] = (), ids: Collection[str] = (), classes: Collection[str] = ()) -> None:
+        super().__init__()
+        self.names = frozenset(names)
+        self.ids = frozenset(ids)
+        self.classes = frozenset(classes)
+
+    def allow_tag_creation(self, nsprefix: str | None, name: str, attrs: dict | None) -> bool:
+        if name in self.names:
+            return True
+        if not attrs:
+            return False
+        if self.ids and attrs.get("id") in self.ids:
+            return True
+        class_value = attrs.get("class")
+        if self.classes and class_value:
+            if isinstance(class_value, str):
+                class_value = class_value.split()
+            return not self.classes.isdisjoint(class_value)
+        return False
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+
+class SelectolaxNode:
+    """Wraps a selectolax node in the subset of the bs4 Tag api the parsers use.
+
+    Only `select`, `select_one`, `text`, `get_text`, `attrs` and `get` are offered; parsers that walk the
+    tree (`contents`, `find_next_sibling`, ...) need one of the BeautifulSoup backends.
+    """
+
+    __slots__ = ("node",)
+
+    def __init__(self, node: Any) -> None:
+        self.node = node
+
+    @property
+    def name(self) -> str:
+        return self.node.tag
+
+    @property
+    def attrs(self) -> dict[str, str]:
+        return {key: "" if value is None else value for key, value in self.node.attributes.items()}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.attrs.get(key, default)
+
+    def __getitem__(self, key: str) -> str:
+        return self.attrs[key]
+
+    @property
+    def text(self) -> str:
+        return self.node.text(deep=True)
+
+    def get_text(self, separator: str = "", strip: bool = False) -> str:
+        return self.node.text(deep=True, separator=separator, strip=strip, skip_empty=strip)
+
+    @property
+    def string(self) -> str | None:
+        return self.text
+
+    def select(self, selector: str) -> list["SelectolaxNode"]:
+        return [SelectolaxNode(node) for node in self.node.css(selector)]
+
+    def select_one(self, selector: str) -> "SelectolaxNode | None":
+        node = self.node.css_first(selector)
+        return SelectolaxNode(node) if node is not None else None
+
+    def __iter__(self) -> Iterator["SelectolaxNode"]:
+        return (SelectolaxNode(node) for node in self.node.iter())
+
+
+def parse_html(html_content: str | bytes, backend: str | None = None, parse_only: SoupStrainer | None = None) -> Any:
+    """Parses a document with the named backend and returns its root.
+
+    `html.parser` and `lxml` build a regular BeautifulSoup tree, limited to `parse_only` when given;
+    `selectolax` always builds the whole lexbor tree and returns a `SelectolaxNode` over it.
+    `None` picks `DEFAULT_BACKEND`.
+    """
+
+    backend = backend or DEFAULT_BACKEND
+    if backend in (HTML_PARSER, LXML):
+        return BeautifulSoup(html_content, backend, parse_only=parse_only)
+    if backend == SELECTOLAX:
+        from selectolax.lexbor import LexborHTMLParser
+
+        return SelectolaxNode(LexborHTMLParser(html_content).root)
+    raise ValueError(f"unknown html backend: {backend}")
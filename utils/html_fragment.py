@@ -0,0 +1,433 @@
+import re
+from functools import lru_cache
+from html.entities import html5
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+# Tree rules of bs4's html.parser builder that decide what `get_text()` and `select()` see
+VOID_TAGS = frozenset(
+    [
+        "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image", "img",
+        "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source", "spacer", "track",
+        "wbr",
+    ]
+)  # fmt: skip
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+# Tags whose strings bs4 keeps out of `get_text()` or leaves uncollapsed. Fragments using them go through bs4.
+SPECIAL_TEXT_TAGS = frozenset(["script", "style", "template", "rt", "rp", "pre", "textarea"])
+
+COLLECTED_TAGS = frozenset(["ul", "li", "table", "thead", "tr", "th", "td", "p", "strong"])
+
+FRAGMENT_CACHE_SIZE = 4096
+
+# Named references without their semicolon, the first spelling of each name winning, as bs4 resolves them
+ENTITY_TO_CHARACTER: dict[str, str] = {}
+for _name, _character in sorted(html5.items()):
+    ENTITY_TO_CHARACTER.setdefault(_name.removesuffix(";"), _character)
+
+DECIMAL_REFERENCE = re.compile(r"([0-9]+)(.*)", re.DOTALL)
+HEX_REFERENCE = re.compile(r"([0-9a-fA-F]+)(.*)", re.DOTALL)
+
+
+def dereference_charref(name: str) -> tuple[str, str]:
+    """Resolves a numeric character reference like bs4's html.parser builder; returns it and any data after it.
+
+    Null, surrogate and out-of-range references become U+FFFD, and C1 controls are read as windows-1252.
+    """
+
+    is_hex = name[:1] in ("x", "X")
+    match = (HEX_REFERENCE if is_hex else DECIMAL_REFERENCE).match(name[1:] if is_hex else name)
+    if match is None:
+        return "", name[1:] if is_hex else name
+
+    number = int(match.group(1), 16 if is_hex else 10)
+    if number == 0 or number > 0x10FFFF or 0xD800 <= number <= 0xDFFF:
+        return "\ufffd", match.group(2)
+    if 0x80 <= number <= 0x9F:
+        try:
+            return bytes([number]).decode("cp1252"), match.group(2)
+        except UnicodeDecodeError:
+            pass
+    return chr(number), match.group(2)
+
+
+class UnsupportedFragment(Exception):
+    pass
+
+
+class _Node:
+    __slots__ = ("name", "parts", "items", "headers", "has_thead")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.parts: list[str] = []
+        self.items: list[_Node] = []
+        self.headers: list[_Node] = []
+        self.has_thead = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+
+class FragmentParser(HTMLParser):
+    """Collects lists, tables and `<p><strong>` pairs of a fragment in one pass over the parser events.
+
+    Nesting follows bs4's html.parser builder (void tags close at once, an end tag closes everything
+    opened after its most recent start tag, stray end tags are ignored), so texts and the descendants
+    found for each node are the ones `select()` and `get_text()` would return on the soup.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=False)
+        self.tag_stack: list[tuple[str, _Node | None]] = []
+        self.open_nodes: list[_Node] = []
+        self.already_closed_empty_element: list[str] = []
+        self.pending_data: list[str] = []
+        self.text_parts: list[str] = []
+        self.uls: list[_Node] = []
+        self.lis: list[_Node] = []
+        self.tables: list[_Node] = []
+        self.ps: list[_Node] = []
+
+    def end_data(self) -> None:
+        if not self.pending_data:
+            return
+
+        data = "".join(self.pending_data)
+        self.pending_data = []
+        if data.strip(ASCII_SPACES) == "":
+            data = "\n" if "\n" in data else " "
+        self.text_parts.append(data)
+        for node in self.open_nodes:
+            node.parts.append(data)
+
+    def open_tag(self, tag: str) -> None:
+        if tag in SPECIAL_TEXT_TAGS:
+            raise UnsupportedFragment(tag)
+
+        self.end_data()
+        node = None
+        if tag in COLLECTED_TAGS:
+            node = _Node(tag)
+            if tag == "ul":
+                self.uls.append(node)
+            elif tag == "li":
+                self.lis.append(node)
+                for open_node in self.open_nodes:
+                    if open_node.name == "ul":
+                        open_node.items.append(node)
+            elif tag == "table":
+                self.tables.append(node)
+            elif tag == "thead":
+                for open_node in self.open_nodes:
+                    if open_node.name == "table":
+                        open_node.has_thead = True
+            elif tag == "tr":
+                for open_node in self.open_nodes:
+                    if open_node.name == "table":
+                        open_node.items.append(node)
+            elif tag in ("th", "td"):
+                for open_node in self.open_nodes:
+                    if open_node.name == "tr":
+                        (open_node.headers if tag == "th" else open_node.items).append(node)
+            elif tag == "p":
+                self.ps.append(node)
+            elif tag == "strong":
+                for open_node in self.open_nodes:
+                    if open_node.name == "p":
+                        open_node.items.append(node)
+            self.open_nodes.append(node)
+        self.tag_stack.append((tag, node))
+
+    def close_tag(self, tag: str) -> None:
+        self.end_data()
+        for i in range(len(self.tag_stack) - 1, -1, -1):
+            if self.tag_stack[i][0] == tag:
+                break
+        else:
+            return
+
+        for _, node in self.tag_stack[i:]:
+            if node is not None:
+                self.open_nodes.pop()
+        del self.tag_stack[i:]
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self.open_tag(tag)
+        if tag in VOID_TAGS:
+            self.close_tag(tag)
+            self.already_closed_empty_element.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.open_tag(tag)
+        self.close_tag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(tag)
+        else:
+            self.close_tag(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.pending_data.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        dereferenced, extra_data = dereference_charref(name)
+        self.handle_data(dereferenced)
+        self.handle_data(extra_data)
+
+    def handle_entityref(self, name: str) -> None:
+        character = ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data: str) -> None:
+        self.end_data()
+
+    def handle_decl(self, decl: str) -> None:
+        raise UnsupportedFragment(decl)
+
+    def unknown_decl(self, data: str) -> None:
+        raise UnsupportedFragment(data)
+
+    def handle_pi(self, data: str) -> None:
+        raise UnsupportedFragment(data)
+
+    def parse(self, html_text: str) -> "FragmentParser":
+        self.feed(html_text)
+        self.close()
+        self.end_data()
+        return self
+
+    @property
+    def text(self) -> str:
+        return "".join(self.text_parts)
+
+    def data(self) -> list:
+        """Builds the same lists, tables and property dict as `parse_html_as_data_soup`."""
+
+        ret = []
+
+        # Handle unordered lists
+        for ul_node in self.uls:
+            list_data = [li_node.text.strip() for li_node in ul_node.items]
+            if list_data:
+                ret.append(list_data)
+
+        # Handle standalone list items (no parent ul)
+        if not self.uls:
+            list_data = [li_node.text.strip() for li_node in self.lis]
+            if list_data:
+                ret.append(list_data)
+
+        # Handle tables (including those with sections/headers)
+        for table_node in self.tables:
+            table_data = {}
+            if table_node.has_thead:
+                current_section = None
+                for row_node in table_node.items:
+                    if row_node.headers:
+                        section_text = row_node.headers[0].text.strip()
+                        if section_text:
+                            current_section = section_text
+                    elif len(row_node.items) >= 2:
+                        key = row_node.items[0].text.strip()
+                        value = row_node.items[1].text.strip()
+                        if key and value:
+                            table_data[key] = value
+                        elif not key and value and current_section:
+                            if current_section not in table_data:
+                                table_data[current_section] = []
+                            if isinstance(table_data[current_section], list):
+                                table_data[current_section].append(value)
+                            else:
+                                table_data[current_section] = [table_data[current_section], value]
+            else:
+                for row_node in table_node.items:
+                    if len(row_node.items) >= 2:
+                        key = row_node.items[0].text.strip()
+                        value = row_node.items[1].text.strip()
+                        if key and value:
+                            table_data[key] = value
+                        elif not key and value:
+                            if "Items" not in table_data:
+                                table_data["Items"] = []
+                            table_data["Items"].append(value)
+            if table_data:
+                ret.append(table_data)
+
+        # Handle paragraphs with strong tags (property:value format)
+        p_data = {}
+        for p_node in self.ps:
+            if p_node.items:
+                strong_text = p_node.items[0].text
+                prop_name = strong_text.strip().rstrip(":")
+                prop_value = p_node.text.strip().replace(strong_text, "", 1).strip()
+                if prop_name and prop_value:
+                    p_data[prop_name] = prop_value
+        if p_data:
+            ret.append(p_data)
+
+        return ret
+
+
+def parse_html_as_str_soup(html_text: str | None) -> str:
+    if not html_text:
+        return ""
+
+    soup = BeautifulSoup(html_text, "html.parser")
+    return soup.get_text()
+
+
+def parse_html_as_data_soup(html_text: str | None) -> list:
+    ret = []
+
+    if not html_text:
+        return ret
+
+    soup = BeautifulSoup(html_text, "html.parser")
+
+    # Handle unordered lists
+    ul_elems = soup.select("ul")
+    for ul_elem in ul_elems:
+        list_data = []
+        li_elems = ul_elem.select("li")
+        for li_elem in li_elems:
+            list_data.append(li_elem.get_text().strip())
+        if list_data:
+            ret.append(list_data)
+
+    # Handle standalone list items (no parent ul)
+    if not ul_elems:
+        list_data = []
+        li_items = soup.select("li")
+        for li_item in li_items:
+            list_data.append(li_item.get_text().strip())
+        if list_data:
+            ret.append(list_data)
+
+    # Handle tables (including those with sections/headers)
+    table_elems = soup.select("table")
+    for table_elem in table_elems:
+        # Check if this is a complex table with sections
+        thead_elems = table_elem.select("thead")
+
+        if thead_elems:
+            # This is a complex table with sections
+            table_data = {}
+            current_section = None
+            section_items = {}  # Track items for each section
+
+            # Process all rows
+            for row in table_elem.select("tr"):
+                # Check if this is a header row
+                th_elems = row.select("th")
+                if th_elems and len(th_elems) > 0:
+                    # This is a section header
+                    section_text = th_elems[0].get_text().strip()
+                    if section_text:
+                        current_section = section_text
+                        if current_section not in section_items:
+                            section_items[current_section] = []
+                else:
+                    # This is a data row
+                    td_elems = row.select("td")
+                    if len(td_elems) >= 2:
+                        key = td_elems[0].get_text().strip()
+                        value = td_elems[1].get_text().strip()
+
+                        # Handle rows with keys and values
+                        if key and value:
+                            table_data[key] = value
+                        # Handle rows with empty first column but content in second column
+                        elif not key and value and current_section:
+                            # Add to the current section's list
+                            if current_section not in table_data:
+                                table_data[current_section] = []
+                            if isinstance(table_data[current_section], list):
+                                table_data[current_section].append(value)
+                            else:
+                                # If it was previously not a list, convert it
+                                old_value = table_data[current_section]
+                                table_data[current_section] = [old_value, value]
+
+            if table_data:
+                ret.append(table_data)
+        else:
+            # Standard table processing
+            table_data = {}
+            tr_elems = table_elem.select("tr")
+            for tr_elem in tr_elems:
+                td_elems = tr_elem.select("td")
+                if len(td_elems) >= 2:
+                    key = td_elems[0].get_text().strip()
+                    value = td_elems[1].get_text().strip()
+                    if key and value:
+                        table_data[key] = value
+                    # Handle rows with empty first column but content in second column
+                    elif not key and value:
+                        if "Items" not in table_data:
+                            table_data["Items"] = []
+                        table_data["Items"].append(value)
+
+            if table_data:
+                ret.append(table_data)
+
+    # Handle paragraphs with strong tags (property:value format)
+    # Example: <p><strong>Net Volume: </strong>15.99 Liters</p>
+    p_data = {}
+    p_elems = soup.select("p")
+    for p_elem in p_elems:
+        strong_elem = p_elem.select_one("strong")
+        if strong_elem:
+            # Get the property name from the strong tag
+            prop_name = strong_elem.get_text().strip()
+            # Remove any trailing colons
+            prop_name = prop_name.rstrip(":")
+
+            # Get the full paragraph text
+            p_text = p_elem.get_text().strip()
+            # Extract the value by removing the property name
+            prop_value = p_text.replace(strong_elem.get_text(), "", 1).strip()
+
+            if prop_name and prop_value:
+                p_data[prop_name] = prop_value
+
+    if p_data:
+        ret.append(p_data)
+
+    return ret
+
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def parse_fragment(html_text: str) -> tuple[str, list]:
+    """Returns `(text, data)` of a fragment. Results are cached by fragment, so callers must not mutate them."""
+
+    try:
+        parser = FragmentParser().parse(html_text)
+    except UnsupportedFragment:
+        return parse_html_as_str_soup(html_text), parse_html_as_data_soup(html_text)
+    return parser.text, parser.data()
+
+
+def _copy_data(data: list) -> list:
+    return [
+        list(item) if isinstance(item, list) else {
+            key: list(value) if isinstance(value, list) else value for key, value in item.items()
+        }
+        for item in data
+    ]
+
+
+def parse_html_as_str(html_text: str | None) -> str:
+    if not html_text:
+        return ""
+    return parse_fragment(html_text)[0]
+
+
+def parse_html_as_data(html_text: str | None) -> list:
+    if not html_text:
+        return []
+    return _copy_data(parse_fragment(html_text)[1])
@@ -0,0 +1,102 @@
+import json
+import re
+from typing import Any, Iterator
+
+# Characters that can open or close a value outside of a string literal
+STRUCTURAL_PATTERN = re.compile(r"[{}\[\]\"']")
+
+# String literals, unrolled so the regex engine never backtracks
+STRING_PATTERNS = {
+    '"': re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL),
+    "'": re.compile(r"'[^'\\]*(?:\\.[^'\\]*)*'", re.DOTALL),
+}
+
+ANY_STRING_PATTERN = re.compile(STRING_PATTERNS['"'].pattern + "|" + STRING_PATTERNS["'"].pattern, re.DOTALL)
+SINGLE_QUOTED_ESCAPE_PATTERN = re.compile(r"\\.|\"", re.DOTALL)
+
+ASSIGNMENT_PATTERN = re.compile(r"\s*[=:]?\s*")
+
+
+def scan_value_end(text: str, pos: int) -> int:
+    """Returns the index just past the object, array or string literal starting at `text[pos]`, or -1.
+
+    Brace, bracket and string-escape state is tracked in a single left-to-right pass, so the cost is
+    linear in the length of the value no matter what follows it.
+    """
+
+    depth = 0
+    while True:
+        match = STRUCTURAL_PATTERN.search(text, pos)
+        if match is None:
+            return -1
+
+        char = match.group()
+        if char in "{[":
+            depth += 1
+            pos = match.end()
+        elif char in "}]":
+            depth -= 1
+            pos = match.end()
+            if depth <= 0:
+                return pos
+        else:
+            string_match = STRING_PATTERNS[char].match(text, match.start())
+            if string_match is None:
+                return -1
+            pos = string_match.end()
+            if depth == 0:
+                return pos
+
+
+def iter_json_values(text: str, anchor: str, start: int = 0, end: int | None = None) -> Iterator[str]:
+    """Yields the exact literal that follows every occurrence of `anchor`, e.g. `var products = [...]`.
+
+    An optional `=` or `:` between the anchor and the value is skipped. Occurrences that are not
+    followed by an object, array or string literal are ignored.
+    """
+
+    end = len(text) if end is None else end
+    pos = text.find(anchor, start, end)
+    while pos != -1:
+        next_pos = pos + 1
+        value_start = ASSIGNMENT_PATTERN.match(text, pos + len(anchor), end).end()
+        if value_start < end and text[value_start] in "{[\"'":
+            value_end = scan_value_end(text, value_start)
+            if value_end != -1 and value_end <= end:
+                yield text[value_start:value_end]
+                next_pos = value_end
+        pos = text.find(anchor, next_pos, end)
+
+
+def extract_json_value(text: str, anchor: str, start: int = 0, end: int | None = None) -> str | None:
+    """Returns the literal following the first occurrence of `anchor`, or None."""
+
+    return next(iter_json_values(text, anchor, start, end), None)
+
+
+def _escape_for_double_quotes(match: re.Match) -> str:
+    token = match.group()
+    if token == '"':
+        return '\\"'
+    if token == "\\'":
+        return "'"
+    return token
+
+
+def _to_double_quoted(match: re.Match) -> str:
+    literal = match.group()
+    if literal.startswith('"'):
+        return literal
+    return '"' + SINGLE_QUOTED_ESCAPE_PATTERN.sub(_escape_for_double_quotes, literal[1:-1]) + '"'
+
+
+def js_to_json(value: str) -> str:
+    """Rewrites single-quoted javascript string literals as JSON strings, leaving double-quoted ones alone."""
+
+    return ANY_STRING_PATTERN.sub(_to_double_quoted, value)
+
+
+def loads_js_value(value: str) -> Any:
+    """Decodes a javascript object/array literal that may use single-quoted strings."""
+
+    return json.loads(js_to_json(value))
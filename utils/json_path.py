@@ -0,0 +1,120 @@
+from typing import Any
+
+
+def _step(obj: Any, key: str | int) -> Any:
+    if isinstance(key, int):
+        if isinstance(obj, (list, tuple)) and -len(obj) <= key < len(obj):
+            return obj[key]
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return None
+
+
+def get_from_json(json_obj: dict[str, Any] | list | None, path: list[str | int] = []) -> Any:
+    """Walks `path` through `json_obj` and returns None as soon as a key or index is missing."""
+
+    obj = json_obj
+    for key in path:
+        if obj is None:
+            break
+        obj = _step(obj, key)
+    return obj
+
+
+class JsonPath:
+    """A key path compiled once, e.g. `JsonPath(["skus", 0, "onlineOffer", "price"])`."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: list[str | int]) -> None:
+        for key in path:
+            if not isinstance(key, (str, int)):
+                raise TypeError(f"invalid path key: {key!r}")
+        self.path = tuple(path)
+
+    def __call__(self, json_obj: Any) -> Any:
+        obj = json_obj
+        for key in self.path:
+            if obj is None:
+                return None
+            obj = _step(obj, key)
+        return obj
+
+    def __repr__(self) -> str:
+        return f"JsonPath({list(self.path)!r})"
+
+
+class _TrieNode:
+    __slots__ = ("children", "names", "all_names", "steps")
+
+    def __init__(self) -> None:
+        self.children: dict[str | int, _TrieNode] = {}
+        self.names: list[str] = []
+        self.all_names: set[str] = set()
+        self.steps: tuple[tuple[str | int, bool, _TrieNode], ...] = ()
+
+    def freeze(self) -> None:
+        self.steps = tuple((key, isinstance(key, int), child) for key, child in self.children.items())
+        for child in self.children.values():
+            child.freeze()
+
+
+class JsonPathSet:
+    """Many named paths merged into a trie so that shared prefixes are walked only once.
+
+    >>> paths = JsonPathSet({"price": ["skus", 0, "price"], "sku_id": ["skus", 0, "skuId"]})
+    >>> paths.extract({"skus": [{"price": 1, "skuId": "a"}]})
+    {'price': 1, 'sku_id': 'a'}
+    """
+
+    def __init__(self, paths: dict[str, list[str | int]]) -> None:
+        self.paths = {name: JsonPath(path) for name, path in paths.items()}
+        self.root = _TrieNode()
+        for name, path in self.paths.items():
+            node = self.root
+            node.all_names.add(name)
+            for key in path.path:
+                node = node.children.setdefault(key, _TrieNode())
+                node.all_names.add(name)
+            node.names.append(name)
+        self.root.freeze()
+
+    def extract(self, json_obj: Any, names: set[str] | None = None) -> dict[str, Any]:
+        """Resolves every path (or only `names`) in one traversal. Missing values are None."""
+
+        if names is None:
+            result: dict[str, Any] = dict.fromkeys(self.paths)
+            _resolve_all(self.root, json_obj, result)
+        else:
+            result = dict.fromkeys(names)
+            _resolve_some(self.root, json_obj, result, names)
+        return result
+
+
+def _resolve_all(node: _TrieNode, obj: Any, result: dict[str, Any]) -> None:
+    for name in node.names:
+        result[name] = obj
+    for key, is_index, child in node.steps:
+        if is_index:
+            if not isinstance(obj, (list, tuple)) or not -len(obj) <= key < len(obj):
+                continue
+            value = obj[key]
+        elif isinstance(obj, dict):
+            value = obj.get(key)
+        else:
+            continue
+        if value is not None:
+            _resolve_all(child, value, result)
+
+
+def _resolve_some(node: _TrieNode, obj: Any, result: dict[str, Any], names: set[str]) -> None:
+    for name in node.names:
+        if name in names:
+            result[name] = obj
+    for key, _, child in node.steps:
+        if names.isdisjoint(child.all_names):
+            continue
+        value = _step(obj, key)
+        if value is not None:
+            _resolve_some(child, value, result, names)
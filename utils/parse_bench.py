@@ -0,0 +1,34 @@
+import importlib
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+from typing import Any
+
+
+def _measure(module_name: str, func_name: str, html_path: Path, kwargs: dict[str, Any], strained: bool) -> tuple:
+    module = importlib.import_module(module_name)
+    if not strained:
+        module.PARSE_ONLY = None
+    with html_path.open("r", encoding="utf-8") as html_file:
+        html_content = html_file.read()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    result = getattr(module, func_name)(html_content, **kwargs)
+    elapsed = time.perf_counter() - start
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    return elapsed, rss_growth, result
+
+
+def measure_parse(
+    module_name: str, func_name: str, html_path: Path, kwargs: dict[str, Any], strained: bool
+) -> tuple[float, int, Any]:
+    """Parses one page in a fresh interpreter and returns (seconds, peak rss growth in KiB, result).
+
+    A spawned child keeps earlier pages from raising the peak rss of later ones. `strained=False` clears the
+    module's `PARSE_ONLY` first, so the whole page becomes a tree.
+    """
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_measure, (module_name, func_name, html_path, kwargs, strained))
@@ -0,0 +1,15 @@
+from typing import Any, Collection
+
+
+def wants(fields: Collection[str] | None, *names: str) -> bool:
+    """Returns True when no projection is given or it asks for any of `names`."""
+
+    return fields is None or any(name in fields for name in names)
+
+
+def project(detail: dict[str, Any], fields: Collection[str] | None) -> dict[str, Any]:
+    """Keeps only the requested keys of `detail`, in their original order."""
+
+    if fields is None:
+        return detail
+    return {key: value for key, value in detail.items() if key in fields}
@@ -0,0 +1,98 @@
+"""Local stand-in for the retailer apis, so the api clients can be exercised and timed without the network.
+
+    with ReplayServer({"/m/": reviews_route}, latency=0.05) as server:
+        get_reviews(..., base_url=server.base_url)
+
+A route receives the request path, its query string parsed by `urllib.parse.parse_qs` and the decoded json body
+(None for a GET), and returns a status and a json-serialisable payload. Every response waits `latency` seconds first,
+with requests served concurrently, so the timings look like a remote api's. Connections are kept alive, and the
+server counts them next to the requests, which shows whether a client reuses its connections.
+"""
+
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+Route = Callable[[str, dict[str, list[str]], Any], tuple[int, Any]]
+
+
+class ReplayServer:
+    def __init__(self, routes: dict[str, Route], latency: float = 0.0) -> None:
+        self.routes = routes
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def _respond(self, body: Any) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                route = next((route for prefix, route in server.routes.items() if url.path.startswith(prefix)), None)
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.latency)
+                    if route is None:
+                        status, payload = 404, {"error": f"no route for {url.path}"}
+                    else:
+                        status, payload = route(url.path, urllib.parse.parse_qs(url.query), body)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._respond(None)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                self._respond(json.loads(self.rfile.read(length)) if length else None)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = self.connections = self.max_in_flight = 0
+
+    def __enter__(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.shutdown()
+        self._server.server_close()
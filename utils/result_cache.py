@@ -0,0 +1,169 @@
+"""On-disk cache of parse results, keyed by a hash of the page bytes and the retailer's parser version.
+
+    <directory>/<retailer>/v<version>/<key[:2]>/<key>.pickle.z
+    <directory>/<retailer>/v<version>/urls/<url key[:2]>/<url key>.url
+
+Entries are zlib-compressed pickles; a hit refreshes the file's mtime, and once the directory outgrows its budget
+the least recently used entries go first, and an entry that cannot be read back is removed and counts as a miss.
+Bumping a retailer's `version` in `utils.retailers.RETAILERS` drops only that retailer's older entries, the first time
+the cache sees the retailer again.
+
+`.url` records hold the simhash of the last parsed capture of a product url, that capture's key and a hash of its
+price and stock values, so `utils.batch --dedupe` can serve a recapture that only differs in noise from the earlier
+result.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Collection
+
+from utils.retailers import RETAILERS
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Eviction frees down to this share of the budget, so it does not run again on the very next write
+LOW_WATER = 0.9
+ENTRY_SUFFIX = ".pickle.z"
+URL_SUFFIX = ".url"
+
+MISS = object()
+
+
+def normalise(raw: bytes) -> bytes:
+    """The page as the parsers see it: line endings translated as text-mode `open` would."""
+
+    if b"\r" in raw:
+        raw = raw.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    return raw
+
+
+def content_key(normalised: bytes, fields: Collection[str] | None = None) -> str:
+    """Hash of the page plus the requested projection; sha1 is the fastest of hashlib's digests here."""
+
+    digest = hashlib.sha1(normalised, usedforsecurity=False)
+    if fields is not None:
+        digest.update(",".join(sorted(fields)).encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU store; several processes may share one directory."""
+
+    def __init__(self, directory: str | Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        # Running estimate of the directory size, rescanned whenever it crosses the budget
+        self._bytes: int | None = None
+        self._checked: set[str] = set()
+
+    def _retailer_dir(self, retailer: str) -> Path:
+        version_dir = self.directory / retailer / f"v{RETAILERS[retailer].version}"
+        if retailer not in self._checked:
+            self._checked.add(retailer)
+            if version_dir.parent.is_dir():
+                for other in version_dir.parent.iterdir():
+                    if other != version_dir:
+                        shutil.rmtree(other, ignore_errors=True)
+        return version_dir
+
+    def _path(self, retailer: str, key: str) -> Path:
+        return self._retailer_dir(retailer) / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def _url_path(self, retailer: str, url: str, fields: Collection[str] | None) -> Path:
+        url_key = content_key(url.encode(), fields)
+        return self._retailer_dir(retailer) / "urls" / url_key[:2] / f"{url_key}{URL_SUFFIX}"
+
+    def get(self, retailer: str, key: str) -> Any:
+        """Returns the stored result, or `MISS`."""
+
+        path = self._path(retailer, key)
+        try:
+            with path.open("rb") as entry_file:
+                data = entry_file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return MISS
+        try:
+            return pickle.loads(zlib.decompress(data))
+        except Exception:
+            # Corrupt, truncated, or pickled against classes that have since moved
+            path.unlink(missing_ok=True)
+            return MISS
+
+    def put(self, retailer: str, key: str, result: Any) -> None:
+        self._write(self._path(retailer, key), zlib.compress(pickle.dumps(result, pickle.HIGHEST_PROTOCOL), 1))
+
+    def get_fingerprint(
+        self, retailer: str, url: str, fields: Collection[str] | None = None
+    ) -> tuple[int, str, str] | None:
+        """(simhash, key, values hash) of the last capture of `url` parsed with this projection, or `None`."""
+
+        path = self._url_path(retailer, url, fields)
+        try:
+            with path.open("r", encoding="ascii") as url_file:
+                fingerprint, key, values = url_file.read().split()
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            return None
+        return int(fingerprint, 16), key, values
+
+    def put_fingerprint(
+        self,
+        retailer: str,
+        url: str,
+        fingerprint: int,
+        key: str,
+        values: str,
+        fields: Collection[str] | None = None,
+    ) -> None:
+        self._write(self._url_path(retailer, url, fields), f"{fingerprint:08x} {key} {values}".encode("ascii"))
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written aside and renamed, so a concurrent reader never sees half an entry
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("wb") as entry_file:
+            entry_file.write(data)
+        os.replace(tmp_path, path)
+
+        if self._bytes is None:
+            self._bytes = self._scan_size()
+        else:
+            self._bytes += len(data)
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for root, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if file_name.endswith((ENTRY_SUFFIX, URL_SUFFIX)):
+                    path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the directory is under `LOW_WATER` of its budget."""
+
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * LOW_WATER
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._bytes = total
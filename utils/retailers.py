@@ -0,0 +1,106 @@
+import functools
+import importlib.util
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+from utils.blocking import detect_block
+
+ROOT_DIR = Path(__file__).parent.parent
+
+
+class Retailer(NamedTuple):
+    parser_path: str
+    func_name: str
+    # Fixture globs, relative to the parser's directory
+    patterns: tuple[str, ...]
+    # Bumped whenever the parser's output changes, which invalidates its cached results
+    version: int = 1
+    # False when the output also depends on live api calls or the clock, which a cached result would freeze
+    cacheable: bool = True
+
+
+RETAILERS = {
+    "samsclub": Retailer("1.samsclub/parse_samsclub.py", "parse_detail", ("samsclub_detail_*.html",)),
+    "samsclub_api": Retailer(
+        "1.samsclub/parse_samsclub.py", "parse_detail_api", ("samsclub_detail_*.html",), cacheable=False
+    ),
+    "samsclub_hybrid": Retailer(
+        "1.samsclub/parse_samsclub.py", "parse_detail_hybrid", ("samsclub_detail_*.html",), cacheable=False
+    ),
+    # Ratings and reviews come from the PowerReviews api
+    "overstock": Retailer(
+        "overstock/parse_overstock.py", "parse_overstock", ("overstock_detail_*.html",), cacheable=False
+    ),
+    "bedbathbeyond": Retailer("bedbathbeyond/parse_bedbathbeyond.py", "parse_bedbathbeyond", ("*.html",)),
+    "costco": Retailer("costco/parse_costco.py", "parse_costco", ("costco_*.html",)),
+    "bestbuy": Retailer("bestbuy/parse_bestbuy_detai.py", "parse_bestbuy_html", ("bestbuy_detail_*.html",)),
+    "walmart": Retailer(
+        "walmart/parse_walmart.py", "parse_walmart_html", ("walmart_search*.html", "walmart_mustard*.html")
+    ),
+    "wayfair": Retailer(
+        "prev/parse_wayfair.py", "parse_wayfair_html", ("wayfair_detail_*.html", "wayfair-variation.html")
+    ),
+    "wayfair_category": Retailer("prev/parse_wayfair_category.py", "parse_wayfair_html", ("wayfair_category.html",)),
+    "mercado": Retailer("prev/parse_mercado.py", "parse_mercado_html", ("mercado_search.html",)),
+    "tesco": Retailer("prev/parse_tesco_html.py", "parse_tesco_html", ("tesco_detail.html",)),
+}
+
+# Snapshot file name prefixes written by the scrapers, longest match wins
+FILENAME_PREFIXES = {
+    "samsclub_": "samsclub",
+    "overstock_": "overstock",
+    "bedbathbeyond_": "bedbathbeyond",
+    "costco_": "costco",
+    "bestbuy_": "bestbuy",
+    "walmart_": "walmart",
+    # Detail pages have no parser yet; naming them keeps them out of the search parser
+    "walmart_detail": "walmart_detail",
+    "wayfair_detail": "wayfair",
+    "wayfair-": "wayfair",
+    "wayfair_category": "wayfair_category",
+    "mercado_": "mercado",
+    "tesco_": "tesco",
+}
+
+
+def fixture_paths(retailer: Retailer) -> list[Path]:
+    parser_dir = (ROOT_DIR / retailer.parser_path).parent
+    return [path for pattern in retailer.patterns for path in sorted(parser_dir.glob(pattern))]
+
+
+def retailer_from_filename(file_name: str) -> str | None:
+    matches = [prefix for prefix in FILENAME_PREFIXES if file_name.startswith(prefix)]
+    return FILENAME_PREFIXES[max(matches, key=len)] if matches else None
+
+
+@lru_cache(maxsize=None)
+def _load_module(parser_path: str):
+    spec = importlib.util.spec_from_file_location(Path(parser_path).stem, ROOT_DIR / parser_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@lru_cache(maxsize=None)
+def load_parser(name: str, func_name: str | None = None) -> Callable:
+    """Imports the retailer's parser module from its directory (once per process) and returns its entry point,
+    or the module's `func_name` function.
+
+    The entry point returns a `utils.blocking.Blocked` for block and captcha pages instead of parsing them. Callers
+    that have already run `detect_block` pass the entry point's own name to get it without that second check.
+    """
+
+    retailer = RETAILERS[name]
+    func = getattr(_load_module(retailer.parser_path), func_name or retailer.func_name)
+    if func_name is not None:
+        return func
+
+    @functools.wraps(func)
+    def parse(html_content: str | bytes, *args: Any, **kwargs: Any) -> Any:
+        blocked = detect_block(html_content, name)
+        if blocked is not None:
+            return blocked
+        return func(html_content, *args, **kwargs)
+
+    return parse
@@ -0,0 +1,69 @@
+"""PowerReviews reviews already fetched per product, so a sync only has to ask for the ones posted since.
+
+    <directory>/<merchant_id>/<page_id>.json
+
+Each file holds the product's last rollup and its reviews newest first, along with the id and created date of the
+newest one, which is where the next sync stops paginating.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from utils.json_path import get_from_json
+
+
+class ReviewStore:
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+
+    def _path(self, merchant_id: str | int, page_id: str | int) -> Path:
+        return self.directory / str(merchant_id) / f"{page_id}.json"
+
+    def get(self, merchant_id: str | int, page_id: str | int) -> dict[str, Any] | None:
+        try:
+            with self._path(merchant_id, page_id).open("r", encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except FileNotFoundError:
+            return None
+
+    def put(
+        self, merchant_id: str | int, page_id: str | int, rollup: Any, reviews: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Replaces the product's reviews; `reviews` are newest first."""
+
+        state = {
+            "newest_id": get_from_json(reviews, [0, "review_id"]),
+            "newest_date": get_from_json(reviews, [0, "details", "created_date"]),
+            "rollup": rollup,
+            "reviews": reviews,
+        }
+        path = self._path(merchant_id, page_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as state_file:
+            json.dump(state, state_file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return state
+
+    def merge(
+        self, merchant_id: str | int, page_id: str | int, rollup: Any, reviews: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Adds the `reviews` not stored yet: ones newer than the newest stored go on top, older ones at the end."""
+
+        state = self.get(merchant_id, page_id)
+        if state is None:
+            return self.put(merchant_id, page_id, rollup, reviews)
+
+        known = {review["review_id"] for review in state["reviews"]}
+        unseen = [review for review in reviews if review["review_id"] not in known]
+        newest_date = state["newest_date"]
+        newer = [review for review in unseen if is_newer(review, newest_date)]
+        older = [review for review in unseen if not is_newer(review, newest_date)]
+        return self.put(merchant_id, page_id, rollup or state["rollup"], newer + state["reviews"] + older)
+
+
+def is_newer(review: dict[str, Any], date: int | None) -> bool:
+    created_date = get_from_json(review, ["details", "created_date"])
+    return date is None or created_date is None or created_date > date
@@ -0,0 +1,47 @@
+import re
+from typing import Any, Callable, Collection
+
+from utils.field_timing import section
+from utils.script_tags import iter_script_matches
+
+
+class ScriptScanner:
+    """Finds several anchor strings across a page's `<script>` elements in a single pass.
+
+    Every anchor is mapped to an extractor that receives the body of the first script containing it.
+    Anchors are matched against the whole element, so an id such as `web-pixels-manager-setup`
+    can be used as well as a string from the script body.
+    """
+
+    def __init__(self, extractors: dict[str, Callable[[str], Any]]) -> None:
+        self.extractors = dict(extractors)
+        self.pattern = re.compile(
+            "|".join(re.escape(anchor) for anchor in sorted(self.extractors, key=len, reverse=True))
+        )
+
+    def scan(self, html_content: str, anchors: Collection[str] | None = None) -> dict[str, Any]:
+        """Runs the extractors over the page and returns their results keyed by the anchors that were found.
+
+        When `anchors` is given, only those extractors run and the scan stops once they are all found.
+        """
+
+        results: dict[str, Any] = {}
+        if anchors is None:
+            pending = dict(self.extractors)
+        else:
+            pending = {anchor: self.extractors[anchor] for anchor in anchors}
+        if not pending:
+            return results
+        for match in iter_script_matches(html_content):
+            start, end = match.span()
+            if self.pattern.search(html_content, start, end) is None:
+                continue
+
+            body = match.group(2)
+            for anchor in [anchor for anchor in pending if html_content.find(anchor, start, end) != -1]:
+                with section(f"script {anchor}"):
+                    results[anchor] = pending.pop(anchor)(body)
+            if not pending:
+                break
+
+        return results
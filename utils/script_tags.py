@@ -0,0 +1,66 @@
+import re
+from functools import lru_cache
+from typing import Iterator
+
+from bs4 import BeautifulSoup
+
+# Comments are matched first so that commented-out markup is skipped, like html.parser does.
+SCRIPT_PATTERN = re.compile(r"<!--.*?-->|<script\b([^>]*)>(.*?)</script\s*>", re.DOTALL | re.IGNORECASE)
+SCRIPT_PATTERN_BYTES = re.compile(rb"<!--.*?-->|<script\b([^>]*)>(.*?)</script\s*>", re.DOTALL | re.IGNORECASE)
+
+TAG_PATTERN = re.compile(
+    r"<!--.*?-->|<script\b[^>]*>.*?</script\s*>|(<(?:link|meta)\b[^>]*>)",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=64)
+def _id_attr_pattern(script_id: str) -> re.Pattern:
+    escaped_id = re.escape(script_id)
+    return re.compile(rf"(?<![\w-])id\s*=\s*(?:\"{escaped_id}\"|'{escaped_id}'|{escaped_id}(?![^\s>]))", re.IGNORECASE)
+
+
+def _to_str(value: str | bytes) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def iter_script_matches(html_content: str | bytes) -> Iterator[re.Match]:
+    """Yields the regex match of every `<script>` element of the raw page in document order.
+
+    Group 1 holds the tag attributes and group 2 the body.
+    """
+
+    pattern = SCRIPT_PATTERN_BYTES if isinstance(html_content, bytes) else SCRIPT_PATTERN
+    for match in pattern.finditer(html_content):
+        if match.group(2) is not None:
+            yield match
+
+
+def iter_scripts(html_content: str | bytes) -> Iterator[tuple[str, str]]:
+    """Yields `(attributes, body)` for every `<script>` element of the raw page in document order."""
+
+    for match in iter_script_matches(html_content):
+        yield _to_str(match.group(1)), _to_str(match.group(2))
+
+
+def extract_script_text(html_content: str | bytes, script_id: str) -> str | None:
+    """Returns the body of `<script id=script_id>` by scanning the raw page, without building a DOM."""
+
+    id_pattern = _id_attr_pattern(script_id)
+    for match in iter_script_matches(html_content):
+        if id_pattern.search(_to_str(match.group(1))):
+            return _to_str(match.group(2))
+    return None
+
+
+def parse_head_tags(html_content: str | bytes) -> BeautifulSoup:
+    """Builds a small soup holding only the page's `<link>` and `<meta>` tags.
+
+    Script bodies are skipped so markup quoted inside javascript is never picked up.
+    """
+
+    html_text = _to_str(html_content)
+    tags = [tag for tag in TAG_PATTERN.findall(html_text) if tag]
+    return BeautifulSoup("\n".join(tags), "html.parser")
@@ -0,0 +1,47 @@
+"""In-memory cache whose entries expire `ttl` seconds after they were stored, for api responses shared by the parses
+of one process.
+
+Every entry lives equally long, so insertion order is expiry order and expired entries are dropped from the front.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 4096, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            now = self.clock()
+            self._entries.pop(key, None)
+            self._entries[key] = (now, value)
+            while self._entries:
+                stored_at, _ = next(iter(self._entries.values()))
+                if now - stored_at <= self.ttl and len(self._entries) <= self.maxsize:
+                    break
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,11 +1,20 @@
 from urllib.parse import urlparse, urlunparse
 import json
+import sys
 from pathlib import Path
 from typing import Any
 
-from bs4 import BeautifulSoup
 from loguru import logger
 
+# Run from the retailer directory or as `python <retailer dir>/<script>.py`: the shared `utils` package is one
+# level up
+REPO_DIR = str(Path(__file__).resolve().parent.parent)
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from utils.json_path import get_from_json
+from utils.script_tags import extract_script_text
+
 CUR_DIR = Path(__file__).parent
 
 html_path = CUR_DIR / "walmart_search.html"
@@ -15,25 +24,12 @@ html_path = CUR_DIR / "walmart_mustard_page_2.html"
 output_path = CUR_DIR / "walmart-result.json"
 
 
-def get_from_json(json_obj: dict[str, Any] | None, path: list[str] = []) -> Any:
-    obj = json_obj
-    for key in path:
-        if obj is None:
-            break
-        if isinstance(key, int):
-            obj = obj[key]
-        elif isinstance(key, str):
-            obj = obj.get(key)
-    return obj
-
-
-def parse_walmart_html(html_content: str) -> list[dict[str, Any]]:
+def parse_walmart_html(html_content: str | bytes) -> list[dict[str, Any]]:
     """Parses html content and returns a list of product information."""
 
-    page_elem = BeautifulSoup(html_content, "html.parser")
     dict_details: dict[str, Any] = {}
 
-    json_data_str = page_elem.select_one("script[id=__NEXT_DATA__]").text
+    json_data_str = extract_script_text(html_content, "__NEXT_DATA__")
     json_data = json.loads(json_data_str)
 
     dict_details["success"] = True